@@ -21,6 +21,10 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from app.database import Base, Organization, User, Product, Material, Report
+import app.indexes  # noqa: F401  (composite/partial indexes on the models above)
+import app.services.compliance_summary  # noqa: F401  (organization_compliance_summaries)
+import app.services.material_catalogue  # noqa: F401  (seed_checksums)
+import app.services.resource_versions  # noqa: F401  (resource_versions)
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
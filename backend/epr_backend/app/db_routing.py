@@ -0,0 +1,297 @@
+"""Read/write session routing between the primary database and read replicas.
+
+``app.database`` builds its session factory from a ``DatabaseRouter``::
+
+    router = configure_routing(engine)
+    SessionLocal = router.sessionmaker(autocommit=False, autoflush=False)
+
+Sessions default to the primary. Reads go to a replica only inside a
+read-only scope: requests with a safe method (``DatabaseRoutingMiddleware``)
+and explicit ``read_replica()`` blocks in workers. Even there, flushes,
+DML, and every statement after a session's first write use the primary.
+
+Read-your-writes: a commit made while serving an authenticated request keeps
+that caller on the primary for ``DATABASE_STICKY_SECONDS``, so a GET that
+follows a POST never sees a replica that has not caught up yet. Stickiness is
+recorded in Redis (shared by all workers) with a per-process fallback.
+
+Replica lag is sampled at most every ``DATABASE_REPLICA_LAG_CHECK_INTERVAL``
+seconds; a replica that lags more than ``DATABASE_REPLICA_MAX_LAG`` seconds
+or fails its lag probe is skipped until the next check. One session runs each
+probe while the others keep routing on the previous result, and replica
+connects give up after ``DATABASE_REPLICA_CONNECT_TIMEOUT`` seconds.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+STICKY_PREFIX = "db:sticky:"
+_WROTE = "db_routing_wrote"
+
+POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+LagProbe = Callable[[Connection], float]
+
+db_routes = registry.counter(
+    "db_session_routes_total", "Statements routed per database target", ("target",)
+)
+
+
+@dataclass
+class RoutingState:
+    read_only: bool
+    user_key: Optional[str] = None
+    wrote: bool = False
+
+
+_state: ContextVar[Optional[RoutingState]] = ContextVar("db_routing", default=None)
+
+
+@contextlib.contextmanager
+def read_replica(user_key: Optional[str] = None) -> Iterator[RoutingState]:
+    """Route reads in this block to a replica (report workers, exports)."""
+    state = RoutingState(read_only=True, user_key=user_key)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def postgres_lag(conn: Connection) -> float:
+    return float(conn.execute(POSTGRES_LAG_SQL).scalar() or 0.0)
+
+
+def no_lag(conn: Connection) -> float:
+    return 0.0
+
+
+class StickyWindow:
+    """Remember recent writers so their reads stay on the primary."""
+
+    def __init__(self, seconds: float, client: Any = None) -> None:
+        self.seconds = seconds
+        self.client = client
+        self._local: Dict[str, float] = {}
+
+    def mark(self, key: str) -> None:
+        now = time.monotonic()
+        if len(self._local) >= 10_000:
+            self._local = {k: t for k, t in self._local.items() if t > now}
+        self._local[key] = now + self.seconds
+        if self.client is not None:
+            try:
+                self.client.set(STICKY_PREFIX + key, "1", px=int(self.seconds * 1000))
+            except Exception:
+                logger.warning("Could not record sticky primary window", exc_info=True)
+
+    def is_sticky(self, key: str) -> bool:
+        expires = self._local.get(key)
+        if expires is not None:
+            if expires > time.monotonic():
+                return True
+            self._local.pop(key, None)
+        if self.client is None:
+            return False
+        try:
+            return bool(self.client.exists(STICKY_PREFIX + key))
+        except Exception:
+            # Unknown means "maybe stale": prefer correctness over offload.
+            return True
+
+
+class _Replica:
+    def __init__(self, engine: Engine, probe: LagProbe) -> None:
+        self.engine = engine
+        self.probe = probe
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+        self.healthy = True
+
+
+class DatabaseRouter:
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: Sequence[Engine] = (),
+        max_lag: float = 2.0,
+        lag_check_interval: float = 1.0,
+        sticky: Optional[StickyWindow] = None,
+        lag_probe: Optional[LagProbe] = None,
+    ) -> None:
+        self.primary = primary
+        self.replicas = [
+            _Replica(engine, lag_probe or (postgres_lag if engine.dialect.name == "postgresql" else no_lag))
+            for engine in replicas
+        ]
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.sticky = sticky or StickyWindow(5.0)
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self._lock = threading.Lock()
+
+    def _refresh(self, replica: _Replica) -> None:
+        now = time.monotonic()
+        if now - replica.checked_at < self.lag_check_interval:
+            return
+        with self._lock:
+            if now - replica.checked_at < self.lag_check_interval:
+                return
+            # Claim the check; the probe itself runs unlocked so a dead replica
+            # only holds up the session that probes it.
+            replica.checked_at = now
+        try:
+            with replica.engine.connect() as conn:
+                lag: Optional[float] = replica.probe(conn)
+            healthy = lag is not None and lag <= self.max_lag
+        except Exception as exc:
+            lag = None
+            healthy = False
+            logger.debug("Replica lag probe failed: %s", exc)
+        if healthy != replica.healthy:
+            logger.warning(
+                "Replica %s is %s (lag=%s)",
+                replica.engine.url.render_as_string(hide_password=True),
+                "back in rotation" if healthy else "out of rotation",
+                lag,
+            )
+        replica.lag = lag
+        replica.healthy = healthy
+
+    def reader(self) -> Engine:
+        """A replica within the lag budget, or the primary when none is."""
+        if self._cycle is None:
+            return self.primary
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            self._refresh(replica)
+            if replica.healthy:
+                return replica.engine
+        return self.primary
+
+    def sessionmaker(self, **kwargs: Any) -> "sessionmaker[RoutingSession]":
+        return sessionmaker(class_=RoutingSession, router=self, **kwargs)
+
+
+def _is_write(clause: Any) -> bool:
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        words = clause.text.split(None, 1)
+        return not words or words[0].upper() not in ("SELECT", "WITH")
+    return False
+
+
+class RoutingSession(Session):
+    def __init__(self, router: DatabaseRouter, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.router = router
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine:
+        if self._flushing or _is_write(clause):
+            self.info[_WROTE] = True
+        state = _state.get()
+        if state is None or not state.read_only or self.info.get(_WROTE):
+            db_routes.inc(("primary",))
+            return self.router.primary
+        engine = self.router.reader()
+        db_routes.inc(("replica" if engine is not self.router.primary else "primary_fallback",))
+        return engine
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _start_sticky_window(session: Session) -> None:
+    if not session.info.get(_WROTE):
+        return
+    state = _state.get()
+    if state is not None:
+        state.wrote = True
+        if state.user_key:
+            session.router.sticky.mark(state.user_key)  # type: ignore[attr-defined]
+
+
+def user_key(scope: Scope) -> Optional[str]:
+    """Stable per-caller key derived from the bearer token."""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            return hashlib.blake2b(value, digest_size=12).hexdigest()
+    return None
+
+
+class DatabaseRoutingMiddleware:
+    """Mark safe-method requests as replica-eligible unless the caller is sticky."""
+
+    def __init__(self, app: Any, router: DatabaseRouter) -> None:
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        key = user_key(scope)
+        # The sticky lookup may go to Redis, so it runs off the event loop.
+        read_only = scope["method"] in SAFE_METHODS and not (
+            key is not None and await asyncio.to_thread(self.router.sticky.is_sticky, key)
+        )
+        token = _state.set(RoutingState(read_only=read_only, user_key=key))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _state.reset(token)
+
+
+def replica_urls() -> List[str]:
+    return [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def configure_routing(primary: Engine, **engine_kwargs: Any) -> DatabaseRouter:
+    """Build the router from ``DATABASE_REPLICA_URLS`` and related settings."""
+    sticky_client = None
+    if os.getenv("REDIS_URL"):
+        from app.services.redis_client import get_redis
+
+        sticky_client = get_redis()
+    engine_kwargs.setdefault("pool_pre_ping", True)
+    connect_timeout = int(os.getenv("DATABASE_REPLICA_CONNECT_TIMEOUT", "2"))
+    replicas = []
+    for url in replica_urls():
+        kwargs = dict(engine_kwargs)
+        if url.startswith("postgresql"):
+            kwargs["connect_args"] = {"connect_timeout": connect_timeout, **kwargs.get("connect_args", {})}
+        replicas.append(create_engine(url, **kwargs))
+    return DatabaseRouter(
+        primary,
+        replicas,
+        max_lag=float(os.getenv("DATABASE_REPLICA_MAX_LAG", "2.0")),
+        lag_check_interval=float(os.getenv("DATABASE_REPLICA_LAG_CHECK_INTERVAL", "1.0")),
+        sticky=StickyWindow(float(os.getenv("DATABASE_STICKY_SECONDS", "5.0")), sticky_client),
+    )
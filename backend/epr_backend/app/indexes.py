@@ -0,0 +1,28 @@
+"""Composite and partial indexes backing the hot read paths.
+
+Declared against ``Base.metadata`` so ``create_all`` and Alembic autogenerate
+pick them up; ``benchmarks.query_plans`` verifies that the critical queries
+actually use them.
+"""
+
+from sqlalchemy import Index
+
+from app.database import Product, Report
+
+products = Product.__table__
+reports = Report.__table__
+
+# Product listing by organization, newest first.
+Index("ix_products_org_created", products.c.organization_id, products.c.created_at)
+# SKU lookup within an organization.
+Index("ix_products_org_sku", products.c.organization_id, products.c.sku)
+# Report listing by organization, newest first.
+Index("ix_reports_org_created", reports.c.organization_id, reports.c.created_at)
+# Fee aggregation over completed reports in a period.
+Index(
+    "ix_reports_org_start_completed",
+    reports.c.organization_id,
+    reports.c.start_date,
+    postgresql_where=reports.c.status == "completed",
+    sqlite_where=reports.c.status == "completed",
+)
@@ -0,0 +1,86 @@
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.services.admission import (
+    PRIORITY_NAMES,
+    AdmissionController,
+    admission_from_env,
+    requests_shed,
+)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+RETRY_AFTER = {1: 2, 2: 5}
+
+
+class AdmissionControlMiddleware:
+    """Shed low-priority requests with 503 while the worker is overloaded.
+
+    Register it outside everything except the health middleware, so refused
+    requests cost no auth, session or logging work. It starts and stops the
+    load monitor with the ASGI lifespan. Disabled with ``ADMISSION_ENABLED=false``.
+    """
+
+    def __init__(
+        self, app: Any, controller: Optional[AdmissionController] = None, enabled: Optional[bool] = None
+    ) -> None:
+        self.app = app
+        if controller is None:
+            from app import database
+
+            controller = admission_from_env(getattr(database, "engine", None))
+        self.controller = controller
+        self.enabled = (
+            enabled
+            if enabled is not None
+            else os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+        )
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, self._lifespan_receive(receive), send)
+            return
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        priority = self.controller.priority(scope["method"], scope["path"])
+        if not self.controller.admit(priority, self.in_flight):
+            requests_shed.inc((PRIORITY_NAMES[priority],))
+            await self._shed(send, self.controller.level(self.in_flight))
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _shed(self, send: Send, level: int) -> None:
+        body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(RETRY_AFTER.get(level, 1)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _lifespan_receive(self, receive: Receive) -> Receive:
+        async def wrapped() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.startup" and self.enabled:
+                await self.controller.monitor.start()
+            elif message["type"] == "lifespan.shutdown":
+                await self.controller.monitor.stop()
+            return message
+
+        return wrapped
@@ -0,0 +1,285 @@
+"""Response compression negotiated from ``Accept-Encoding``.
+
+The API is reachable directly on port 8001, not only through nginx, so it
+compresses its own responses. zstd and Brotli are used when their packages
+(``zstandard``, ``brotli``) are installed and the client accepts them; gzip
+is always available. Levels are tuned for JSON. Repetitive keys compress
+well at low levels, and the highest levels cost several times the CPU for a
+few percent more (see ``benchmarks/compression.py``).
+
+Only compressible media types at least ``minimum_size`` bytes long are
+compressed. Responses that are already encoded, marked ``no-transform``, or
+served from an excluded path (exports and downloads are already zipped or
+PDF) pass through untouched. Streaming responses are compressed chunk by
+chunk, with a sync flush after each chunk so NDJSON/SSE consumers see data
+as it is produced.
+"""
+
+import re
+import zlib
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from app.services.metrics import registry
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/problem+json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+    "text/",
+)
+DEFAULT_EXCLUDED_PATHS = [
+    re.compile(r"/export(/|$)"),
+    re.compile(r"/download(/|$)"),
+]
+
+compressed_bytes = registry.counter(
+    "http_compression_bytes_total", "Response bytes before and after compression", ("encoding", "stage")
+)
+
+
+class _Gzip:
+    name = "gzip"
+
+    def __init__(self, level: int) -> None:
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    name = "br"
+
+    def __init__(self, level: int) -> None:
+        import brotli
+
+        self._brotli = brotli.Compressor(quality=level, mode=brotli.MODE_TEXT)
+
+    def compress(self, data: bytes) -> bytes:
+        return cast(bytes, self._brotli.process(data))
+
+    def flush(self) -> bytes:
+        return cast(bytes, self._brotli.flush())
+
+    def finish(self) -> bytes:
+        return cast(bytes, self._brotli.finish())
+
+
+class _Zstd:
+    name = "zstd"
+
+    def __init__(self, level: int) -> None:
+        import zstandard
+
+        self._zstd = zstandard.ZstdCompressor(level=level).compressobj()
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+
+    def compress(self, data: bytes) -> bytes:
+        return cast(bytes, self._zstd.compress(data))
+
+    def flush(self) -> bytes:
+        return cast(bytes, self._zstd.flush(self._flush_block))
+
+    def finish(self) -> bytes:
+        return cast(bytes, self._zstd.flush())
+
+
+def available_codecs() -> Dict[str, Any]:
+    """Codecs usable in this process, in server preference order."""
+    codecs: Dict[str, Any] = {}
+    try:
+        import zstandard  # noqa: F401
+
+        codecs["zstd"] = _Zstd
+    except ImportError:
+        pass
+    try:
+        import brotli  # noqa: F401
+
+        codecs["br"] = _Brotli
+    except ImportError:
+        pass
+    codecs["gzip"] = _Gzip
+    return codecs
+
+
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 5}
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        match = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(header: str, preference: Sequence[str]) -> Optional[str]:
+    """Pick the best coding the client accepts; ties go to the server's preference order."""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in preference:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower() or vary.strip() == b"*":
+        return headers
+    return [(k, v) for k, v in headers if k.lower() != b"vary"] + [(b"vary", vary + b", Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: Any,
+        minimum_size: int = 1024,
+        levels: Optional[Dict[str, int]] = None,
+        excluded_paths: Optional[Sequence[Pattern[str]]] = None,
+        encodings: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.excluded_paths = DEFAULT_EXCLUDED_PATHS if excluded_paths is None else list(excluded_paths)
+        codecs = available_codecs()
+        self.codecs = {name: codecs[name] for name in (encodings or codecs) if name in codecs}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or any(p.search(scope["path"]) for p in self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+        accept = _header(list(scope.get("headers") or ()), b"accept-encoding")
+        coding = negotiate(accept.decode("latin-1"), list(self.codecs)) if accept else None
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(self, coding, send))
+
+    def compressible(self, headers: List[Tuple[bytes, bytes]]) -> bool:
+        if _header(headers, b"content-encoding") is not None:
+            return False
+        cache_control = _header(headers, b"cache-control")
+        if cache_control is not None and b"no-transform" in cache_control.lower():
+            return False
+        content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.split(";")[0].endswith("+json")
+
+
+class _CompressingSend:
+    """``send`` wrapper holding back the response start until the body shows whether to compress."""
+
+    def __init__(self, middleware: CompressionMiddleware, coding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.coding = coding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor: Any = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] == "http.response.start":
+            headers = list(message.get("headers") or ())
+            if message["status"] < 200 or message["status"] in (204, 304) or not self.middleware.compressible(headers):
+                self.passthrough = True
+                await self.send(message)
+                return
+            self.start = {**message, "headers": _add_vary(headers)}
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        start = self.start
+        assert start is not None, "response body sent before its start"
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.compressor = self.middleware.codecs[self.coding](self.middleware.levels[self.coding])
+            headers = self._compressed_headers(start)
+            if not more_body:
+                compressed = self._compress(body, final=True)
+                headers.append((b"content-length", str(len(compressed)).encode()))
+                await self.send({**start, "headers": headers})
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send({**start, "headers": headers})
+
+        compressed = self._compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _compress(self, body: bytes, final: bool) -> bytes:
+        compressed: bytes = self.compressor.compress(body)
+        compressed += self.compressor.finish() if final else self.compressor.flush()
+        compressed_bytes.inc((self.coding, "in"), len(body))
+        compressed_bytes.inc((self.coding, "out"), len(compressed))
+        return compressed
+
+    def _compressed_headers(self, start: Message) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (key, value)
+            for key, value in start["headers"]
+            if key.lower() not in (b"content-length", b"etag")
+        ]
+        etag = _header(start["headers"], b"etag")
+        if etag is not None:
+            # A different representation must not share a strong validator.
+            headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+        headers.append((b"content-encoding", self.coding.encode()))
+        return headers
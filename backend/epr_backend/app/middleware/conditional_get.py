@@ -0,0 +1,266 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import inspect
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+)
+
+from app.db_routing import user_key
+from app.services.metrics import registry
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+# Returns (version, last_modified) for a resource key.
+VersionLookup = Callable[[str], Tuple[int, Optional[datetime]]]
+# Decides, from the request and the path's named groups, whether the caller may
+# read the resource; runs in a thread before a 304 is sent.
+Authorizer = Callable[[Scope, Dict[str, str]], bool]
+
+conditional_responses = registry.counter(
+    "http_conditional_responses_total", "Conditional GET outcomes per cache policy", ("policy", "outcome")
+)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Validator and ``Cache-Control`` settings for one route.
+
+    ``resource`` is formatted with the path pattern's named groups to get the
+    ``resource_versions`` key. Requests without an ``Authorization`` header
+    are passed through untouched, so only the endpoint answers them. Private
+    policies mix the caller's credentials into the ETag; ``authorize``
+    repeats the endpoint's access check before a 304, so a revoked caller
+    gets the endpoint's answer.
+    """
+
+    name: str
+    path: Pattern[str]
+    resource: str
+    cache_control: str
+    private: bool = False
+    authorize: Optional[Authorizer] = None
+
+
+def bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+    return None
+
+
+def _current_user(scope: Scope, session: Any) -> Any:
+    """The user the bearer token authenticates, or None for missing or invalid credentials."""
+    from app.auth import get_current_user
+
+    token = bearer_token(scope)
+    if token is None:
+        return None
+    try:
+        user = get_current_user(token=token, db=session)
+        if inspect.iscoroutine(user):
+            user = asyncio.run(user)
+    except Exception:
+        # Invalid or expired credentials: let the endpoint produce its 401.
+        return None
+    return user
+
+
+def authorize_user(scope: Scope, params: Dict[str, str]) -> bool:
+    """The check of endpoints open to any signed-in user: a valid token."""
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        return _current_user(scope, session) is not None
+
+
+def authorize_report(scope: Scope, params: Dict[str, str]) -> bool:
+    """The report endpoint's check: a valid token whose organization owns the report."""
+    from app.database import Report, SessionLocal
+
+    with SessionLocal() as session:
+        user = _current_user(scope, session)
+        if user is None:
+            return False
+        report = session.get(Report, params["report_id"])
+        return report is not None and report.organization_id == user.organization_id
+
+
+DEFAULT_POLICIES: List[CachePolicy] = [
+    CachePolicy(
+        name="materials",
+        path=re.compile(r"^/api/materials/?$"),
+        resource="materials",
+        # Public reference data: shared caches may serve it to any caller.
+        cache_control="public, max-age=60, stale-while-revalidate=300",
+        authorize=authorize_user,
+    ),
+    CachePolicy(
+        name="report",
+        path=re.compile(r"^/api/reports/(?P<report_id>[0-9A-Za-z-]+)$"),
+        resource="reports:{report_id}",
+        cache_control="private, no-cache",
+        private=True,
+        authorize=authorize_report,
+    ),
+]
+
+
+def database_version_lookup(key: str) -> Tuple[int, Optional[datetime]]:
+    from app.database import SessionLocal
+    from app.services.resource_versions import get_version
+
+    with SessionLocal() as session:
+        return get_version(session.connection(), key)
+
+
+@functools.lru_cache(maxsize=1)
+def _etag_secret() -> bytes:
+    # Without SECRET_KEY tags are only stable within this process, which costs
+    # revalidations across workers but never lets a client forge one.
+    return os.getenv("SECRET_KEY", "").encode() or os.urandom(32)
+
+
+def make_etag(key: str, version: int, caller: Optional[str] = None) -> str:
+    """Keyed so a client cannot compute tags for versions it was never sent."""
+    digest = hmac.new(_etag_secret(), f"{key}:{version}:{caller or ''}".encode(), hashlib.sha256)
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(header: str, etag: str, exists: bool = True) -> bool:
+    """Weak comparison (RFC 9110 13.1.2) against an ``If-None-Match`` value.
+
+    ``*`` only matches when a representation is known to ``exist``.
+    """
+    if header.strip() == "*":
+        return exists
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+
+
+class ConditionalGetMiddleware:
+    """ETag/Last-Modified validators and ``Cache-Control`` for versioned routes.
+
+    For a GET or HEAD matching a policy, the resource's version counter is
+    looked up first; if the request's ``If-None-Match`` (or, without it,
+    ``If-Modified-Since``) still matches, a 304 is returned without calling
+    the endpoint, so neither its queries nor serialization run. A 304 needs
+    credentials that pass the policy's ``authorize`` check.
+    Otherwise the endpoint runs and successful responses get the validators
+    attached.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        policies: Sequence[CachePolicy] = DEFAULT_POLICIES,
+        lookup: VersionLookup = database_version_lookup,
+    ) -> None:
+        self.app = app
+        self.policies = list(policies)
+        self.lookup = lookup
+
+    def _match(self, path: str) -> Optional[Tuple[CachePolicy, Dict[str, str]]]:
+        for policy in self.policies:
+            match = policy.path.match(path)
+            if match:
+                return policy, match.groupdict()
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        matched = (
+            self._match(scope["path"])
+            if scope["type"] == "http" and scope["method"] in ("GET", "HEAD")
+            else None
+        )
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+
+        policy, params = matched
+        caller = user_key(scope)
+        if caller is None:
+            # Unauthenticated: the endpoint answers (401) and no validator is revealed.
+            await self.app(scope, receive, send)
+            return
+
+        key = policy.resource.format(**params)
+        # Read before the endpoint runs: a concurrent write can only make the
+        # ETag older than the body, which costs the client one extra fetch.
+        version, last_modified = await asyncio.to_thread(self.lookup, key)
+        etag = make_etag(key, version, caller if policy.private else None)
+        validators = [(b"etag", etag.encode()), (b"cache-control", policy.cache_control.encode())]
+        if last_modified is not None:
+            validators.append((
+                b"last-modified",
+                format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True).encode(),
+            ))
+        if policy.private:
+            validators.append((b"vary", b"Authorization"))
+
+        headers = dict(scope.get("headers", ()))
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1") or None
+        if_modified_since = headers.get(b"if-modified-since", b"").decode("latin-1") or None
+        if (
+            # A resource never written has no version and may not exist.
+            (if_none_match is not None and etag_matches(if_none_match, etag, version > 0))
+            or (
+                if_none_match is None
+                and if_modified_since is not None
+                and last_modified is not None
+                and not_modified_since(if_modified_since, last_modified)
+            )
+        ) and (policy.authorize is None or await asyncio.to_thread(policy.authorize, scope, params)):
+            conditional_responses.inc((policy.name, "not_modified"))
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        conditional_responses.inc((policy.name, "full"))
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                names = {name for name, _ in validators}
+                message = {
+                    **message,
+                    "headers": [
+                        (name, value) for name, value in message.get("headers", []) if name not in names
+                    ] + validators,
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,74 @@
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.services.health import HealthMonitor, health_monitor
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+LIVENESS_BODY = json.dumps(
+    {"status": "healthy", "message": "EPR Co-Pilot Backend is running"}
+).encode()
+
+
+class HealthCheckMiddleware:
+    """Serve /healthz and /readiness from memory ahead of the rest of the stack.
+
+    Register it last (outermost) so probes bypass rate limiting, auth, logging
+    and every other middleware. It also starts and stops the health monitor
+    with the ASGI lifespan.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        monitor: Optional[HealthMonitor] = None,
+        liveness_path: str = "/healthz",
+        readiness_path: str = "/readiness",
+    ) -> None:
+        self.app = app
+        self.monitor = monitor or health_monitor
+        self.liveness_path = liveness_path
+        self.readiness_path = readiness_path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, self._lifespan_receive(receive), send)
+            return
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            path = scope["path"]
+            if path == self.liveness_path:
+                await self._respond(send, 200, LIVENESS_BODY, scope["method"])
+                return
+            if path == self.readiness_path:
+                report = self.monitor.readiness()
+                status = 503 if report["status"] == "not_ready" else 200
+                await self._respond(send, status, json.dumps(report).encode(), scope["method"])
+                return
+        await self.app(scope, receive, send)
+
+    def _lifespan_receive(self, receive: Receive) -> Receive:
+        async def wrapped() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.monitor.start()
+            elif message["type"] == "lifespan.shutdown":
+                await self.monitor.stop()
+            return message
+
+        return wrapped
+
+    @staticmethod
+    async def _respond(send: Send, status: int, body: bytes, method: str) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"cache-control", b"no-store"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
@@ -0,0 +1,361 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.db_routing import user_key
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+HEADER = b"idempotency-key"
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+DEFAULT_PATHS = ("/api/products", "/api/reports/generate", "/payments/create-intent")
+MAX_KEY_LENGTH = 255
+IN_PROGRESS = "in_progress"
+DONE = "done"
+# Client errors that a retry with the same key can get past (fresh token,
+# rate limit window, conflict resolved); these are not stored.
+RETRYABLE_STATUSES = frozenset({401, 403, 408, 409, 425, 429})
+# Dropped from replays whose body was too large to store.
+BODY_HEADERS = frozenset({b"content-length", b"content-type", b"content-encoding"})
+
+# Each script acts only while the key still holds the exact in-progress record
+# this request claimed, so a request whose lock lapsed cannot overwrite or
+# delete the record of the duplicate that claimed the key after it.
+COMPLETE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Signing algorithms of the access tokens whose subject scopes the records.
+JWT_HASHES = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+idempotent_requests = registry.counter(
+    "http_idempotent_requests_total", "Requests carrying an Idempotency-Key by outcome", ("outcome",)
+)
+
+
+class IdempotencyStore:
+    """Redis records of ``{state, fingerprint[, owner | status, headers, body]}`` per caller and key.
+
+    ``claim`` returns the in-progress record it wrote as the owner's lock;
+    ``extend``, ``complete`` and ``release`` only act while that record is
+    still in place.
+    """
+
+    def __init__(self, client: Any = None, ttl: int = 86400, lock_ttl: int = 60) -> None:
+        self._client = client
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from app.services.redis_client import get_redis
+
+            self._client = get_redis()
+        return self._client
+
+    def claim(self, key: str, fingerprint: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Reserve ``key`` for this request.
+
+        Returns ``(lock, None)`` when claimed, or ``(None, record)`` with the
+        existing record when the key is already taken.
+        """
+        lock = json.dumps({"state": IN_PROGRESS, "fingerprint": fingerprint, "owner": uuid.uuid4().hex})
+        if self.client.set(key, lock, nx=True, ex=self.lock_ttl):
+            return lock, None
+        existing = self.client.get(key)
+        # Expired between SET and GET: let the caller retry the claim.
+        return None, json.loads(existing) if existing else {"state": IN_PROGRESS, "fingerprint": fingerprint}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(key)
+        return json.loads(raw) if raw else None
+
+    def extend(self, key: str, lock: str) -> bool:
+        """Push the lock's expiry out by ``lock_ttl``; False once it is no longer ours."""
+        return bool(self.client.eval(EXTEND_SCRIPT, 1, key, lock, self.lock_ttl))
+
+    def complete(
+        self,
+        key: str,
+        lock: str,
+        fingerprint: str,
+        status: int,
+        headers: List[Tuple[bytes, bytes]],
+        body: Optional[bytes],
+    ) -> bool:
+        """Store the response; ``body=None`` records the outcome of a response too large to keep."""
+        record = json.dumps({
+            "state": DONE,
+            "fingerprint": fingerprint,
+            "status": status,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+            "body": base64.b64encode(body).decode() if body is not None else None,
+        })
+        return bool(self.client.eval(COMPLETE_SCRIPT, 1, key, lock, record, self.ttl))
+
+    def release(self, key: str, lock: str) -> None:
+        self.client.eval(RELEASE_SCRIPT, 1, key, lock)
+
+
+def _json_response(status: int, detail: str, extra: Sequence[Tuple[bytes, bytes]] = ()) -> List[Message]:
+    body = json.dumps({"detail": detail}).encode()
+    return [
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *extra],
+        },
+        {"type": "http.response.body", "body": body},
+    ]
+
+
+def _b64decode(segment: bytes) -> bytes:
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def token_subject(scope: Scope) -> Optional[str]:
+    """The ``sub`` of a bearer token signed with ``SECRET_KEY`` and not expired, else None."""
+    secret = os.getenv("SECRET_KEY")
+    authorization = dict(scope.get("headers", ())).get(b"authorization", b"")
+    scheme, _, token = authorization.partition(b" ")
+    if not secret or scheme.lower() != b"bearer":
+        return None
+    try:
+        header, payload, signature = token.strip().split(b".")
+        digest = JWT_HASHES.get(json.loads(_b64decode(header)).get("alg"))
+        if digest is None:
+            return None
+        expected = hmac.new(secret.encode(), header + b"." + payload, digest).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, binascii.Error, AttributeError):
+        return None
+    if not isinstance(claims, dict) or not claims.get("sub"):
+        return None
+    if isinstance(claims.get("exp"), (int, float)) and claims["exp"] < time.time():
+        return None
+    return str(claims["sub"])
+
+
+def caller_key(scope: Scope) -> Optional[str]:
+    """Key records by the authenticated subject, so a refreshed token keeps its records.
+
+    Falls back to the credentials themselves when the token cannot be verified.
+    """
+    subject = token_subject(scope)
+    if subject is not None:
+        return "sub-" + hashlib.blake2b(subject.encode(), digest_size=12).hexdigest()
+    return user_key(scope)
+
+
+def _is_final(status: int) -> bool:
+    return 200 <= status < 300 or (400 <= status < 500 and status not in RETRYABLE_STATUSES)
+
+
+class IdempotencyMiddleware:
+    """Replay stored responses for retried mutating requests.
+
+    A request carrying ``Idempotency-Key`` on one of ``paths`` is fingerprinted
+    (method, path, query string, body hash) and claimed in Redis under the
+    caller's token subject and key. The first request runs, renewing its claim
+    while it does, and if its outcome is final (2xx, or a 4xx outside
+    ``RETRYABLE_STATUSES``) the response is stored for ``IDEMPOTENCY_TTL``
+    seconds; retries get that response back with
+    ``Idempotent-Replayed: true`` instead of executing again. Bodies over
+    ``max_body_size`` are not kept: retries get the original status and
+    headers with a short JSON note instead. A duplicate that arrives while the
+    first is still running waits for it up to ``wait_timeout`` seconds, then
+    gets a 409. Reusing a key with a different request is rejected with a 422.
+
+    Redis errors disable the check for that request rather than failing it.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        store: Optional[IdempotencyStore] = None,
+        paths: Sequence[str] = DEFAULT_PATHS,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.1,
+        max_body_size: int = 1024 * 1024,
+    ) -> None:
+        self.app = app
+        self.store = store or IdempotencyStore(
+            ttl=int(os.getenv("IDEMPOTENCY_TTL", "86400")),
+            lock_ttl=int(os.getenv("IDEMPOTENCY_LOCK_TTL", "60")),
+        )
+        self.paths = tuple(paths)
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.max_body_size = max_body_size
+
+    def _applies(self, scope: Scope) -> bool:
+        return (
+            scope["type"] == "http"
+            and scope["method"] in MUTATING_METHODS
+            and scope["path"].startswith(self.paths)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        idempotency_key = dict(scope.get("headers", ())).get(HEADER) if self._applies(scope) else None
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            for message in _json_response(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"):
+                await send(message)
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if message["type"] != "http.request" or not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(
+            b"\0".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+        key = f"idem:{caller_key(scope) or 'anonymous'}:{hashlib.sha256(idempotency_key).hexdigest()}"
+
+        replayed = False
+
+        async def replay_receive() -> Message:
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        try:
+            lock, existing = await self._claim(key, fingerprint)
+        except Exception as exc:
+            logger.warning("Idempotency store unavailable, executing without it: %s", exc)
+            idempotent_requests.inc(("unchecked",))
+            await self.app(scope, replay_receive, send)
+            return
+
+        if lock is None:
+            for message in self._respond_existing(existing or {}, fingerprint):
+                await send(message)
+            return
+
+        idempotent_requests.inc(("executed",))
+        await self._execute(scope, replay_receive, send, key, lock, fingerprint)
+
+    async def _claim(self, key: str, fingerprint: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Claim ``key`` or return the finished record, waiting out a concurrent duplicate."""
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            lock, existing = await asyncio.to_thread(self.store.claim, key, fingerprint)
+            if existing is None or existing["state"] == DONE or existing["fingerprint"] != fingerprint:
+                return lock, existing
+            if time.monotonic() >= deadline:
+                return lock, existing
+            await asyncio.sleep(self.poll_interval)
+
+    def _respond_existing(self, existing: Dict[str, Any], fingerprint: str) -> List[Message]:
+        if existing["fingerprint"] != fingerprint:
+            idempotent_requests.inc(("mismatch",))
+            return _json_response(422, "Idempotency-Key was already used with a different request")
+        if existing["state"] != DONE:
+            idempotent_requests.inc(("conflict",))
+            return _json_response(
+                409, "A request with this Idempotency-Key is still being processed", [(b"retry-after", b"1")]
+            )
+        idempotent_requests.inc(("replayed",))
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in existing["headers"]]
+        if existing["body"] is None:
+            note = _json_response(existing["status"], "Request already completed; its response is too large to replay")
+            kept = [(name, value) for name, value in headers if name.lower() not in BODY_HEADERS]
+            note[0]["headers"] = note[0]["headers"] + kept + [(b"idempotent-replayed", b"true")]
+            return note
+        return [
+            {"type": "http.response.start", "status": existing["status"],
+             "headers": headers + [(b"idempotent-replayed", b"true")]},
+            {"type": "http.response.body", "body": base64.b64decode(existing["body"])},
+        ]
+
+    async def _keep_claimed(self, key: str, lock: str) -> None:
+        """Renew the claim while the request runs so a slow request is not executed twice."""
+        while True:
+            await asyncio.sleep(self.store.lock_ttl / 3)
+            try:
+                if not await asyncio.to_thread(self.store.extend, key, lock):
+                    return
+            except Exception:
+                logger.warning("Could not extend idempotency claim for %s", key, exc_info=True)
+
+    async def _execute(
+        self, scope: Scope, receive: Receive, send: Send, key: str, lock: str, fingerprint: str
+    ) -> None:
+        start: Optional[Message] = None
+        parts: List[bytes] = []
+        size = 0
+        storable = True
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, size, storable
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body" and storable:
+                size += len(message.get("body", b""))
+                if size > self.max_body_size:
+                    storable = False
+                    parts.clear()
+                else:
+                    parts.append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        keep_claimed = asyncio.ensure_future(self._keep_claimed(key, lock))
+        try:
+            await self.app(scope, receive, send_wrapper)
+            completed = True
+        finally:
+            keep_claimed.cancel()
+            try:
+                if completed and start is not None and _is_final(start["status"]):
+                    # An oversized body is recorded without it, so the retry
+                    # learns the outcome instead of creating a duplicate.
+                    await asyncio.to_thread(
+                        self.store.complete, key, lock, fingerprint, start["status"],
+                        list(start.get("headers", [])), b"".join(parts) if storable else None,
+                    )
+                else:
+                    # Failed or retryable: let the client's retry execute again.
+                    await asyncio.to_thread(self.store.release, key, lock)
+            except Exception:
+                logger.warning("Could not record idempotent response for %s", key, exc_info=True)
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from app.services import query_stats
+from app.services.metrics import (
+    Registry,
+    db_queries_per_request,
+    db_time_per_request,
+    http_request_duration,
+    http_requests_in_flight,
+    registry,
+)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+UNMATCHED_ROUTE = "<unmatched>"
+_STATUS_LABELS = {code: str(code) for code in range(100, 600)}
+
+
+class PrometheusMiddleware:
+    """Record per-route latency and SQL usage; serve the registry on /metrics.
+
+    Routes are labelled with their template (``/api/products/{product_id}``),
+    read from the ``route`` FastAPI stores in the scope, so label cardinality
+    stays bounded. Requests that match no route share one label.
+    """
+
+    def __init__(self, app: Any, metrics_path: str = "/metrics", metrics_registry: Registry = registry) -> None:
+        self.app = app
+        self.metrics_path = metrics_path
+        self.registry = metrics_registry
+        self.in_flight = 0
+        http_requests_in_flight.callback = lambda: {(): float(self.in_flight)}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == self.metrics_path:
+            await self._serve_metrics(send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+        token = query_stats.begin()
+        self.in_flight += 1
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight -= 1
+            stats = query_stats.end(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            http_request_duration.observe(
+                elapsed, (scope["method"], template, _STATUS_LABELS.get(status) or str(status))
+            )
+            if stats is not None and stats.count:
+                db_queries_per_request.observe(stats.count, (template,))
+                db_time_per_request.observe(stats.duration, (template,))
+
+    async def _serve_metrics(self, send: Send) -> None:
+        # Callback gauges may query Redis; keep that off the event loop.
+        body = (await asyncio.to_thread(self.registry.render)).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
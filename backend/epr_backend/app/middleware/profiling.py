@@ -0,0 +1,139 @@
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.services import query_stats
+from app.services.profiling import (
+    RequestTrace,
+    TraceBuffer,
+    admin_token_matches,
+    format_statements,
+    trace_buffer,
+)
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+
+
+class ProfilingMiddleware:
+    """Opt-in request profiling plus slow-request capture.
+
+    A request is profiled with pyinstrument when it carries ``X-Profile: 1``
+    and a valid ``X-Profile-Token`` (``PROFILING_ADMIN_TOKEN``), or when it is
+    picked by ``PROFILING_SAMPLE_RATE``. SQL statements are recorded for every
+    request; the trace is kept only if the request was profiled or exceeded
+    ``PROFILING_SLOW_THRESHOLD_MS``. Profiled responses carry ``X-Profile-Id``.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        buffer: Optional[TraceBuffer] = None,
+        slow_threshold_ms: Optional[float] = None,
+        sample_rate: Optional[float] = None,
+    ) -> None:
+        self.app = app
+        self.buffer = buffer or trace_buffer
+        self.slow_threshold_ms = (
+            slow_threshold_ms
+            if slow_threshold_ms is not None
+            else float(os.getenv("PROFILING_SLOW_THRESHOLD_MS", "250"))
+        )
+        self.sample_rate = (
+            sample_rate if sample_rate is not None else float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+        )
+
+    def _should_profile(self, scope: Scope) -> Optional[str]:
+        headers = dict(scope.get("headers") or ())
+        if headers.get(PROFILE_HEADER) in (b"1", b"true"):
+            token = headers.get(PROFILE_TOKEN_HEADER, b"").decode("latin-1")
+            if admin_token_matches(token):
+                return "requested"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    @staticmethod
+    def _start_profiler() -> Any:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; capturing SQL only")
+            return None
+        profiler = Profiler(interval=0.001, async_mode="enabled")
+        try:
+            profiler.start()
+        except RuntimeError:
+            # Another request on this thread is already being profiled.
+            return None
+        return profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reason = self._should_profile(scope)
+        profiler = self._start_profiler() if reason else None
+        trace_id = self.buffer.next_id() if reason else None
+        stats, token = query_stats.join()
+        owns_statements = stats.statements is None
+        if owns_statements:
+            stats.statements = []
+        status = 500
+        started_at = time.time()
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace_id is not None:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-id", trace_id.encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            profile_text = None
+            if profiler is not None:
+                profiler.stop()
+                profile_text = profiler.output_text(unicode=False, color=False)
+            statements = list(stats.statements or [])
+            if owns_statements:
+                stats.statements = None
+            if token is not None:
+                query_stats.end(token)
+
+            if reason is None and duration_ms >= self.slow_threshold_ms:
+                reason = "slow"
+                trace_id = self.buffer.next_id()
+            if reason is not None and trace_id is not None:
+                route = scope.get("route")
+                self.buffer.add(RequestTrace(
+                    id=trace_id,
+                    method=scope["method"],
+                    path=scope["path"],
+                    route=getattr(route, "path", None),
+                    status=status,
+                    duration_ms=round(duration_ms, 2),
+                    started_at=started_at,
+                    reason=reason,
+                    sql_count=len(statements),
+                    sql_time_ms=round(sum(s for _, s in statements) * 1000, 3),
+                    sql=format_statements(statements),
+                    profile=profile_text,
+                ))
@@ -0,0 +1,69 @@
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.services import query_stats
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+DEV_ENVIRONMENTS = ("development", "staging", "test")
+
+
+class QueryCountMiddleware:
+    """Development aid: expose per-request SQL usage as response headers.
+
+    Adds ``X-Query-Count`` and ``X-Query-Time-Ms``; when one statement shape
+    runs ``repeat_threshold`` times or more in a single request (the N+1
+    signature) it also adds ``X-Query-Repeated`` and logs the statement.
+    Inert unless ``ENVIRONMENT`` names a development environment; unset
+    counts as production.
+    """
+
+    def __init__(self, app: Any, repeat_threshold: int = 5, enabled: Optional[bool] = None) -> None:
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        self.enabled = (
+            enabled
+            if enabled is not None
+            else os.getenv("ENVIRONMENT", "production") in DEV_ENVIRONMENTS
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = query_stats.join()
+        owns_statements = stats.statements is None
+        if owns_statements:
+            stats.statements = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                statements = [statement for statement, _ in stats.statements or ()]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(stats.count).encode()))
+                headers.append((b"x-query-time-ms", f"{stats.duration * 1000:.2f}".encode()))
+                repeated = query_stats.repeated_shapes(statements, self.repeat_threshold)
+                if repeated:
+                    headers.append((b"x-query-repeated", str(max(repeated.values())).encode()))
+                    for shape, count in repeated.items():
+                        logger.warning(
+                            "Possible N+1 on %s %s: %d x %s",
+                            scope["method"], scope["path"], count, shape[:300],
+                        )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if owns_statements:
+                stats.statements = None
+            if token is not None:
+                query_stats.end(token)
@@ -1,33 +1,117 @@
+import asyncio
+import logging
+import os
 import time
+import uuid
 from collections import defaultdict, deque
-from typing import Dict, Deque
+from typing import Any, Dict, Deque, Iterable, Optional
 from fastapi import Request, Response, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+
+logger = logging.getLogger(__name__)
+
+# Sliding-window log in one round trip: drop expired hits, refuse at the limit, else record this hit.
+SLIDING_WINDOW_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1] - ARGV[2])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(ARGV[2] * 1000))
+return 1
+"""
+
+
+class MemoryRateLimitBackend:
+    """Per-process sliding window; with several workers each one counts separately."""
+
+    def __init__(self) -> None:
+        self.clients: Dict[str, Deque[float]] = defaultdict(deque)
+
+    async def hit(self, key: str, calls: int, period: int) -> bool:
+        current_time = time.time()
+        client_calls = self.clients[key]
+        while client_calls and client_calls[0] <= current_time - period:
+            client_calls.popleft()
+        if len(client_calls) >= calls:
+            return False
+        client_calls.append(current_time)
+        return True
+
+
+class RedisRateLimitBackend:
+    """Sliding window shared by every worker and replica through Redis.
+
+    If Redis is unreachable the limiter falls back to per-process counting
+    rather than rejecting or waving through all traffic, and stays on the
+    fallback for ``retry_interval`` seconds so an outage does not cost every
+    request a Redis timeout.
+    """
+
+    def __init__(self, client: Any = None, prefix: str = "ratelimit", retry_interval: float = 5.0) -> None:
+        self._client = client
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self.fallback = MemoryRateLimitBackend()
+        self._script: Any = None
+        self._retry_at = 0.0
+
+    def _hit(self, key: str, calls: int, period: int) -> bool:
+        if self._script is None:
+            if self._client is None:
+                from app.services.redis_client import get_redis
+
+                self._client = get_redis()
+            self._script = self._client.register_script(SLIDING_WINDOW_SCRIPT)
+        allowed = self._script(
+            keys=[f"{self.prefix}:{key}"], args=[time.time(), period, calls, uuid.uuid4().hex]
+        )
+        return bool(int(allowed))
+
+    async def hit(self, key: str, calls: int, period: int) -> bool:
+        if time.monotonic() < self._retry_at:
+            return await self.fallback.hit(key, calls, period)
+        try:
+            return await asyncio.to_thread(self._hit, key, calls, period)
+        except Exception as exc:
+            logger.warning("Rate limiter falling back to in-process counting: %s", exc)
+            self._retry_at = time.monotonic() + self.retry_interval
+            return await self.fallback.hit(key, calls, period)
+
+
+def backend_from_env() -> Any:
+    if os.getenv("RATE_LIMIT_BACKEND", "memory").lower() == "redis":
+        return RedisRateLimitBackend()
+    return MemoryRateLimitBackend()
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, calls: int = 50, period: int = 60):
+    def __init__(
+        self,
+        app: Any,
+        calls: int = 50,
+        period: int = 60,
+        exempt_paths: Iterable[str] = ("/healthz", "/readiness", "/metrics"),
+        backend: Optional[Any] = None,
+    ) -> None:
         super().__init__(app)
         self.calls = calls
         self.period = period
-        self.clients: Dict[str, Deque[float]] = defaultdict(deque)
+        self.exempt_paths = frozenset(exempt_paths)
+        self.backend = backend or backend_from_env()
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if request.url.path in self.exempt_paths:
+            return await call_next(request)
 
-    async def dispatch(self, request: Request, call_next):
         client_ip = request.client.host if request.client else "unknown"
-        current_time = time.time()
-        
-        client_calls = self.clients[client_ip]
-        
-        while client_calls and client_calls[0] <= current_time - self.period:
-            client_calls.popleft()
-        
-        if len(client_calls) >= self.calls:
+
+        if not await self.backend.hit(client_ip, self.calls, self.period):
             return Response(
                 content="Rate limit exceeded. Too many requests.",
                 status_code=429,
                 headers={"Retry-After": str(self.period)}
             )
-        
-        client_calls.append(current_time)
+
         response = await call_next(request)
         return response
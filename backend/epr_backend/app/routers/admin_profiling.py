@@ -0,0 +1,31 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from app.services.profiling import admin_token_matches, trace_buffer
+
+router = APIRouter(prefix="/api/admin/profiles", tags=["admin"])
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not admin_token_matches(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/", dependencies=[Depends(require_admin_token)])
+def list_traces(limit: int = Query(50, ge=1, le=500)) -> List[Dict[str, Any]]:
+    """Most recent slow or profiled requests, newest first."""
+    return [trace.summary() for trace in trace_buffer.list(limit)]
+
+
+@router.get("/{trace_id}", dependencies=[Depends(require_admin_token)])
+def get_trace(trace_id: str) -> Dict[str, Any]:
+    trace = trace_buffer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {**trace.summary(), "sql": trace.sql, "profile": trace.profile}
+
+
+@router.delete("/", status_code=204, dependencies=[Depends(require_admin_token)])
+def clear_traces() -> None:
+    trace_buffer.clear()
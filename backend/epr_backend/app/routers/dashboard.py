@@ -0,0 +1,50 @@
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_user
+from app.database import get_db
+from app.schemas import User
+from app.services.compliance_summary import get_summary, period_of, refresh_organization_summary
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+
+@router.get("/summary")
+def get_dashboard_summary(
+    period: Optional[str] = Query(None, pattern=r"^\d{4}-Q[1-4]$", description="Quarter, e.g. 2024-Q3"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """Dashboard totals for one quarter, read from the materialized summary row.
+
+    Stays a pure read (replica-eligible and sheddable): an organization with
+    no row yet gets zeros and ``updated_at: null`` while a worker computes it.
+    """
+    period = period or period_of()
+    summary = get_summary(db, current_user.organization_id, period)
+    if summary is None and period == period_of():
+        # First visit before any write or scheduled refresh covered this organization.
+        try:
+            refresh_organization_summary.delay(current_user.organization_id)
+        except Exception:
+            logger.warning("Could not queue summary refresh for %s", current_user.organization_id, exc_info=True)
+    summary = summary or {}
+    return {
+        "organization_id": current_user.organization_id,
+        "period": period,
+        "total_products": summary.get("product_count", 0),
+        "material_tonnes": round(summary.get("material_kg", 0.0) / 1000, 3),
+        "fees_due": round(summary.get("fees_due", 0.0), 2),
+        "reports": {
+            "total": summary.get("reports_total", 0),
+            "completed": summary.get("reports_completed", 0),
+            "pending": summary.get("reports_pending", 0),
+            "failed": summary.get("reports_failed", 0),
+        },
+        "updated_at": summary.get("updated_at"),
+    }
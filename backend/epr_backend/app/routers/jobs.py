@@ -0,0 +1,32 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.auth import get_current_user
+from app.schemas import User
+from app.services.job_status import JobStatusStore
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+MAX_IDS_PER_REQUEST = 100
+
+job_status_store = JobStatusStore()
+
+
+@router.get("/status")
+def get_job_statuses(
+    ids: List[str] = Query(..., description="Job ids to look up"),
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Return the status of many jobs in one round trip, without touching the database."""
+    if len(ids) > MAX_IDS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IDS_PER_REQUEST} ids per request")
+    statuses = job_status_store.get_many(ids)
+    return {
+        job_id: (
+            {key: status[key] for key in ("state", "percent", "error", "updated_at") if key in status}
+            if status is not None and status.get("organization_id") == current_user.organization_id
+            else None
+        )
+        for job_id, status in statuses.items()
+    }
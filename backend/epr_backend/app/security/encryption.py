@@ -0,0 +1,521 @@
+"""Field-level envelope encryption.
+
+Every organization owns a random 256-bit data key. Data keys are stored
+wrapped (AES-GCM encrypted) by the process master key and are unwrapped at
+most once per TTL window, so bulk operations such as report generation and
+exports pay for key handling once per organization instead of once per field.
+
+The active key version is cached with the same TTL, so encrypting does not
+query the key store per field either. After a rotation elsewhere, a process
+may keep encrypting under the previous version for up to one TTL; those
+tokens stay readable and the next re-encryption pass picks them up.
+
+Ciphertext tokens are url-safe base64 of::
+
+    format (1 byte) | key version (4 bytes, big endian) | nonce (12 bytes) | ciphertext+tag
+
+The organization id is bound to every token as AES-GCM associated data, so a
+value copied between organizations fails to decrypt.
+"""
+
+import base64
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    LargeBinary,
+    String,
+    Table,
+    bindparam,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.services.tasks import task
+
+TOKEN_FORMAT = 1
+NONCE_SIZE = 12
+KEY_SIZE = 32
+GLOBAL_KEY_ID = "_global"
+
+_HEADER = struct.Struct(">BI")
+
+
+class EncryptionError(Exception):
+    pass
+
+
+class KeyVersionConflict(EncryptionError):
+    """Another process stored this key version first."""
+
+
+organization_data_keys = Table(
+    "organization_data_keys",
+    Base.metadata,
+    Column("organization_id", String, primary_key=True),
+    Column("version", Integer, primary_key=True),
+    Column("wrapped_key", LargeBinary, nullable=False),
+    Column("active", Integer, nullable=False, default=1),
+    Column("created_at", DateTime, nullable=False),
+)
+
+
+class DataKeyStore(Protocol):
+    def get_active(self, organization_id: str) -> Optional[Tuple[int, bytes]]: ...
+
+    def get(self, organization_id: str, version: int) -> Optional[bytes]: ...
+
+    def put(self, organization_id: str, version: int, wrapped_key: bytes) -> None: ...
+
+
+class InMemoryDataKeyStore:
+    """Process-local key store, used by tests and single-process tooling."""
+
+    def __init__(self) -> None:
+        self._keys: Dict[Tuple[str, int], bytes] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_active(self, organization_id: str) -> Optional[Tuple[int, bytes]]:
+        version = self._active.get(organization_id)
+        if version is None:
+            return None
+        return version, self._keys[(organization_id, version)]
+
+    def get(self, organization_id: str, version: int) -> Optional[bytes]:
+        return self._keys.get((organization_id, version))
+
+    def put(self, organization_id: str, version: int, wrapped_key: bytes) -> None:
+        with self._lock:
+            if (organization_id, version) in self._keys:
+                raise KeyVersionConflict(f"Key version {version} exists for {organization_id}")
+            self._keys[(organization_id, version)] = wrapped_key
+            self._active[organization_id] = version
+
+
+class SQLDataKeyStore:
+    """Wrapped data keys persisted in the ``organization_data_keys`` table."""
+
+    def __init__(self, session_factory: Callable[[], Session]) -> None:
+        self.session_factory = session_factory
+
+    def get_active(self, organization_id: str) -> Optional[Tuple[int, bytes]]:
+        table = organization_data_keys
+        with self.session_factory() as session:
+            row = session.execute(
+                select(table.c.version, table.c.wrapped_key)
+                .where(table.c.organization_id == organization_id, table.c.active == 1)
+                .order_by(table.c.version.desc())
+                .limit(1)
+            ).first()
+        return (row.version, row.wrapped_key) if row else None
+
+    def get(self, organization_id: str, version: int) -> Optional[bytes]:
+        table = organization_data_keys
+        with self.session_factory() as session:
+            return session.execute(
+                select(table.c.wrapped_key).where(
+                    table.c.organization_id == organization_id,
+                    table.c.version == version,
+                )
+            ).scalar()
+
+    def put(self, organization_id: str, version: int, wrapped_key: bytes) -> None:
+        table = organization_data_keys
+        with self.session_factory() as session:
+            try:
+                session.execute(
+                    update(table)
+                    .where(table.c.organization_id == organization_id)
+                    .values(active=0)
+                )
+                session.execute(
+                    table.insert().values(
+                        organization_id=organization_id,
+                        version=version,
+                        wrapped_key=wrapped_key,
+                        active=1,
+                        created_at=datetime.now(timezone.utc),
+                    )
+                )
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                raise KeyVersionConflict(f"Key version {version} exists for {organization_id}")
+
+
+class DataKeyCache:
+    """Bounded LRU of unwrapped data keys and active versions with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, AESGCM]]" = OrderedDict()
+        self._active: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, int]) -> Optional[AESGCM]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[str, int], cipher: AESGCM) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, cipher)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_active(self, organization_id: str) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._active.get(organization_id)
+            if entry is None or entry[0] <= now:
+                return None
+            self._active.move_to_end(organization_id)
+            return entry[1]
+
+    def put_active(self, organization_id: str, version: int) -> None:
+        with self._lock:
+            self._active[organization_id] = (time.monotonic() + self.ttl, version)
+            self._active.move_to_end(organization_id)
+            while len(self._active) > self.max_entries:
+                self._active.popitem(last=False)
+
+    def invalidate(self, organization_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == organization_id]:
+                del self._entries[key]
+            self._active.pop(organization_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._active.clear()
+
+
+def load_master_key() -> bytes:
+    """Read the master key from ``ENCRYPTION_MASTER_KEY`` (url-safe base64).
+
+    Falls back to a key derived from ``SECRET_KEY`` for development setups.
+    This runs once per process, never per field.
+    """
+    encoded = os.getenv("ENCRYPTION_MASTER_KEY")
+    if encoded:
+        key = base64.urlsafe_b64decode(encoded)
+        if len(key) != KEY_SIZE:
+            raise EncryptionError("ENCRYPTION_MASTER_KEY must decode to 32 bytes")
+        return key
+    secret = os.getenv("SECRET_KEY")
+    if not secret:
+        raise EncryptionError("ENCRYPTION_MASTER_KEY or SECRET_KEY must be set")
+    return hashlib.pbkdf2_hmac(
+        "sha256", secret.encode(), b"epr-copilot-master-key", 200_000, KEY_SIZE
+    )
+
+
+class EnvelopeEncryptor:
+    def __init__(
+        self,
+        master_key: bytes,
+        store: Optional[DataKeyStore] = None,
+        cache: Optional[DataKeyCache] = None,
+    ) -> None:
+        self._master = AESGCM(master_key)
+        self.store: DataKeyStore = store if store is not None else InMemoryDataKeyStore()
+        self.cache = cache if cache is not None else DataKeyCache()
+        self._create_lock = threading.Lock()
+
+    def _wrap(self, organization_id: str, data_key: bytes) -> bytes:
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + self._master.encrypt(nonce, data_key, organization_id.encode())
+
+    def _unwrap(self, organization_id: str, wrapped_key: bytes) -> bytes:
+        try:
+            return self._master.decrypt(
+                wrapped_key[:NONCE_SIZE], wrapped_key[NONCE_SIZE:], organization_id.encode()
+            )
+        except InvalidTag:
+            raise EncryptionError(f"Cannot unwrap data key for {organization_id}")
+
+    def _cipher(self, organization_id: str, version: int, wrapped_key: bytes) -> AESGCM:
+        cipher = self.cache.get((organization_id, version))
+        if cipher is None:
+            cipher = AESGCM(self._unwrap(organization_id, wrapped_key))
+            self.cache.put((organization_id, version), cipher)
+        return cipher
+
+    def _active_cipher(self, organization_id: str) -> Tuple[int, AESGCM]:
+        version = self.cache.get_active(organization_id)
+        if version is not None:
+            return version, self._cipher_for_version(organization_id, version)
+        active = self.store.get_active(organization_id)
+        if active is None:
+            with self._create_lock:
+                active = self.store.get_active(organization_id)
+                if active is None:
+                    return self._create_key(organization_id, version=1)
+        version, wrapped_key = active
+        self.cache.put_active(organization_id, version)
+        return version, self._cipher(organization_id, version, wrapped_key)
+
+    def _cipher_for_version(self, organization_id: str, version: int) -> AESGCM:
+        cipher = self.cache.get((organization_id, version))
+        if cipher is not None:
+            return cipher
+        wrapped_key = self.store.get(organization_id, version)
+        if wrapped_key is None:
+            raise EncryptionError(f"Unknown key version {version} for {organization_id}")
+        return self._cipher(organization_id, version, wrapped_key)
+
+    def _create_key(self, organization_id: str, version: int) -> Tuple[int, AESGCM]:
+        """Store a new key version; if another process won the race, use its key instead."""
+        data_key = AESGCM.generate_key(bit_length=KEY_SIZE * 8)
+        try:
+            self.store.put(organization_id, version, self._wrap(organization_id, data_key))
+        except KeyVersionConflict:
+            active = self.store.get_active(organization_id)
+            if active is None:
+                raise
+            version, wrapped_key = active
+            self.cache.put_active(organization_id, version)
+            return version, self._cipher(organization_id, version, wrapped_key)
+        cipher = AESGCM(data_key)
+        self.cache.put((organization_id, version), cipher)
+        self.cache.put_active(organization_id, version)
+        return version, cipher
+
+    def rotate_key(self, organization_id: str) -> int:
+        """Create and activate a new data key version; old versions stay readable.
+
+        Concurrent rotations of one organization create a single new version.
+        """
+        with self._create_lock:
+            active = self.store.get_active(organization_id)
+            version = active[0] + 1 if active else 1
+            return self._create_key(organization_id, version)[0]
+
+    def active_version(self, organization_id: str) -> int:
+        return self._active_cipher(organization_id)[0]
+
+    def encrypt_many(
+        self, values: Iterable[Optional[str]], organization_id: str = GLOBAL_KEY_ID
+    ) -> List[Optional[str]]:
+        version, cipher = self._active_cipher(organization_id)
+        header = _HEADER.pack(TOKEN_FORMAT, version)
+        aad = organization_id.encode()
+        tokens: List[Optional[str]] = []
+        for value in values:
+            if value is None:
+                tokens.append(None)
+                continue
+            nonce = os.urandom(NONCE_SIZE)
+            payload = header + nonce + cipher.encrypt(nonce, value.encode(), aad)
+            tokens.append(base64.urlsafe_b64encode(payload).decode())
+        return tokens
+
+    def decrypt_many(
+        self, tokens: Iterable[Optional[str]], organization_id: str = GLOBAL_KEY_ID
+    ) -> List[Optional[str]]:
+        aad = organization_id.encode()
+        ciphers: Dict[int, AESGCM] = {}
+        values: List[Optional[str]] = []
+        for token in tokens:
+            if token is None:
+                values.append(None)
+                continue
+            fmt, version, nonce, ciphertext = _parse_token(token)
+            if fmt != TOKEN_FORMAT:
+                raise EncryptionError(f"Unsupported token format {fmt}")
+            cipher = ciphers.get(version)
+            if cipher is None:
+                cipher = ciphers[version] = self._cipher_for_version(organization_id, version)
+            try:
+                values.append(cipher.decrypt(nonce, ciphertext, aad).decode())
+            except InvalidTag:
+                raise EncryptionError("Ciphertext failed authentication")
+        return values
+
+    def encrypt(self, value: str, organization_id: str = GLOBAL_KEY_ID) -> str:
+        token = self.encrypt_many([value], organization_id)[0]
+        assert token is not None
+        return token
+
+    def decrypt(self, token: str, organization_id: str = GLOBAL_KEY_ID) -> str:
+        value = self.decrypt_many([token], organization_id)[0]
+        assert value is not None
+        return value
+
+
+def _parse_token(token: str) -> Tuple[int, int, bytes, bytes]:
+    try:
+        raw = base64.urlsafe_b64decode(token)
+    except (ValueError, TypeError):
+        raise EncryptionError("Malformed ciphertext token")
+    if len(raw) < _HEADER.size + NONCE_SIZE + 16:
+        raise EncryptionError("Malformed ciphertext token")
+    fmt, version = _HEADER.unpack_from(raw)
+    body = raw[_HEADER.size:]
+    return fmt, version, body[:NONCE_SIZE], body[NONCE_SIZE:]
+
+
+def token_key_version(token: str) -> int:
+    return _parse_token(token)[1]
+
+
+_encryptor: Optional[EnvelopeEncryptor] = None
+_encryptor_lock = threading.Lock()
+
+
+def get_encryptor() -> EnvelopeEncryptor:
+    global _encryptor
+    if _encryptor is None:
+        with _encryptor_lock:
+            if _encryptor is None:
+                from app.database import SessionLocal
+
+                _encryptor = EnvelopeEncryptor(
+                    load_master_key(),
+                    store=SQLDataKeyStore(SessionLocal),
+                    cache=DataKeyCache(
+                        max_entries=int(os.getenv("ENCRYPTION_KEY_CACHE_SIZE", "1024")),
+                        ttl=float(os.getenv("ENCRYPTION_KEY_CACHE_TTL", "300")),
+                    ),
+                )
+    return _encryptor
+
+
+def set_encryptor(encryptor: Optional[EnvelopeEncryptor]) -> None:
+    global _encryptor
+    _encryptor = encryptor
+
+
+def encrypt_data(data: str, organization_id: str = GLOBAL_KEY_ID) -> str:
+    return get_encryptor().encrypt(data, organization_id)
+
+
+def decrypt_data(token: str, organization_id: str = GLOBAL_KEY_ID) -> str:
+    return get_encryptor().decrypt(token, organization_id)
+
+
+def encrypt_many(
+    values: Sequence[Optional[str]], organization_id: str = GLOBAL_KEY_ID
+) -> List[Optional[str]]:
+    return get_encryptor().encrypt_many(values, organization_id)
+
+
+def decrypt_many(
+    tokens: Sequence[Optional[str]], organization_id: str = GLOBAL_KEY_ID
+) -> List[Optional[str]]:
+    return get_encryptor().decrypt_many(tokens, organization_id)
+
+
+def reencrypt_table(
+    session: Session,
+    table: Table,
+    columns: Sequence[str],
+    organization_id: str,
+    chunk_size: int = 500,
+    encryptor: Optional[EnvelopeEncryptor] = None,
+) -> int:
+    """Re-encrypt ``columns`` of an organization's rows under its active key.
+
+    Rows are walked in primary-key order with keyset pagination and committed
+    one chunk at a time, so the job can be interrupted and resumed safely:
+    rows already on the active key version are skipped. Returns the number of
+    rows rewritten.
+    """
+    encryptor = encryptor or get_encryptor()
+    (pk,) = table.primary_key.columns
+    active_version = encryptor.active_version(organization_id)
+    rewritten = 0
+    last_pk = None
+    while True:
+        query = (
+            select(pk, *(table.c[name] for name in columns))
+            .where(table.c.organization_id == organization_id)
+            .order_by(pk)
+            .limit(chunk_size)
+        )
+        if last_pk is not None:
+            query = query.where(pk > last_pk)
+        rows = session.execute(query).all()
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        updates = []
+        for row in rows:
+            values = list(row[1:])
+            if all(value is None or token_key_version(value) == active_version for value in values):
+                continue
+            fresh = encryptor.encrypt_many(
+                encryptor.decrypt_many(values, organization_id), organization_id
+            )
+            updates.append({"_pk": row[0], **dict(zip(columns, fresh))})
+
+        if updates:
+            session.execute(
+                update(table)
+                .where(pk == bindparam("_pk"))
+                .values({name: bindparam(name) for name in columns}),
+                updates,
+            )
+        session.commit()
+        rewritten += len(updates)
+    return rewritten
+
+
+def rotate_organization_key(
+    session: Session,
+    organization_id: str,
+    targets: Dict[Table, Sequence[str]],
+    chunk_size: int = 500,
+) -> Dict[str, int]:
+    """Background key-rotation job: new data key, then chunked re-encryption."""
+    encryptor = get_encryptor()
+    encryptor.rotate_key(organization_id)
+    return {
+        table.name: reencrypt_table(
+            session, table, columns, organization_id, chunk_size, encryptor
+        )
+        for table, columns in targets.items()
+    }
+
+
+@task(name="encryption.rotate_organization_key")
+def rotate_organization_key_task(
+    organization_id: str, targets: Dict[str, List[str]], chunk_size: int = 500
+) -> Dict[str, int]:
+    """Celery entry point; ``targets`` maps table names to encrypted column names."""
+    from app.database import SessionLocal
+
+    tables: Dict[Table, Sequence[str]] = {
+        Base.metadata.tables[name]: columns for name, columns in targets.items()
+    }
+    with SessionLocal() as session:
+        return rotate_organization_key(session, organization_id, tables, chunk_size)
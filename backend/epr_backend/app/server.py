@@ -0,0 +1,119 @@
+"""Production server profile: gunicorn managing uvicorn workers.
+
+Launch with::
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The arbiter imports the app once (``preload_app``) and forks workers, so
+code and import-time data are shared copy-on-write. Each worker runs its own
+event loop (uvloop and httptools when installed) and its own ASGI lifespan,
+so pools, background monitors and outbound clients are created after the
+fork. ``post_fork`` drops anything that might already have opened a socket
+in the parent.
+
+Workers default to the container's CPU quota rather than the host's core
+count. On SIGTERM gunicorn stops accepting connections and gives in-flight
+requests ``GRACEFUL_TIMEOUT`` seconds to finish.
+
+State that must be shared across workers does not live in the process: the
+rate limiter uses Redis (``RATE_LIMIT_BACKEND=redis``), and scheduled jobs
+run in the dedicated scheduler process, never in API workers.
+"""
+
+import gc
+import importlib.util
+import logging
+import math
+import os
+from typing import Any, Optional
+
+try:
+    from uvicorn_worker import UvicornWorker
+except ImportError:  # uvicorn still ships a deprecated copy
+    from uvicorn.workers import UvicornWorker
+
+logger = logging.getLogger(__name__)
+
+
+def cpu_quota(cgroup_root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """CPUs granted by the cgroup quota (v2 ``cpu.max`` or v1 CFS), or None when unlimited."""
+    try:
+        with open(os.path.join(cgroup_root, "cpu.max")) as handle:
+            quota, period = handle.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us")) as handle:
+            quota_us = int(handle.read())
+        with open(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us")) as handle:
+            period_us = int(handle.read())
+        if quota_us > 0 and period_us > 0:
+            return quota_us / period_us
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus(cgroup_root: str = "/sys/fs/cgroup") -> float:
+    quota = cpu_quota(cgroup_root)
+    try:
+        affinity = len(os.sched_getaffinity(0))
+    except AttributeError:
+        affinity = os.cpu_count() or 1
+    return min(quota, affinity) if quota else float(affinity)
+
+
+def worker_count(cgroup_root: str = "/sys/fs/cgroup") -> int:
+    """``WEB_CONCURRENCY`` if set, else one async worker per available CPU (at least 2)."""
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return max(2, math.ceil(available_cpus(cgroup_root)))
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if _available("uvloop") else "auto",
+        "http": "httptools" if _available("httptools") else "auto",
+        "lifespan": "on",
+        "proxy_headers": True,
+        "server_header": False,
+    }
+
+
+def check_scheduler(workers: int) -> None:
+    """Refuse to start several workers that would each run the embedded scheduler."""
+    from app.services.distributed_scheduler import should_run_embedded_scheduler
+
+    if workers > 1 and should_run_embedded_scheduler():
+        raise RuntimeError(
+            "RUN_SCHEDULER must be false with more than one API worker; "
+            "run python -m app.services.distributed_scheduler instead"
+        )
+
+
+def reset_after_fork() -> None:
+    """Drop connections inherited from the preloading parent so workers never share a socket."""
+    from sqlalchemy.engine import Engine
+
+    for obj in gc.get_objects():
+        if isinstance(obj, Engine):
+            obj.dispose(close=False)
+
+    from app.services.redis_client import get_redis
+    from app.services.sdk_clients import reset_clients
+
+    get_redis.cache_clear()
+    reset_clients()
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    reset_after_fork()
+    logger.info("Worker %s ready (loop=%s)", worker.pid, ProductionUvicornWorker.CONFIG_KWARGS["loop"])
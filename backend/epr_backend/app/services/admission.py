@@ -0,0 +1,193 @@
+"""Overload signals and admission decisions for load shedding.
+
+``LoadMonitor`` samples three saturation signals in the background:
+
+* event-loop lag: how late a periodic ``asyncio.sleep`` wakes up, which grows
+  as soon as CPU-bound work or blocking calls starve the loop;
+* database pool wait: how long a probe takes to check a connection out of
+  the SQLAlchemy pool (an outstanding probe counts with its current age, so
+  an exhausted pool is visible before the probe returns);
+* in-flight requests, counted by ``AdmissionControlMiddleware`` itself.
+
+``AdmissionController`` turns them into a shed level. Each route has a
+priority; requests whose priority is below the current level are refused
+with 503 + ``Retry-After`` before they take a worker slot, so the capacity
+that remains goes to interactive traffic. Health and metrics endpoints are
+never shed.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Pattern, Sequence
+
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_CRITICAL = 2
+
+PRIORITY_NAMES = {PRIORITY_LOW: "low", PRIORITY_NORMAL: "normal", PRIORITY_CRITICAL: "critical"}
+
+
+@dataclass(frozen=True)
+class RoutePriority:
+    path: Pattern[str]
+    priority: int
+    methods: Optional[frozenset] = None
+
+
+# Ordered; first match wins, unmatched routes are PRIORITY_NORMAL.
+DEFAULT_PRIORITIES: List[RoutePriority] = [
+    RoutePriority(re.compile(r"^/(healthz|readiness|metrics)$"), PRIORITY_CRITICAL),
+    RoutePriority(re.compile(r"^/payments/webhook"), PRIORITY_CRITICAL),
+    RoutePriority(re.compile(r"/(export|import)(/|$)"), PRIORITY_LOW),
+    RoutePriority(re.compile(r"^/api/reports/generate$"), PRIORITY_LOW),
+    RoutePriority(
+        re.compile(r"^/api/(products|reports|materials)/?$"), PRIORITY_LOW, frozenset({"GET"})
+    ),
+]
+
+event_loop_lag = registry.gauge("event_loop_lag_seconds", "Smoothed event loop scheduling delay")
+db_pool_wait = registry.gauge("db_pool_wait_seconds", "Latest time to check out a pooled DB connection")
+admission_level = registry.gauge("admission_shed_level", "Current load-shedding level (0 admits all)")
+requests_shed = registry.counter(
+    "http_requests_shed_total", "Requests refused by admission control", ("priority",)
+)
+
+
+class LoadMonitor:
+    def __init__(
+        self,
+        engine: Any = None,
+        interval: float = 0.1,
+        pool_probe_interval: float = 1.0,
+        decay: float = 0.3,
+    ) -> None:
+        self.engine = engine
+        self.interval = interval
+        self.pool_probe_interval = pool_probe_interval
+        self.decay = decay
+        self.loop_lag = 0.0
+        self._pool_wait = 0.0
+        self._probe_started: Optional[float] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    @property
+    def pool_wait(self) -> float:
+        started = self._probe_started
+        if started is not None:
+            return max(self._pool_wait, time.monotonic() - started)
+        return self._pool_wait
+
+    def record_lag(self, lag: float) -> None:
+        # Rise immediately, recover gradually, so one quiet tick does not reopen the gates.
+        self.loop_lag = lag if lag >= self.loop_lag else self.loop_lag + (lag - self.loop_lag) * self.decay
+        event_loop_lag.set(self.loop_lag)
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record_lag(max(0.0, loop.time() - started - self.interval))
+
+    def _checkout(self) -> None:
+        self.engine.pool.connect().close()
+
+    async def probe_pool(self) -> None:
+        self._probe_started = time.monotonic()
+        try:
+            await asyncio.to_thread(self._checkout)
+        except Exception as exc:
+            logger.debug("Pool probe failed: %s", exc)
+        finally:
+            self._pool_wait = time.monotonic() - self._probe_started
+            self._probe_started = None
+            db_pool_wait.set(self._pool_wait)
+
+    async def _sample_pool(self) -> None:
+        while True:
+            await asyncio.sleep(self.pool_probe_interval)
+            await self.probe_pool()
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self._sample_lag()))
+        if self.engine is not None:
+            self._tasks.append(loop.create_task(self._sample_pool()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+class AdmissionController:
+    """Map overload signals to a shed level and route priorities to decisions.
+
+    Level 1 (soft overload: lag, pool wait or in-flight past their soft
+    thresholds) sheds low-priority routes. Level 2 (hard overload: the
+    in-flight cap, or a signal at ``hard_factor`` times its threshold) also
+    sheds normal routes.
+    """
+
+    def __init__(
+        self,
+        monitor: LoadMonitor,
+        max_in_flight: int = 200,
+        loop_lag_threshold: float = 0.1,
+        pool_wait_threshold: float = 0.25,
+        soft_in_flight_ratio: float = 0.75,
+        hard_factor: float = 4.0,
+        priorities: Sequence[RoutePriority] = DEFAULT_PRIORITIES,
+    ) -> None:
+        self.monitor = monitor
+        self.max_in_flight = max_in_flight
+        self.loop_lag_threshold = loop_lag_threshold
+        self.pool_wait_threshold = pool_wait_threshold
+        self.soft_in_flight = int(max_in_flight * soft_in_flight_ratio)
+        self.hard_factor = hard_factor
+        self.priorities = list(priorities)
+
+    def priority(self, method: str, path: str) -> int:
+        for rule in self.priorities:
+            if (rule.methods is None or method in rule.methods) and rule.path.search(path):
+                return rule.priority
+        return PRIORITY_NORMAL
+
+    def level(self, in_flight: int) -> int:
+        lag = self.monitor.loop_lag / self.loop_lag_threshold
+        wait = self.monitor.pool_wait / self.pool_wait_threshold
+        if in_flight >= self.max_in_flight or max(lag, wait) >= self.hard_factor:
+            level = 2
+        elif in_flight >= self.soft_in_flight or max(lag, wait) >= 1.0:
+            level = 1
+        else:
+            level = 0
+        admission_level.set(level)
+        return level
+
+    def admit(self, priority: int, in_flight: int) -> bool:
+        return priority == PRIORITY_CRITICAL or priority >= self.level(in_flight)
+
+
+def admission_from_env(engine: Any = None) -> AdmissionController:
+    return AdmissionController(
+        LoadMonitor(engine),
+        max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "200")),
+        loop_lag_threshold=float(os.getenv("ADMISSION_LOOP_LAG_MS", "100")) / 1000,
+        pool_wait_threshold=float(os.getenv("ADMISSION_POOL_WAIT_MS", "250")) / 1000,
+    )
@@ -0,0 +1,390 @@
+"""Materialized per-organization compliance summaries.
+
+Dashboard totals (product count, packaging weight, fees due, report status
+counts) are stored in ``organization_compliance_summaries``, one row per
+(organization, quarter), so the dashboard reads a single row by primary key
+instead of aggregating products and reports on every page load.
+
+Rows are kept current in two ways:
+
+* Incrementally: an ``after_flush`` listener turns every ORM insert, update
+  and delete of a ``Product`` or ``Report`` into counter deltas and applies
+  them in the same transaction as the write. When a delta cannot be applied
+  (no row yet for the period, or the previous values were not loaded) the
+  affected organization is recomputed from scratch instead.
+* Periodically: ``summaries.refresh_compliance_summaries`` recomputes every
+  organization with set-based aggregates. It repairs drift from Core bulk
+  loads, raw SQL and concurrent first writes to a new period.
+
+Report columns cover reports whose ``start_date`` falls in the period.
+Product columns describe the catalogue and are maintained on the current
+period's row; rows of closed periods keep the catalogue as it was when the
+period ended.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Table,
+    and_,
+    case,
+    event,
+    extract,
+    func,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database import Base, Product, Report
+from app.services.metrics import registry
+from app.services.tasks import task
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_COLUMNS = ("product_count", "material_kg")
+REPORT_COLUMNS = ("reports_total", "reports_completed", "reports_pending", "reports_failed", "fees_due")
+COUNTER_COLUMNS = PRODUCT_COLUMNS + REPORT_COLUMNS
+
+summaries = Table(
+    "organization_compliance_summaries",
+    Base.metadata,
+    Column("organization_id", String, ForeignKey("organizations.id"), primary_key=True),
+    Column("period", String(7), primary_key=True),
+    Column("product_count", Integer, nullable=False, default=0),
+    Column("material_kg", Float, nullable=False, default=0.0),
+    Column("reports_total", Integer, nullable=False, default=0),
+    Column("reports_completed", Integer, nullable=False, default=0),
+    Column("reports_pending", Integer, nullable=False, default=0),
+    Column("reports_failed", Integer, nullable=False, default=0),
+    Column("fees_due", Float, nullable=False, default=0.0),
+    Column("refreshed_at", DateTime, nullable=True),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+summary_updates = registry.counter(
+    "compliance_summary_updates_total", "Compliance summary maintenance operations", ("kind",)
+)
+
+Key = Tuple[str, str]
+Deltas = Dict[Key, Dict[str, float]]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def period_of(moment: Optional[date] = None) -> str:
+    """Calendar quarter label, e.g. ``2024-Q3``."""
+    moment = moment or _utcnow()
+    return f"{moment.year}-Q{(moment.month - 1) // 3 + 1}"
+
+
+def report_bucket(status: Optional[str]) -> str:
+    if status == "completed":
+        return "reports_completed"
+    if status == "failed":
+        return "reports_failed"
+    return "reports_pending"
+
+
+def _empty_row(organization_id: str, period: str, now: datetime) -> Dict[str, Any]:
+    row: Dict[str, Any] = {column: 0 for column in COUNTER_COLUMNS}
+    row.update(organization_id=organization_id, period=period, refreshed_at=now, updated_at=now)
+    return row
+
+
+def compute_summaries(
+    conn: Connection, organization_ids: Optional[Iterable[str]] = None
+) -> Dict[Key, Dict[str, Any]]:
+    """Aggregate products and reports into summary rows, keyed by (organization, period)."""
+    products = Product.__table__
+    reports = Report.__table__
+    now = _utcnow()
+    current = period_of(now)
+    ids = sorted(set(organization_ids)) if organization_ids is not None else None
+
+    product_query = select(
+        products.c.organization_id,
+        func.count(),
+        func.coalesce(func.sum(products.c.weight), 0.0),
+    ).group_by(products.c.organization_id)
+    started = func.coalesce(reports.c.start_date, reports.c.created_at)
+    report_query = select(
+        reports.c.organization_id,
+        extract("year", started),
+        extract("month", started),
+        reports.c.status,
+        func.count(),
+        func.coalesce(func.sum(case((reports.c.status == "completed", reports.c.total_fee), else_=0.0)), 0.0),
+    ).group_by(
+        reports.c.organization_id, extract("year", started), extract("month", started), reports.c.status
+    )
+    if ids is not None:
+        product_query = product_query.where(products.c.organization_id.in_(ids))
+        report_query = report_query.where(reports.c.organization_id.in_(ids))
+
+    rows: Dict[Key, Dict[str, Any]] = {}
+    for organization_id, count, weight in conn.execute(product_query):
+        if organization_id is None:
+            continue
+        row = rows.setdefault((organization_id, current), _empty_row(organization_id, current, now))
+        row["product_count"] = int(count)
+        row["material_kg"] = float(weight)
+    for organization_id, year, month, status, count, fees in conn.execute(report_query):
+        if organization_id is None:
+            continue
+        if year is None:
+            period = current
+        else:
+            period = f"{int(year)}-Q{(int(month) - 1) // 3 + 1}"
+        row = rows.setdefault((organization_id, period), _empty_row(organization_id, period, now))
+        row["reports_total"] += int(count)
+        row[report_bucket(status)] += int(count)
+        row["fees_due"] += float(fees)
+    return rows
+
+
+def _upsert(conn: Connection, rows: List[Dict[str, Any]], columns: Iterable[str]) -> None:
+    """Insert ``rows``, overwriting ``columns`` on rows that already exist."""
+    if not rows:
+        return
+    columns = list(columns)
+    if conn.dialect.name in ("postgresql", "sqlite"):
+        from sqlalchemy.dialects import postgresql, sqlite
+
+        statement = (
+            postgresql.insert(summaries) if conn.dialect.name == "postgresql" else sqlite.insert(summaries)
+        )
+        conn.execute(
+            statement.on_conflict_do_update(
+                index_elements=[summaries.c.organization_id, summaries.c.period],
+                set_={column: statement.excluded[column] for column in columns},
+            ),
+            rows,
+        )
+        return
+    for row in rows:
+        key = and_(
+            summaries.c.organization_id == row["organization_id"], summaries.c.period == row["period"]
+        )
+        if not conn.execute(update(summaries).where(key).values({c: row[c] for c in columns})).rowcount:
+            conn.execute(summaries.insert().values(row))
+
+
+def refresh_summaries(conn: Connection, organization_ids: Optional[Iterable[str]] = None) -> int:
+    """Recompute summaries for ``organization_ids`` (all organizations when ``None``).
+
+    Report columns are rewritten for every period; product columns only for
+    the current period, so closed periods keep their catalogue snapshot.
+    Returns the number of rows written.
+    """
+    ids = sorted(set(organization_ids)) if organization_ids is not None else None
+    if ids == []:
+        return 0
+    now = _utcnow()
+    current = period_of(now)
+    computed = compute_summaries(conn, ids)
+
+    # Periods whose reports were all deleted, and organizations whose products were.
+    stale = update(summaries).values(
+        {**{column: 0 for column in REPORT_COLUMNS}, "refreshed_at": now, "updated_at": now}
+    )
+    if ids is not None:
+        stale = stale.where(summaries.c.organization_id.in_(ids))
+    conn.execute(stale)
+    emptied = (
+        update(summaries)
+        .where(summaries.c.period == current)
+        .values({column: 0 for column in PRODUCT_COLUMNS})
+    )
+    if ids is not None:
+        emptied = emptied.where(summaries.c.organization_id.in_(ids))
+    conn.execute(emptied)
+
+    current_rows = [row for key, row in computed.items() if key[1] == current]
+    past_rows = [row for key, row in computed.items() if key[1] != current]
+    _upsert(conn, current_rows, COUNTER_COLUMNS + ("refreshed_at", "updated_at"))
+    _upsert(conn, past_rows, REPORT_COLUMNS + ("refreshed_at", "updated_at"))
+    summary_updates.inc(("full" if ids is None else "organization",), len(computed))
+    return len(computed)
+
+
+# -- incremental maintenance ---------------------------------------------------
+
+_UNKNOWN = object()
+
+
+def _previous(obj: Any, attribute: str) -> Any:
+    """The value ``attribute`` had before this flush, or ``_UNKNOWN``."""
+    history = inspect(obj).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    # Never loaded, or changed without the old value having been loaded.
+    return _UNKNOWN
+
+
+def _current(obj: Any, attribute: str) -> Any:
+    state = inspect(obj)
+    if attribute in state.dict:
+        return state.dict[attribute]
+    if state.key is None and state.mapper.columns[attribute].server_default is None:
+        return None
+    return _UNKNOWN
+
+
+def _product_contribution(values: Dict[str, Any]) -> Optional[Tuple[Key, Dict[str, float]]]:
+    organization_id = values["organization_id"]
+    if organization_id is None:
+        return None
+    return (organization_id, period_of()), {"product_count": 1, "material_kg": float(values["weight"] or 0.0)}
+
+
+def _report_contribution(values: Dict[str, Any]) -> Optional[Tuple[Key, Dict[str, float]]]:
+    organization_id = values["organization_id"]
+    if organization_id is None:
+        return None
+    started = values["start_date"] or values["created_at"]
+    contribution: Dict[str, float] = {"reports_total": 1, report_bucket(values["status"]): 1}
+    if values["status"] == "completed":
+        contribution["fees_due"] = float(values["total_fee"] or 0.0)
+    return (organization_id, period_of(started)), contribution
+
+
+TRACKED = {
+    Product: (("organization_id", "weight"), _product_contribution),
+    Report: (("organization_id", "start_date", "created_at", "status", "total_fee"), _report_contribution),
+}
+
+
+def _add(deltas: Deltas, entry: Optional[Tuple[Key, Dict[str, float]]], sign: int) -> None:
+    if entry is None:
+        return
+    key, contribution = entry
+    target = deltas.setdefault(key, defaultdict(float))
+    for column, amount in contribution.items():
+        target[column] += sign * amount
+
+
+def collect_deltas(session: Session) -> Tuple[Deltas, Set[str]]:
+    """Counter deltas for the pending flush, plus organizations needing a full recompute."""
+    deltas: Deltas = {}
+    recompute: Set[str] = set()
+    changes = (
+        [(obj, False, True) for obj in session.new]
+        + [(obj, True, True) for obj in session.dirty]
+        + [(obj, True, False) for obj in session.deleted]
+    )
+    for obj, before, after in changes:
+        tracked = TRACKED.get(type(obj))
+        if tracked is None:
+            continue
+        attributes, contribution = tracked
+        old = {name: _previous(obj, name) for name in attributes} if before else None
+        new = {name: _current(obj, name) for name in attributes} if after else None
+        if old is not None and new is not None and old == new:
+            continue
+        unknown = [values for values in (old, new) if values is not None and _UNKNOWN in values.values()]
+        if unknown:
+            for values in (old, new):
+                if values is not None and values["organization_id"] not in (None, _UNKNOWN):
+                    recompute.add(values["organization_id"])
+            continue
+        if old is not None:
+            _add(deltas, contribution(old), -1)
+        if new is not None:
+            _add(deltas, contribution(new), 1)
+    return deltas, recompute
+
+
+def apply_deltas(conn: Connection, deltas: Deltas) -> Set[str]:
+    """Increment existing summary rows; returns organizations whose row was missing."""
+    missing: Set[str] = set()
+    now = _utcnow()
+    for (organization_id, period), changes in deltas.items():
+        values: Dict[str, Any] = {
+            column: summaries.c[column] + amount for column, amount in changes.items() if amount
+        }
+        if not values:
+            continue
+        values["updated_at"] = now
+        result = conn.execute(
+            update(summaries)
+            .where(summaries.c.organization_id == organization_id, summaries.c.period == period)
+            .values(values)
+        )
+        if result.rowcount:
+            summary_updates.inc(("delta",))
+        else:
+            missing.add(organization_id)
+    return missing
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    deltas, recompute = collect_deltas(session)
+    if not deltas and not recompute:
+        return
+    conn = session.connection()
+    recompute |= apply_deltas(conn, deltas)
+    if recompute:
+        # Sees this flush's rows: the recompute runs in the same transaction.
+        refresh_summaries(conn, recompute)
+
+
+def install() -> None:
+    """Maintain summaries from ORM writes on every session (idempotent)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+def uninstall() -> None:
+    if event.contains(Session, "after_flush", _after_flush):
+        event.remove(Session, "after_flush", _after_flush)
+
+
+install()
+
+
+def get_summary(session: Session, organization_id: str, period: str) -> Optional[Dict[str, Any]]:
+    """Primary-key lookup of one organization's summary for ``period``."""
+    row = session.execute(
+        select(summaries).where(
+            summaries.c.organization_id == organization_id, summaries.c.period == period
+        )
+    ).mappings().first()
+    return dict(row) if row is not None else None
+
+
+@task(name="summaries.refresh_compliance_summaries")
+def refresh_compliance_summaries(scheduled_time: Optional[float] = None, missed_runs: int = 0) -> int:
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        written = refresh_summaries(session.connection())
+        session.commit()
+    logger.info("Refreshed %d compliance summary rows", written)
+    return written
+
+
+@task(name="summaries.refresh_organization_summary")
+def refresh_organization_summary(organization_id: str) -> int:
+    """Compute one organization's rows, e.g. on its first dashboard visit."""
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        written = refresh_summaries(session.connection(), [organization_id])
+        session.commit()
+    return written
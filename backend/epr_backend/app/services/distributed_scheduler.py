@@ -0,0 +1,324 @@
+"""Dedicated scheduler process with Redis-coordinated, sharded job ownership.
+
+Run one or more instances with::
+
+    python -m app.services.distributed_scheduler
+
+API workers must not start the embedded APScheduler when this process is
+deployed (``RUN_SCHEDULER=false``); otherwise every uvicorn worker fires the
+same deadline jobs.
+
+Each instance heartbeats into a Redis sorted set. Live members form a
+consistent-hash ring and every job is owned by exactly one member, so adding
+an instance moves only ~1/N of the jobs. Because membership views can briefly
+disagree during a join or crash, each individual run is additionally guarded
+by a ``SET NX`` lock on ``(job, scheduled time)``, making dispatch
+at-most-once. Next-run times live in Redis, so they survive restarts and
+failover; runs missed during downtime are handled by the job's misfire
+policy. When publishing to the broker fails, the runs that were not sent are
+released (lock dropped, next run restored) so a later tick retries them.
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.tasks import get_celery_app
+
+if TYPE_CHECKING:
+    import redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "scheduler"
+MEMBERS_KEY = f"{KEY_PREFIX}:members"
+NEXT_RUN_KEY = f"{KEY_PREFIX}:next_run"
+
+# KEYS: run lock, next-run hash. ARGV: owner, job id, next run we stored, scheduled time.
+# Each half only applies if nobody else has touched the key since.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+if redis.call('HGET', KEYS[2], ARGV[2]) == ARGV[3] then
+    redis.call('HSET', KEYS[2], ARGV[2], ARGV[4])
+end
+return 1
+"""
+
+MISFIRE_COALESCE = "coalesce"
+MISFIRE_SKIP = "skip"
+MISFIRE_POLICIES = (MISFIRE_COALESCE, MISFIRE_SKIP)
+
+
+@dataclass(frozen=True)
+class ScheduledJob:
+    id: str
+    task: str
+    interval: int
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    queue: Optional[str] = None
+    misfire: str = MISFIRE_COALESCE
+    misfire_grace_time: int = 3600
+
+    def __post_init__(self) -> None:
+        if self.misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"Unknown misfire policy: {self.misfire}")
+        if self.interval <= 0:
+            raise ValueError("interval must be positive")
+
+
+# ``SCHEDULER_JOBS_FILE`` can replace these per deployment.
+DEFAULT_JOBS: List[ScheduledJob] = [
+    ScheduledJob(
+        id="deadline-reminders",
+        task="reminders.plan_deadline_reminders",
+        interval=86400,
+        misfire_grace_time=6 * 3600,
+    ),
+    ScheduledJob(
+        id="job-status-reconciler",
+        task="jobs.reconcile_job_statuses",
+        interval=60,
+        misfire="skip",
+    ),
+    ScheduledJob(
+        id="compliance-summary-refresh",
+        task="summaries.refresh_compliance_summaries",
+        interval=3600,
+        misfire="skip",
+    ),
+]
+
+
+def load_jobs() -> List[ScheduledJob]:
+    path = os.getenv("SCHEDULER_JOBS_FILE")
+    if not path:
+        return list(DEFAULT_JOBS)
+    with open(path) as handle:
+        return [ScheduledJob(**entry) for entry in json.load(handle)]
+
+
+def should_run_embedded_scheduler() -> bool:
+    """Whether API processes should start the in-process APScheduler."""
+    return os.getenv("RUN_SCHEDULER", "true").lower() in ("1", "true", "yes")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes."""
+
+    def __init__(self, members: Iterable[str], replicas: int = 64) -> None:
+        self.members = sorted(set(members))
+        points = [
+            (self._hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(replicas)
+        ]
+        points.sort()
+        self._keys = [point for point, _ in points]
+        self._owners = [owner for _, owner in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._owners[index]
+
+
+def plan_run(
+    job: ScheduledJob, next_run: Optional[float], now: float
+) -> Tuple[Optional[float], int, float]:
+    """Decide what to dispatch for ``job`` at ``now``.
+
+    Returns ``(scheduled_time, missed_runs, new_next_run)``. ``scheduled_time``
+    is ``None`` when nothing is due. Missed runs are always coalesced into a
+    single dispatch (with the number of skipped windows passed along) or
+    dropped entirely by the ``skip`` policy; the schedule never replays a
+    backlog one run at a time.
+    """
+    if next_run is None:
+        return None, 0, now + job.interval
+    if next_run > now:
+        return None, 0, next_run
+
+    missed = int((now - next_run) // job.interval)
+    latest = next_run + missed * job.interval
+    new_next_run = latest + job.interval
+    if now - latest > job.misfire_grace_time or (missed and job.misfire == MISFIRE_SKIP):
+        logger.warning("Skipping %s missed run(s) of %s", missed + 1, job.id)
+        return None, 0, new_next_run
+    return latest, missed, new_next_run
+
+
+class DistributedScheduler:
+    def __init__(
+        self,
+        client: "redis.Redis",
+        jobs: Sequence[ScheduledJob],
+        instance_id: Optional[str] = None,
+        tick_interval: float = 1.0,
+        heartbeat_ttl: float = 15.0,
+        batch_size: int = 100,
+        celery_app: Any = None,
+    ) -> None:
+        self.client = client
+        self.jobs = {job.id: job for job in jobs}
+        self.instance_id = instance_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.tick_interval = tick_interval
+        self.heartbeat_ttl = heartbeat_ttl
+        self.batch_size = batch_size
+        self._celery_app = celery_app
+        self._running = False
+
+    @property
+    def celery_app(self) -> Any:
+        if self._celery_app is None:
+            self._celery_app = get_celery_app()
+        return self._celery_app
+
+    def heartbeat(self, now: float) -> List[str]:
+        pipe = self.client.pipeline()
+        pipe.zadd(MEMBERS_KEY, {self.instance_id: now})
+        pipe.zremrangebyscore(MEMBERS_KEY, "-inf", now - self.heartbeat_ttl)
+        pipe.zrange(MEMBERS_KEY, 0, -1)
+        members = pipe.execute()[-1]
+        return [m.decode() if isinstance(m, bytes) else m for m in members]
+
+    def owned_jobs(self, members: Sequence[str]) -> List[ScheduledJob]:
+        ring = HashRing(members)
+        return [job for job in self.jobs.values() if ring.owner(job.id) == self.instance_id]
+
+    @staticmethod
+    def _lock_key(job: ScheduledJob, scheduled_time: float) -> str:
+        return f"{KEY_PREFIX}:lock:{job.id}:{int(scheduled_time)}"
+
+    def _claim(self, job: ScheduledJob, scheduled_time: float) -> bool:
+        ttl_ms = int(max(job.interval, 60) * 1000)
+        return bool(
+            self.client.set(self._lock_key(job, scheduled_time), self.instance_id, nx=True, px=ttl_ms)
+        )
+
+    def release(self, job: ScheduledJob, scheduled_time: float) -> None:
+        """Undo a claimed run that was never published, so the next tick dispatches it."""
+        self.client.eval(
+            RELEASE_SCRIPT,
+            2,
+            self._lock_key(job, scheduled_time),
+            NEXT_RUN_KEY,
+            self.instance_id,
+            job.id,
+            repr(scheduled_time + job.interval),
+            repr(scheduled_time),
+        )
+
+    def collect_due(self, now: float) -> List[Tuple[ScheduledJob, float, int]]:
+        owned = self.owned_jobs(self.heartbeat(now))
+        if not owned:
+            return []
+        stored = self.client.hmget(NEXT_RUN_KEY, [job.id for job in owned])
+        due: List[Tuple[ScheduledJob, float, int]] = []
+        updates: Dict[str, float] = {}
+        for job, raw in zip(owned, stored):
+            next_run = float(raw) if raw is not None else None
+            scheduled_time, missed, new_next_run = plan_run(job, next_run, now)
+            if new_next_run != next_run:
+                updates[job.id] = new_next_run
+            if scheduled_time is not None and self._claim(job, scheduled_time):
+                due.append((job, scheduled_time, missed))
+        if updates:
+            self.client.hset(NEXT_RUN_KEY, mapping={job_id: repr(value) for job_id, value in updates.items()})
+        return due
+
+    def dispatch(self, due: Sequence[Tuple[ScheduledJob, float, int]]) -> int:
+        """Publish due runs to Celery, reusing one producer per batch.
+
+        If publishing fails, every run not yet sent is released before the
+        error propagates.
+        """
+        app = self.celery_app
+        sent = 0
+        try:
+            for start in range(0, len(due), self.batch_size):
+                batch = due[start:start + self.batch_size]
+                with app.producer_or_acquire() as producer:
+                    for job, scheduled_time, missed in batch:
+                        kwargs = dict(job.kwargs)
+                        kwargs["scheduled_time"] = scheduled_time
+                        if missed:
+                            kwargs["missed_runs"] = missed
+                        options: Dict[str, Any] = {"producer": producer}
+                        if job.queue:
+                            options["queue"] = job.queue
+                        app.send_task(job.task, kwargs=kwargs, **options)
+                        sent += 1
+        except Exception:
+            import redis
+
+            for job, scheduled_time, _ in due[sent:]:
+                try:
+                    self.release(job, scheduled_time)
+                except redis.RedisError:
+                    logger.warning("Could not release run %s@%s", job.id, scheduled_time, exc_info=True)
+            raise
+        return sent
+
+    def tick(self, now: Optional[float] = None) -> int:
+        due = self.collect_due(now if now is not None else time.time())
+        return self.dispatch(due) if due else 0
+
+    def leave(self) -> None:
+        self.client.zrem(MEMBERS_KEY, self.instance_id)
+
+    def run_forever(self) -> None:
+        self._running = True
+        logger.info("Scheduler %s started with %d job(s)", self.instance_id, len(self.jobs))
+        try:
+            while self._running:
+                started = time.monotonic()
+                try:
+                    dispatched = self.tick()
+                    if dispatched:
+                        logger.info("Dispatched %d job run(s)", dispatched)
+                except Exception:
+                    # Redis or broker outages must not stop the scheduler; the
+                    # next tick retries whatever was not dispatched.
+                    logger.exception("Scheduler tick failed")
+                time.sleep(max(0.0, self.tick_interval - (time.monotonic() - started)))
+        finally:
+            self.leave()
+
+    def stop(self, *_: Any) -> None:
+        self._running = False
+
+
+def main() -> None:
+    import redis
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    scheduler = DistributedScheduler(
+        client,
+        load_jobs(),
+        instance_id=os.getenv("SCHEDULER_INSTANCE_ID"),
+        tick_interval=float(os.getenv("SCHEDULER_TICK_INTERVAL", "1.0")),
+        batch_size=int(os.getenv("SCHEDULER_DISPATCH_BATCH", "100")),
+    )
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""Multi-jurisdiction EPR fee schedules compiled to dense lookup tables.
+
+A schedule is plain data (``DEFAULT_SCHEDULE``, or JSON from
+``FEE_SCHEDULE_PATH``)::
+
+    {
+      "materials": {"plastic": "Plastic", "film": "Plastic", "glass": "Glass", ...},
+      "jurisdictions": {
+        "US-CA": {
+          "rates": [
+            {"category": "Plastic", "effective_from": "2024-01-01",
+             "tiers": [[0, 0.45], [10000, 0.40]]},
+            {"material": "film", "effective_from": "2025-01-01", "tiers": [[0, 0.70]]}
+          ],
+          "modulation": [
+            {"class": "recyclable", "factor": 0.9, "effective_from": "2024-01-01"},
+            {"class": "hard_to_recycle", "factor": 1.25, "category": "Plastic",
+             "effective_from": "2025-07-01", "effective_to": "2027-01-01"}
+          ],
+          "minimum_fee": [{"amount": 250, "effective_from": "2024-01-01"}]
+        }
+      }
+    }
+
+``materials`` maps the keys used in product ``material_composition`` to a
+category. Rate rules target a category or a single material; within a
+period a material rule beats a category rule, and the later
+``effective_from`` wins among equals. ``tiers`` are marginal bands in kg:
+``[lower bound, rate per kg]``, starting at 0, applied to the producer's
+total kg of the material in the jurisdiction and period. Modulation factors
+(below 1 a bonus, above 1 a malus) scale the fee of the product lines in
+their class. ``minimum_fee`` tops up a producer's total per jurisdiction
+and period. ``effective_to`` is exclusive, and a quarter is governed by
+the rules in force on its first day.
+
+``compile_schedule`` resolves all of this once into flat arrays indexed by
+``(jurisdiction, material, period)`` cell: tier bounds, rates and the
+cumulative fee at each bound, modulation factors per class, and minimums
+per ``(jurisdiction, period)``. Periods are calendar quarters (``2024-Q3``)
+from the earliest effective date to ``FEE_SCHEDULE_HORIZON_YEARS`` past the
+last one; later periods use the last column, as open-ended rules stay in
+force. Evaluating fees is then table lookups: ``prepare`` flattens products
+into (product, material, class) lines once, and ``calculate`` reduces them
+per jurisdiction without interpreting a rule.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import operator
+import os
+import threading
+from array import array
+from datetime import date
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from app.services.single_flight import normalize_period
+
+logger = logging.getLogger(__name__)
+
+MODULATION_CLASSES: Tuple[str, ...] = ("standard", "recyclable", "recycled_content", "hard_to_recycle")
+
+# Mirrors the flat per-kg catalogue rates, as a single jurisdiction.
+DEFAULT_SCHEDULE: Dict[str, Any] = {
+    "materials": {
+        "paper": "Paper",
+        "cardboard": "Paper",
+        "plastic": "Plastic",
+        "hdpe": "Plastic",
+        "film": "Plastic",
+        "glass": "Glass",
+        "metal": "Metal",
+        "aluminum": "Metal",
+    },
+    "jurisdictions": {
+        "DEFAULT": {
+            "rates": [
+                {"material": key, "effective_from": "2023-01-01", "tiers": [[0, rate]]}
+                for key, rate in (
+                    ("paper", 0.12),
+                    ("cardboard", 0.08),
+                    ("plastic", 0.45),
+                    ("hdpe", 0.41),
+                    ("film", 0.62),
+                    ("glass", 0.05),
+                    ("metal", 0.09),
+                    ("aluminum", 0.07),
+                )
+            ],
+        },
+    },
+}
+
+
+def _quarter(value: str) -> int:
+    """Absolute quarter number of an ISO date; dates inside a quarter round up to the next one."""
+    day = date.fromisoformat(value)
+    quarter = day.year * 4 + (day.month - 1) // 3
+    starts_quarter = day.day == 1 and (day.month - 1) % 3 == 0
+    return quarter if starts_quarter else quarter + 1
+
+
+def _quarter_label(quarter: int) -> str:
+    return f"{quarter // 4}-Q{quarter % 4 + 1}"
+
+
+def _period_quarter(period: str) -> int:
+    label = normalize_period(period)
+    try:
+        year, quarter = label.split("-Q")
+        return int(year) * 4 + int(quarter) - 1
+    except ValueError:
+        raise ValueError(f"Invalid period {period!r}; expected e.g. 2024-Q1") from None
+
+
+def _span(rule: Mapping[str, Any]) -> Tuple[int, Optional[int]]:
+    start = _quarter(rule["effective_from"])
+    end = _quarter(rule["effective_to"]) if rule.get("effective_to") else None
+    if end is not None and end <= start:
+        raise ValueError(f"Rule ends before it starts: {rule}")
+    return start, end
+
+
+def schedule_checksum(schedule: Mapping[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(schedule, sort_keys=True).encode()).hexdigest()
+
+
+class FeeLines(NamedTuple):
+    """Products flattened to one line per (product, material), ordered by product."""
+
+    offsets: array  # product i owns lines offsets[i]:offsets[i + 1]
+    keys: array  # material index * len(MODULATION_CLASSES) + class index
+    kg: array
+    totals: array  # kg per key, summed over all products
+    uncovered_kg: float  # composition keys missing from the schedule
+
+
+class JurisdictionFees(NamedTuple):
+    jurisdiction: str
+    period: str
+    total: float
+    minimum_top_up: float
+    by_material: Dict[str, float]
+    product_fees: List[float]  # before the minimum fee top-up
+
+
+class CompiledSchedule:
+    """Dense fee tables; build with ``compile_schedule``."""
+
+    def __init__(
+        self,
+        jurisdictions: Sequence[str],
+        materials: Sequence[str],
+        first_quarter: int,
+        period_count: int,
+        tier_width: int,
+        checksum: str,
+    ) -> None:
+        self.jurisdictions = list(jurisdictions)
+        self.materials = list(materials)
+        self.jurisdiction_index = {name: i for i, name in enumerate(self.jurisdictions)}
+        self.material_index = {name: i for i, name in enumerate(self.materials)}
+        self.first_quarter = first_quarter
+        self.periods = [_quarter_label(first_quarter + p) for p in range(period_count)]
+        self.tier_width = tier_width
+        self.checksum = checksum
+        cells = len(self.jurisdictions) * len(self.materials) * period_count
+        self.covered = bytearray(cells)
+        self.tier_bounds = array("d", [float("inf")]) * (cells * tier_width)
+        self.tier_rates = array("d", [0.0]) * (cells * tier_width)
+        self.tier_base = array("d", [0.0]) * (cells * tier_width)
+        self.modulation = array("d", [1.0]) * (cells * len(MODULATION_CLASSES))
+        self.minimum = array("d", [0.0]) * (len(self.jurisdictions) * period_count)
+
+    def period_index(self, period: str) -> int:
+        index = _period_quarter(period) - self.first_quarter
+        if index < 0:
+            raise ValueError(f"No fee schedule before {self.periods[0]}")
+        return min(index, len(self.periods) - 1)
+
+    def cell(self, jurisdiction: int, material: int, period: int) -> int:
+        return (jurisdiction * len(self.materials) + material) * len(self.periods) + period
+
+    def tiered_fee(self, cell: int, kg: float) -> float:
+        """Fee for ``kg`` in one cell: the band's cumulative base plus its marginal rate."""
+        start = cell * self.tier_width
+        bounds = self.tier_bounds
+        tier = start + self.tier_width - 1
+        while tier > start and bounds[tier] > kg:
+            tier -= 1
+        return self.tier_base[tier] + (kg - bounds[tier]) * self.tier_rates[tier]
+
+    def fee(
+        self, jurisdiction: str, material: str, period: str, kg: float, modulation: str = "standard"
+    ) -> float:
+        """Fee for ``kg`` of one material, taken as the producer's whole volume for the period."""
+        cell = self.cell(
+            self.jurisdiction_index[jurisdiction], self.material_index[material], self.period_index(period)
+        )
+        if not self.covered[cell] or kg <= 0:
+            return 0.0
+        factor = self.modulation[cell * len(MODULATION_CLASSES) + MODULATION_CLASSES.index(modulation)]
+        return self.tiered_fee(cell, kg) * factor
+
+    def prepare(self, products: Iterable[Mapping[str, Any]]) -> FeeLines:
+        """Flatten products (``weight``, ``material_composition`` and optional ``eco_modulation``)."""
+        classes = len(MODULATION_CLASSES)
+        class_index = {name: i for i, name in enumerate(MODULATION_CLASSES)}
+        offsets, keys, kgs = array("l", [0]), array("l"), array("d")
+        totals = array("d", [0.0]) * (len(self.materials) * classes)
+        uncovered = 0.0
+        for product in products:
+            composition = product.get("material_composition") or {}
+            if isinstance(composition, str):
+                composition = json.loads(composition)
+            weight = float(product.get("weight") or 0.0)
+            eco_modulation = product.get("eco_modulation") or "standard"
+            modulation = class_index.get(eco_modulation, -1)
+            if modulation < 0:
+                raise ValueError(
+                    f"Unknown eco_modulation {eco_modulation!r}; expected one of {', '.join(MODULATION_CLASSES)}"
+                )
+            for key, share in composition.items():
+                kg = weight * float(share) / 100.0
+                material = self.material_index.get(key)
+                if material is None:
+                    uncovered += kg
+                    continue
+                line_key = material * classes + modulation
+                keys.append(line_key)
+                kgs.append(kg)
+                totals[line_key] += kg
+            offsets.append(len(keys))
+        return FeeLines(offsets, keys, kgs, totals, uncovered)
+
+    def calculate(self, lines: FeeLines, jurisdiction: str, period: str) -> JurisdictionFees:
+        """Fees for prepared products in one jurisdiction and period.
+
+        Tiers apply to the producer's total kg per material; each product
+        line pays that material's average rate times its modulation factor.
+        """
+        j = self.jurisdiction_index[jurisdiction]
+        p = self.period_index(period)
+        classes = len(MODULATION_CLASSES)
+        rates = [0.0] * len(lines.totals)
+        by_material: Dict[str, float] = {}
+        for m, material in enumerate(self.materials):
+            base = m * classes
+            material_kg = sum(lines.totals[base:base + classes])
+            cell = self.cell(j, m, p)
+            if material_kg <= 0 or not self.covered[cell]:
+                continue
+            average = self.tiered_fee(cell, material_kg) / material_kg
+            factors = self.modulation[cell * classes:(cell + 1) * classes]
+            fee = 0.0
+            for c in range(classes):
+                rates[base + c] = average * factors[c]
+                fee += lines.totals[base + c] * rates[base + c]
+            by_material[material] = fee
+
+        line_fees = map(operator.mul, lines.kg, map(rates.__getitem__, lines.keys))
+        running = list(itertools.accumulate(line_fees, initial=0.0))
+        offsets = lines.offsets
+        product_fees = [running[end] - running[start] for start, end in zip(offsets, offsets[1:])]
+        total = sum(by_material.values())
+        top_up = max(0.0, self.minimum[j * len(self.periods) + p] - total)
+        return JurisdictionFees(
+            jurisdiction, self.periods[p], total + top_up, top_up, by_material, product_fees
+        )
+
+
+def compile_schedule(
+    schedule: Mapping[str, Any], horizon_years: Optional[int] = None
+) -> CompiledSchedule:
+    """Resolve a declarative schedule into dense tables; raises ValueError on an invalid one."""
+    if horizon_years is None:
+        horizon_years = int(os.getenv("FEE_SCHEDULE_HORIZON_YEARS", "2"))
+    categories: Dict[str, str] = dict(schedule["materials"])
+    jurisdictions: Dict[str, Any] = dict(schedule["jurisdictions"])
+    materials = sorted(categories)
+    by_category: Dict[str, List[int]] = {}
+    for m, material in enumerate(materials):
+        by_category.setdefault(categories[material], []).append(m)
+
+    def targets(rule: Mapping[str, Any]) -> List[int]:
+        if "material" in rule:
+            if rule["material"] not in categories:
+                raise ValueError(f"Unknown material {rule['material']!r}")
+            return [materials.index(rule["material"])]
+        if "category" in rule:
+            if rule["category"] not in by_category:
+                raise ValueError(f"Unknown category {rule['category']!r}")
+            return by_category[rule["category"]]
+        return list(range(len(materials)))
+
+    rules = [
+        rule
+        for spec in jurisdictions.values()
+        for section in ("rates", "modulation", "minimum_fee")
+        for rule in spec.get(section, ())
+    ]
+    if not rules:
+        raise ValueError("Fee schedule has no rules")
+    edges = [edge for rule in rules for edge in _span(rule) if edge is not None]
+    first, last = min(edges), max(edges)
+    periods = last - first + 1 + horizon_years * 4
+    tier_width = max(
+        (len(rule["tiers"]) for spec in jurisdictions.values() for rule in spec.get("rates", ())), default=1
+    )
+
+    compiled = CompiledSchedule(
+        list(jurisdictions), materials, first, periods, tier_width, schedule_checksum(schedule)
+    )
+    classes = len(MODULATION_CLASSES)
+
+    def periods_of(rule: Mapping[str, Any]) -> range:
+        start, end = _span(rule)
+        return range(start - first, (end - first) if end is not None else periods)
+
+    for j, spec in enumerate(jurisdictions.values()):
+        # Apply less specific, then earlier rules first so the winner is written last.
+        rates = sorted(spec.get("rates", ()), key=lambda rule: ("material" in rule, _span(rule)[0]))
+        for rule in rates:
+            tiers = [(float(bound), float(rate)) for bound, rate in rule["tiers"]]
+            if not tiers or tiers[0][0] != 0 or any(b <= a for (a, _), (b, _) in zip(tiers, tiers[1:])):
+                raise ValueError(f"Tiers must start at 0 and increase: {rule['tiers']}")
+            bases = [0.0]
+            for (bound, rate), (next_bound, _) in zip(tiers, tiers[1:]):
+                bases.append(bases[-1] + (next_bound - bound) * rate)
+            for m in targets(rule):
+                for p in periods_of(rule):
+                    cell = compiled.cell(j, m, p)
+                    compiled.covered[cell] = 1
+                    start = cell * tier_width
+                    for k in range(tier_width):
+                        bound, rate = tiers[k] if k < len(tiers) else (float("inf"), 0.0)
+                        compiled.tier_bounds[start + k] = bound
+                        compiled.tier_rates[start + k] = rate
+                        compiled.tier_base[start + k] = bases[k] if k < len(tiers) else 0.0
+
+        modulation = sorted(
+            spec.get("modulation", ()),
+            key=lambda rule: ("material" in rule, "category" in rule, _span(rule)[0]),
+        )
+        for rule in modulation:
+            if rule["class"] not in MODULATION_CLASSES:
+                raise ValueError(f"Unknown modulation class {rule['class']!r}")
+            c = MODULATION_CLASSES.index(rule["class"])
+            for m in targets(rule):
+                for p in periods_of(rule):
+                    compiled.modulation[compiled.cell(j, m, p) * classes + c] = float(rule["factor"])
+
+        for rule in sorted(spec.get("minimum_fee", ()), key=lambda rule: _span(rule)[0]):
+            for p in periods_of(rule):
+                compiled.minimum[j * periods + p] = float(rule["amount"])
+
+    logger.info(
+        "Compiled fee schedule: %d jurisdictions x %d materials x %d periods (%s to %s)",
+        len(compiled.jurisdictions), len(materials), periods, compiled.periods[0], compiled.periods[-1],
+    )
+    return compiled
+
+
+def load_schedule(path: Optional[str] = None) -> Dict[str, Any]:
+    path = path or os.getenv("FEE_SCHEDULE_PATH")
+    if not path:
+        return DEFAULT_SCHEDULE
+    with open(path) as handle:
+        schedule: Dict[str, Any] = json.load(handle)
+    return schedule
+
+
+class FeeSchedules:
+    """The process's compiled schedule, built on first use or by the start-up warm-up."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.compiled: Optional[CompiledSchedule] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> CompiledSchedule:
+        compiled = self.compiled
+        if compiled is None:
+            with self._lock:
+                if self.compiled is None:
+                    self.compiled = compile_schedule(load_schedule(self.path))
+                compiled = self.compiled
+        return compiled
+
+    def reload(self) -> CompiledSchedule:
+        compiled = compile_schedule(load_schedule(self.path))
+        with self._lock:
+            self.compiled = compiled
+        return compiled
+
+
+fee_schedules = FeeSchedules()
@@ -0,0 +1,185 @@
+"""Background dependency probing for liveness and readiness endpoints.
+
+Probes run on a fixed interval in a background task and their results are
+cached, so ``/healthz`` and ``/readiness`` are served from memory no matter
+how hard orchestrators and load tests hit them. A cached result older than
+``staleness`` seconds counts as failed, so a wedged probe loop cannot keep
+reporting ready.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STATUS_UP = "up"
+STATUS_DOWN = "down"
+STATUS_UNKNOWN = "unknown"
+
+Probe = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class ProbeResult:
+    status: str = STATUS_UNKNOWN
+    latency_ms: Optional[float] = None
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class ProbeSpec:
+    probe: Probe
+    critical: bool = True
+    timeout: float = 2.0
+    result: ProbeResult = field(default_factory=ProbeResult)
+
+
+class HealthMonitor:
+    def __init__(self, interval: float = 5.0, staleness: float = 30.0) -> None:
+        self.interval = interval
+        self.staleness = staleness
+        self.probes: Dict[str, ProbeSpec] = {}
+        self.ready_gates: Dict[str, bool] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def register(self, name: str, probe: Probe, critical: bool = True, timeout: float = 2.0) -> None:
+        self.probes[name] = ProbeSpec(probe, critical, timeout)
+
+    def set_gate(self, name: str, open_: bool) -> None:
+        """Hold readiness closed until startup work such as cache warm-up finishes."""
+        self.ready_gates[name] = open_
+
+    async def _run_probe(self, name: str, spec: ProbeSpec) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(spec.probe(), timeout=spec.timeout)
+            status, error = STATUS_UP, None
+        except asyncio.TimeoutError:
+            status, error = STATUS_DOWN, f"timed out after {spec.timeout}s"
+        except Exception as exc:
+            status, error = STATUS_DOWN, f"{type(exc).__name__}: {exc}"[:200]
+        if status == STATUS_DOWN and spec.result.status != STATUS_DOWN:
+            logger.warning("Health probe %s failed: %s", name, error)
+        spec.result = ProbeResult(
+            status=status,
+            latency_ms=round((time.perf_counter() - started) * 1000, 2),
+            checked_at=time.time(),
+            error=error,
+        )
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self._run_probe(n, s) for n, s in self.probes.items()))
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe_all()
+            except Exception:
+                logger.exception("Health probe round failed")
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.probe_all()
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _effective_status(self, result: ProbeResult, now: float) -> str:
+        if result.checked_at is None:
+            return STATUS_UNKNOWN
+        if now - result.checked_at > self.staleness:
+            return STATUS_DOWN
+        return result.status
+
+    def readiness(self) -> Dict[str, object]:
+        """``status`` depends only on critical probes and gates; non-critical
+        dependencies that are not up are listed under ``degraded``."""
+        now = time.time()
+        dependencies = {}
+        ready = all(self.ready_gates.values())
+        degraded = []
+        for name, spec in self.probes.items():
+            status = self._effective_status(spec.result, now)
+            if status != STATUS_UP:
+                if spec.critical:
+                    ready = False
+                else:
+                    degraded.append(name)
+            dependencies[name] = {
+                "status": status,
+                "critical": spec.critical,
+                "latency_ms": spec.result.latency_ms,
+                "age_seconds": (
+                    round(now - spec.result.checked_at, 1) if spec.result.checked_at else None
+                ),
+                "error": spec.result.error,
+            }
+        return {
+            "status": "ready" if ready else "not_ready",
+            "degraded": degraded,
+            "dependencies": dependencies,
+            "gates": dict(self.ready_gates),
+        }
+
+
+async def probe_database() -> None:
+    from sqlalchemy import text
+
+    from app.database import engine
+
+    def ping() -> None:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    await asyncio.to_thread(ping)
+
+
+async def probe_redis() -> None:
+    from app.services.redis_client import get_redis
+
+    await asyncio.to_thread(get_redis().ping)
+
+
+async def probe_scheduler() -> None:
+    """Check that at least one dedicated scheduler instance is heartbeating."""
+    from app.services.distributed_scheduler import MEMBERS_KEY
+    from app.services.redis_client import get_redis
+
+    def live_members() -> int:
+        return int(get_redis().zcount(MEMBERS_KEY, time.time() - 30, "+inf"))
+
+    if await asyncio.to_thread(live_members) == 0:
+        raise RuntimeError("no live scheduler instances")
+
+
+def default_monitor() -> HealthMonitor:
+    import os
+
+    monitor = HealthMonitor(
+        interval=float(os.getenv("HEALTH_PROBE_INTERVAL", "5")),
+        staleness=float(os.getenv("HEALTH_PROBE_STALENESS", "30")),
+    )
+    monitor.register("database", probe_database, critical=True)
+    monitor.register("redis", probe_redis, critical=False)
+    monitor.register("scheduler", probe_scheduler, critical=False)
+
+    from app.services.outbound import DEFAULT_PROVIDERS, S3_SETTINGS
+    from app.services.resilience import register_circuit_probes
+
+    register_circuit_probes(monitor, [*DEFAULT_PROVIDERS, S3_SETTINGS.name])
+    return monitor
+
+
+health_monitor = default_monitor()
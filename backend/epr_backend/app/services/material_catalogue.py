@@ -0,0 +1,163 @@
+"""Materials catalogue seeding and the in-process material rate cache.
+
+``/api/materials/`` and every fee calculation need the catalogue. Seeding
+runs in the start-up warm-up (``app.services.warmup``). It hashes
+``CATALOGUE`` and compares the hash with the checksum stored in
+``seed_checksums``, so an unchanged catalogue costs one primary-key lookup
+per boot. When the catalogue changed, it is bulk-upserted by name in one
+transaction, and the ``materials`` resource version is bumped so ETags and
+caches see the change. On PostgreSQL a transaction-scoped advisory lock
+keeps workers booting together from seeding twice.
+
+``MaterialRates`` keeps the catalogue in memory, keyed by the
+``materials`` resource version, so fee calculations do not query it per
+request.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Column, DateTime, String, Table, bindparam, select, text, update
+from sqlalchemy.engine import Connection
+
+from app.database import Base, Material
+from app.services.metrics import record_cache
+from app.services.resource_versions import bump, get_version
+
+logger = logging.getLogger(__name__)
+
+SEED_NAME = "materials"
+ADVISORY_LOCK_ID = 0x6570_7273  # "eprs"
+
+# Fee rates are per kg.
+CATALOGUE: Sequence[Dict[str, Any]] = (
+    {"name": "Paper (Label)", "category": "Paper", "epr_rate": 0.12},
+    {"name": "Cardboard", "category": "Paper", "epr_rate": 0.08},
+    {"name": "Plastic (PET)", "category": "Plastic", "epr_rate": 0.45},
+    {"name": "Plastic (HDPE)", "category": "Plastic", "epr_rate": 0.41},
+    {"name": "Plastic (LDPE Film)", "category": "Plastic", "epr_rate": 0.62},
+    {"name": "Glass", "category": "Glass", "epr_rate": 0.05},
+    {"name": "Metal (Steel)", "category": "Metal", "epr_rate": 0.09},
+    {"name": "Aluminum", "category": "Metal", "epr_rate": 0.07},
+)
+
+seed_checksums = Table(
+    "seed_checksums",
+    Base.metadata,
+    Column("name", String, primary_key=True),
+    Column("checksum", String(64), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def catalogue_checksum(catalogue: Sequence[Dict[str, Any]] = CATALOGUE) -> str:
+    canonical = json.dumps(sorted(catalogue, key=lambda row: row["name"]), sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _stored_checksum(conn: Connection) -> Optional[str]:
+    return conn.execute(
+        select(seed_checksums.c.checksum).where(seed_checksums.c.name == SEED_NAME)
+    ).scalar()
+
+
+def seed_catalogue(conn: Connection, catalogue: Sequence[Dict[str, Any]] = CATALOGUE) -> bool:
+    """Upsert ``catalogue`` unless its checksum is already recorded; returns whether it wrote.
+
+    Call inside a transaction (``engine.begin()``).
+    """
+    checksum = catalogue_checksum(catalogue)
+    if _stored_checksum(conn) == checksum:
+        return False
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        if _stored_checksum(conn) == checksum:
+            return False  # another worker seeded while we waited
+
+    table = Material.__table__
+    columns = set(table.c.keys())
+    now = _utcnow()
+    rows = [
+        {key: value for key, value in {**row, "updated_at": now}.items() if key in columns}
+        for row in catalogue
+    ]
+    existing = set(conn.execute(select(table.c.name)).scalars())
+    inserts = [row for row in rows if row["name"] not in existing]
+    updates = [
+        {"_name": row["name"], **{k: v for k, v in row.items() if k != "name"}}
+        for row in rows
+        if row["name"] in existing
+    ]
+    if inserts:
+        conn.execute(table.insert(), inserts)
+    if updates:
+        conn.execute(
+            update(table)
+            .where(table.c.name == bindparam("_name"))
+            .values({key: bindparam(key) for key in updates[0] if key != "_name"}),
+            updates,
+        )
+
+    written = conn.execute(
+        update(seed_checksums)
+        .where(seed_checksums.c.name == SEED_NAME)
+        .values(checksum=checksum, applied_at=now)
+    ).rowcount
+    if not written:
+        conn.execute(seed_checksums.insert().values(name=SEED_NAME, checksum=checksum, applied_at=now))
+    bump(conn, ["materials"])
+    logger.info("Seeded materials catalogue: %d inserted, %d updated", len(inserts), len(updates))
+    return True
+
+
+class MaterialRate(NamedTuple):
+    id: Any
+    name: str
+    category: str
+    epr_rate: float
+
+
+class MaterialRates:
+    """Process-local copy of the catalogue, reloaded when the ``materials`` version moves."""
+
+    def __init__(self) -> None:
+        self.version = -1
+        self.by_name: Dict[str, MaterialRate] = {}
+        self._lock = threading.Lock()
+
+    def load(self, conn: Connection) -> Dict[str, MaterialRate]:
+        version, _ = get_version(conn, "materials")
+        if version == self.version and self.by_name:
+            record_cache("material_rates", True)
+            return self.by_name
+        with self._lock:
+            # Concurrent misses queue here; only the first one reloads.
+            if version == self.version and self.by_name:
+                record_cache("material_rates", True)
+                return self.by_name
+            record_cache("material_rates", False)
+            table = Material.__table__
+            rows = conn.execute(
+                select(table.c.id, table.c.name, table.c.category, table.c.epr_rate).order_by(table.c.name)
+            ).all()
+            self.by_name = {row.name: MaterialRate(*row) for row in rows}
+            self.version = version
+        return self.by_name
+
+    def rate(self, conn: Connection, name: str) -> Optional[float]:
+        material = self.load(conn).get(name)
+        return material.epr_rate if material is not None else None
+
+    def all(self, conn: Connection) -> List[MaterialRate]:
+        return list(self.load(conn).values())
+
+
+material_rates = MaterialRates()
@@ -0,0 +1,311 @@
+"""In-process metrics registry with Prometheus text exposition.
+
+Deliberately tiny: counters and fixed-bucket histograms keyed by a label
+tuple, updated without locks (CPython's GIL makes the list/float updates
+effectively atomic for our purposes, and a rare lost increment is acceptable
+for monitoring data). Recording one request costs a dict lookup, a bisect and
+three additions, which keeps middleware overhead in the low microseconds.
+
+Metrics are per process. With several workers, scrape each one or run them
+behind a sidecar that aggregates.
+"""
+
+import bisect
+import os
+import threading
+import time
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [
+        f'{name}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        values = self.values
+        values[labels] = values.get(labels, 0.0) + amount
+
+    def collect(self) -> Iterable[str]:
+        for labels, value in list(self.values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Gauge:
+    """Gauge set directly or, with ``callback``, sampled at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.callback = callback
+        self.values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, labels: LabelValues = ()) -> None:
+        self.values[labels] = value
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def collect(self) -> Iterable[str]:
+        values = dict(self.values)
+        if self.callback is not None:
+            try:
+                values.update(self.callback())
+            except Exception:
+                pass
+        for labels, value in values.items():
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self.series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series.setdefault(labels, [0.0] * (len(self.buckets) + 2))
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> Iterable[str]:
+        for labels, series in list(self.series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield (
+                    f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]!r}"
+            yield (
+                f"{self.name}_count{_format_labels(self.label_names, labels)} "
+                f"{_format_value(cumulative)}"
+            )
+
+
+Metric = Union[Counter, Gauge, Histogram]
+M = TypeVar("M", Counter, Gauge, Histogram)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: M) -> M:
+        with self._lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing  # type: ignore[return-value]
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ) -> Gauge:
+        return self.register(Gauge(name, help_text, labels, callback))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request", ("route",), COUNT_BUCKETS
+)
+db_time_per_request = registry.histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per HTTP request", ("route",)
+)
+celery_task_duration = registry.histogram(
+    "celery_task_duration_seconds", "Celery task run time", ("task", "state")
+)
+celery_queue_latency = registry.histogram(
+    "celery_queue_latency_seconds", "Time from publish to task start", ("task",)
+)
+cache_requests = registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result", ("cache", "result")
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    cache_requests.inc((cache, "hit" if hit else "miss"))
+
+
+def _queue_depths() -> Dict[LabelValues, float]:
+    from app.services.redis_client import get_redis
+    from app.services.task_queues import MAX_PRIORITY, QUEUES
+
+    # With Redis priority steps each queue is split into "<queue>" and "<queue>:<n>" lists.
+    keys = [
+        (queue, queue if step == 0 else f"{queue}:{step}")
+        for queue in QUEUES
+        for step in range(MAX_PRIORITY + 1)
+    ]
+    pipe = get_redis().pipeline(transaction=False)
+    for _, key in keys:
+        pipe.llen(key)
+    depths: Dict[LabelValues, float] = {}
+    for (queue, _), depth in zip(keys, pipe.execute()):
+        depths[(queue,)] = depths.get((queue,), 0.0) + depth
+    return depths
+
+
+celery_queue_depth = registry.gauge(
+    "celery_queue_depth", "Messages waiting in each Celery queue", ("queue",), _queue_depths
+)
+
+
+def _encryption_key_cache() -> Dict[LabelValues, float]:
+    from app.security import encryption
+
+    encryptor = encryption._encryptor
+    if encryptor is None:
+        return {}
+    return {
+        ("hit",): float(encryptor.cache.hits),
+        ("miss",): float(encryptor.cache.misses),
+    }
+
+
+registry.gauge(
+    "encryption_key_cache_lookups",
+    "Data key cache lookups since process start",
+    ("result",),
+    _encryption_key_cache,
+)
+
+
+def install_celery_metrics() -> None:
+    """Record task run times; call once in worker processes."""
+    from celery import signals
+
+    started: Dict[str, float] = {}
+
+    def _prerun(task_id: Optional[str] = None, **kwargs: object) -> None:
+        if task_id:
+            started[task_id] = time.perf_counter()
+
+    def _postrun(
+        task_id: Optional[str] = None, task: object = None, state: Optional[str] = None, **kwargs: object
+    ) -> None:
+        begin = started.pop(task_id or "", None)
+        if begin is not None and task is not None:
+            celery_task_duration.observe(
+                time.perf_counter() - begin, (getattr(task, "name", "unknown"), state or "UNKNOWN")
+            )
+
+    signals.task_prerun.connect(_prerun, weak=False)
+    signals.task_postrun.connect(_postrun, weak=False)
+
+    port = os.getenv("CELERY_METRICS_PORT")
+    if port:
+        start_metrics_server(int(port))
+
+
+def start_metrics_server(port: int) -> None:
+    """Expose /metrics over a plain HTTP thread (for Celery workers)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
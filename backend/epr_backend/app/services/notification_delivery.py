@@ -0,0 +1,126 @@
+"""Email and SMS delivery with a queue fallback.
+
+``deliver_or_queue`` sends through the pooled SendGrid/Twilio clients. When
+the provider's circuit is open, its bulkhead is full or the connection
+fails, or it still answers 429/5xx after the client's retries, it enqueues
+``notifications.deliver`` instead of holding the request, so the caller gets
+an answer right away and the message goes out once the provider recovers.
+The task retries with backoff while the provider is still unavailable.
+"""
+
+import asyncio
+import logging
+import math
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.services.outbound import OutboundClients, outbound_clients, run_with_clients
+from app.services.resilience import DependencyUnavailable
+from app.services.tasks import task
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_EMAIL = "email"
+CHANNEL_SMS = "sms"
+
+DELIVERED = "sent"
+QUEUED = "queued"
+
+DEFAULT_RETRY_AFTER = 30.0
+
+
+class DeliveryError(RuntimeError):
+    pass
+
+
+class ProviderDegraded(DependencyUnavailable):
+    """The provider still answered 429 or 5xx after the client's retries."""
+
+
+# Failures after which a message is worth retrying later rather than reporting.
+DEFERRABLE_ERRORS = (DependencyUnavailable, httpx.TransportError)
+
+
+def _retry_after(response: httpx.Response) -> float:
+    try:
+        return max(1.0, float(response.headers["retry-after"]))
+    except (KeyError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+def _check_response(provider: str, response: httpx.Response, accepted: Tuple[int, ...]) -> None:
+    if response.status_code in accepted:
+        return
+    if response.status_code == 429 or response.status_code >= 500:
+        raise ProviderDegraded(provider, f"HTTP {response.status_code}", _retry_after(response))
+    raise DeliveryError(f"{provider} returned {response.status_code}")
+
+
+async def send_email(clients: OutboundClients, payload: Dict[str, Any]) -> None:
+    """``payload``: ``to``, ``subject``, ``html`` and optionally ``from_email``.
+
+    ``to`` may be a list; each address then gets its own copy from a single
+    request (SendGrid allows up to 1000 personalizations).
+    """
+    recipients = [payload["to"]] if isinstance(payload["to"], str) else payload["to"]
+    body = {
+        "personalizations": [{"to": [{"email": email}]} for email in recipients],
+        "from": {"email": payload.get("from_email") or os.getenv("SENDGRID_FROM_EMAIL", "noreply@eprcopilot.com")},
+        "subject": payload["subject"],
+        "content": [{"type": "text/html", "value": payload["html"]}],
+    }
+    response = await clients.request(
+        "sendgrid",
+        "POST",
+        "/v3/mail/send",
+        json=body,
+        headers={"Authorization": f"Bearer {os.getenv('SENDGRID_API_KEY', '')}"},
+    )
+    _check_response("sendgrid", response, (200, 202))
+
+
+async def send_sms(clients: OutboundClients, payload: Dict[str, Any]) -> None:
+    """``payload``: ``to`` and ``body``."""
+    sid = os.getenv("TWILIO_ACCOUNT_SID", "")
+    response = await clients.request(
+        "twilio",
+        "POST",
+        f"/2010-04-01/Accounts/{sid}/Messages.json",
+        data={"To": payload["to"], "From": os.getenv("TWILIO_FROM_NUMBER", ""), "Body": payload["body"]},
+        auth=(sid, os.getenv("TWILIO_AUTH_TOKEN", "")),
+    )
+    _check_response("twilio", response, (200, 201))
+
+
+SENDERS = {CHANNEL_EMAIL: send_email, CHANNEL_SMS: send_sms}
+
+
+async def deliver_or_queue(
+    channel: str, payload: Dict[str, Any], clients: Optional[OutboundClients] = None
+) -> str:
+    """Send now, or queue for later if the provider is unavailable; returns ``sent`` or ``queued``."""
+    try:
+        await SENDERS[channel](clients or outbound_clients, payload)
+        return DELIVERED
+    except DEFERRABLE_ERRORS as exc:
+        countdown = getattr(exc, "retry_after", DEFAULT_RETRY_AFTER)
+        logger.info("Queued %s notification for later delivery: %s", channel, exc)
+        await asyncio.to_thread(
+            deliver_notification.apply_async, args=(channel, payload), countdown=math.ceil(countdown)
+        )
+        return QUEUED
+
+
+@task(
+    name="notifications.deliver",
+    autoretry_for=DEFERRABLE_ERRORS,
+    retry_backoff=30,
+    retry_backoff_max=900,
+    retry_jitter=True,
+    max_retries=12,
+)
+def deliver_notification(channel: str, payload: Dict[str, Any]) -> None:
+    """Worker-side delivery on the process's pooled clients; deferrable errors are retried with backoff."""
+    run_with_clients(lambda clients: SENDERS[channel](clients, payload))
@@ -0,0 +1,323 @@
+"""Application-lifetime pooled clients for external providers.
+
+Building an SDK or HTTP client per message means a new connection pool and a
+new TLS handshake per email, SMS or payment call. ``OutboundClients`` holds
+one ``httpx.AsyncClient`` per provider (HTTP/2 when ``h2`` is installed,
+bounded keep-alive pool) and one boto3 session whose S3 client has a tuned
+``max_pool_connections``. They are opened on application start-up and closed
+on shutdown::
+
+    app = FastAPI(lifespan=outbound_lifespan)
+
+    response = await outbound_clients.request("sendgrid", "POST", "/v3/mail/send", json=payload)
+
+Synchronous code such as Celery tasks uses ``run_with_clients``, which keeps
+one event loop and one pool per process instead of a new pool per call.
+
+Each provider has its own timeouts, retry policy and circuit-breaker
+thresholds (``ProviderSettings``), overridable per provider through
+``OUTBOUND_<PROVIDER>_<SETTING>`` environment variables. Calls run under the
+provider's ``resilience.DependencyGuard`` and raise ``DependencyUnavailable``
+at once while its circuit is open or its bulkhead is full. Every request
+records whether it opened a new connection or reused a pooled one.
+"""
+
+import asyncio
+import contextlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, fields, replace
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import httpx
+
+from app.services.metrics import registry
+from app.services.resilience import DependencyGuard, guard_for
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+outbound_requests = registry.counter(
+    "outbound_requests_total", "Requests to external providers by outcome", ("provider", "outcome")
+)
+outbound_duration = registry.histogram(
+    "outbound_request_duration_seconds", "External provider request latency", ("provider",)
+)
+outbound_connections = registry.counter(
+    "outbound_connections_total", "External requests by whether a pooled connection was reused", ("provider", "kind")
+)
+
+
+@dataclass(frozen=True)
+class ProviderSettings:
+    name: str
+    base_url: str
+    timeout: float = 10.0
+    connect_timeout: float = 3.0
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry: float = 30.0
+    max_retries: int = 2
+    retry_backoff: float = 0.2
+    # Circuit breaker: open after this many consecutive failures, probe again after recovery_timeout.
+    failure_threshold: int = 5
+    recovery_timeout: float = 30.0
+    # Bulkhead: concurrent calls allowed before callers fail fast.
+    max_concurrency: int = 20
+
+    def with_env(self) -> "ProviderSettings":
+        overrides: Dict[str, Any] = {}
+        for field in fields(self):
+            if field.name == "name":
+                continue
+            raw = os.getenv(f"OUTBOUND_{self.name.upper()}_{field.name.upper()}")
+            if raw is not None:
+                overrides[field.name] = type(getattr(self, field.name))(raw)
+        return replace(self, **overrides)
+
+
+DEFAULT_PROVIDERS: Dict[str, ProviderSettings] = {
+    "sendgrid": ProviderSettings("sendgrid", "https://api.sendgrid.com", timeout=10.0),
+    "twilio": ProviderSettings("twilio", "https://api.twilio.com", timeout=10.0),
+    "stripe": ProviderSettings("stripe", "https://api.stripe.com", timeout=20.0, max_retries=1),
+}
+
+S3_SETTINGS = ProviderSettings(
+    "s3", "", timeout=30.0, max_connections=50, max_retries=3, max_concurrency=50
+)
+
+
+class _ConnectionTrace:
+    """httpcore trace hook noting whether the request had to open a connection."""
+
+    def __init__(self) -> None:
+        self.connected = False
+
+    async def __call__(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connected = True
+
+
+def _s3_failure(exc: BaseException) -> bool:
+    """Client errors such as NoSuchKey say nothing about S3's health."""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        status: int = response.get("ResponseMetadata", {}).get("HTTPStatusCode", 500)
+        return status >= 500 or status == 429
+    return True
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class OutboundClients:
+    def __init__(
+        self,
+        providers: Optional[Dict[str, ProviderSettings]] = None,
+        s3_settings: ProviderSettings = S3_SETTINGS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.providers = {
+            name: settings.with_env() for name, settings in (providers or DEFAULT_PROVIDERS).items()
+        }
+        self.s3_settings = s3_settings.with_env()
+        self.guards: Dict[str, DependencyGuard] = {
+            settings.name: guard_for(
+                settings.name, settings.failure_threshold, settings.recovery_timeout, settings.max_concurrency
+            )
+            for settings in [*self.providers.values(), self.s3_settings]
+        }
+        self._transport = transport
+        self._http: Dict[str, httpx.AsyncClient] = {}
+        self._aws_session: Any = None
+        self._s3: Any = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self._http)
+
+    async def start(self) -> None:
+        if self._http:
+            return
+        http2 = http2_available()
+        if not http2:
+            logger.info("h2 is not installed; outbound clients use HTTP/1.1 keep-alive")
+        for name, settings in self.providers.items():
+            self._http[name] = httpx.AsyncClient(
+                base_url=settings.base_url,
+                http2=http2,
+                timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.max_connections,
+                    max_keepalive_connections=settings.max_keepalive,
+                    keepalive_expiry=settings.keepalive_expiry,
+                ),
+                transport=self._transport,
+            )
+
+    async def aclose(self) -> None:
+        clients, self._http = self._http, {}
+        await asyncio.gather(*(client.aclose() for client in clients.values()), return_exceptions=True)
+        if self._s3 is not None and hasattr(self._s3, "close"):
+            self._s3.close()
+        self._s3 = None
+        self._aws_session = None
+
+    def forget(self) -> None:
+        """Drop clients inherited across a fork without closing the parent's sockets."""
+        self._http = {}
+        self._s3 = None
+        self._aws_session = None
+
+    def http(self, provider: str) -> httpx.AsyncClient:
+        try:
+            return self._http[provider]
+        except KeyError:
+            raise RuntimeError(
+                f"No outbound client for {provider!r}; is the application lifespan running?"
+            ) from None
+
+    def settings(self, provider: str) -> ProviderSettings:
+        if provider == self.s3_settings.name:
+            return self.s3_settings
+        return self.providers[provider]
+
+    async def request(
+        self, provider: str, method: str, url: str, retry: Optional[bool] = None, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request on the provider's pooled client.
+
+        Connection errors, timeouts and 429/502/503/504 responses are retried
+        with exponential backoff up to ``max_retries`` times, for idempotent
+        methods or when ``retry=True`` (e.g. requests carrying an
+        idempotency key). Raises ``DependencyUnavailable`` without sending
+        anything while the provider's circuit is open or its bulkhead is full.
+        """
+        client = self.http(provider)
+        settings = self.providers[provider]
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        retries = settings.max_retries if retry else 0
+        extra_extensions = kwargs.pop("extensions", {})
+        async with self.guards[provider].slot() as slot:
+            attempt = 0
+            while True:
+                trace = _ConnectionTrace()
+                extensions = {**extra_extensions, "trace": trace}
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, extensions=extensions, **kwargs)
+                except httpx.TransportError as exc:
+                    outbound_duration.observe(time.perf_counter() - started, (provider,))
+                    outbound_requests.inc((provider, type(exc).__name__))
+                    if attempt >= retries:
+                        raise
+                else:
+                    outbound_duration.observe(time.perf_counter() - started, (provider,))
+                    outbound_connections.inc((provider, "new" if trace.connected else "reused"))
+                    outbound_requests.inc((provider, str(response.status_code)))
+                    if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                        if response.status_code in RETRY_STATUSES or response.status_code >= 500:
+                            slot.fail()
+                        return response
+                    await response.aclose()
+                attempt += 1
+                await asyncio.sleep(settings.retry_backoff * 2 ** (attempt - 1))
+
+    async def s3_call(self, operation: str, **kwargs: Any) -> Any:
+        """Run a blocking S3 client operation in a thread under the S3 guard."""
+        client = self.s3()
+        async with self.guards[self.s3_settings.name].slot(is_failure=_s3_failure):
+            return await asyncio.to_thread(getattr(client, operation), **kwargs)
+
+    def aws_session(self) -> Any:
+        if self._aws_session is None:
+            import boto3
+
+            self._aws_session = boto3.session.Session()
+        return self._aws_session
+
+    def s3(self) -> Any:
+        """Shared S3 client; botocore clients are thread-safe and pool connections internally."""
+        if self._s3 is None:
+            from botocore.config import Config
+
+            settings = self.s3_settings
+            self._s3 = self.aws_session().client(
+                "s3",
+                config=Config(
+                    max_pool_connections=settings.max_connections,
+                    connect_timeout=settings.connect_timeout,
+                    read_timeout=settings.timeout,
+                    retries={"mode": "standard", "max_attempts": settings.max_retries + 1},
+                    tcp_keepalive=True,
+                ),
+            )
+        return self._s3
+
+
+outbound_clients = OutboundClients()
+
+
+@contextlib.asynccontextmanager
+async def outbound_lifespan(app: Any = None, clients: Optional[OutboundClients] = None) -> AsyncIterator[None]:
+    """FastAPI ``lifespan`` (or a piece of one) that opens and closes the pooled clients."""
+    clients = clients or outbound_clients
+    await clients.start()
+    try:
+        yield
+    finally:
+        await clients.aclose()
+
+
+_process_loop: Optional[Tuple[int, asyncio.AbstractEventLoop]] = None
+_process_loop_lock = threading.Lock()
+
+
+def _client_loop() -> asyncio.AbstractEventLoop:
+    global _process_loop
+    with _process_loop_lock:
+        if _process_loop is None or _process_loop[0] != os.getpid():
+            if _process_loop is not None:
+                # Forked child: the parent's loop thread did not come along.
+                outbound_clients.forget()
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="outbound-clients", daemon=True).start()
+            _process_loop = (os.getpid(), loop)
+        return _process_loop[1]
+
+
+def run_with_clients(
+    call: Callable[[OutboundClients], Awaitable[T]], clients: Optional[OutboundClients] = None
+) -> T:
+    """Run ``call(clients)`` from synchronous code and wait for the result.
+
+    httpx pools belong to the event loop that opened them, so Celery tasks
+    share one long-lived loop per process rather than ``asyncio.run`` opening
+    a pool per task. Not for processes whose lifespan already runs the
+    clients on their own loop.
+    """
+    clients = clients or outbound_clients
+
+    async def run() -> T:
+        await clients.start()
+        return await call(clients)
+
+    return asyncio.run_coroutine_threadsafe(run(), _client_loop()).result()
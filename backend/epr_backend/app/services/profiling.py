@@ -0,0 +1,82 @@
+"""Request profiling and slow-request trace storage.
+
+Traces live in a bounded in-process ring buffer that the admin endpoint
+reads; nothing is shipped to an external APM. A trace holds the request
+summary, every SQL statement with its duration and, when the request was
+profiled, a pyinstrument call-tree rendering.
+"""
+
+import hmac
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+MAX_STATEMENT_LENGTH = 2000
+
+
+@dataclass
+class RequestTrace:
+    id: str
+    method: str
+    path: str
+    route: Optional[str]
+    status: int
+    duration_ms: float
+    started_at: float
+    reason: str
+    sql_count: int
+    sql_time_ms: float
+    sql: List[Dict[str, Any]] = field(default_factory=list)
+    profile: Optional[str] = None
+
+    def summary(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("sql")
+        data.pop("profile")
+        data["profiled"] = self.profile is not None
+        return data
+
+
+class TraceBuffer:
+    def __init__(self, capacity: int = 200) -> None:
+        self._traces: Deque[RequestTrace] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        return f"{int(time.time())}-{next(self._ids)}"
+
+    def add(self, trace: RequestTrace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def list(self, limit: int = 50) -> List[RequestTrace]:
+        with self._lock:
+            return list(reversed(self._traces))[:limit]
+
+    def get(self, trace_id: str) -> Optional[RequestTrace]:
+        with self._lock:
+            return next((t for t in self._traces if t.id == trace_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+def format_statements(statements: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+    return [
+        {"statement": statement[:MAX_STATEMENT_LENGTH], "duration_ms": round(seconds * 1000, 3)}
+        for statement, seconds in statements
+    ]
+
+
+def admin_token_matches(token: Optional[str]) -> bool:
+    expected = os.getenv("PROFILING_ADMIN_TOKEN")
+    return bool(expected and token and hmac.compare_digest(token, expected))
+
+
+trace_buffer = TraceBuffer(int(os.getenv("PROFILING_BUFFER_SIZE", "200")))
@@ -0,0 +1,135 @@
+"""Per-request SQL statistics collected from SQLAlchemy cursor events.
+
+``begin()`` binds a fresh ``QueryStats`` to the current context (the request
+task); the engine listeners installed by ``install_query_listeners`` then
+attribute every statement executed in that context to it. Outside a tracked
+context the listeners cost one ContextVar lookup.
+"""
+
+import collections
+import re
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_START_KEY = "query_stats_start"
+
+
+class QueryStats:
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        # (statement, seconds) pairs; only collected when a consumer opts in.
+        self.statements: Optional[List[Tuple[str, float]]] = None
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def begin() -> "Token[Optional[QueryStats]]":
+    return _current.set(QueryStats())
+
+
+def end(token: "Token[Optional[QueryStats]]") -> Optional[QueryStats]:
+    stats = _current.get()
+    _current.reset(token)
+    return stats
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def join() -> "Tuple[QueryStats, Optional[Token[Optional[QueryStats]]]]":
+    """Return the active stats, beginning new ones if nothing is tracking yet.
+
+    The token is ``None`` when joining an existing context; only the caller
+    that began tracking should ``end`` it.
+    """
+    stats = _current.get()
+    if stats is not None:
+        return stats, None
+    token = begin()
+    return _current.get(), token  # type: ignore[return-value]
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats.count += 1
+    stats.duration += elapsed
+    if stats.statements is not None:
+        stats.statements.append((statement, elapsed))
+
+
+def install_query_listeners(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+_LITERAL_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|\$\d+"), "?"),
+    (re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"__\[POSTCOMPILE_\w+\]"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),
+    (re.compile(r"\s+"), " "),
+)
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so executions differing only in literals compare equal."""
+    shape = statement
+    for pattern, replacement in _LITERAL_PATTERNS:
+        shape = pattern.sub(replacement, shape)
+    return shape.strip()
+
+
+def repeated_shapes(statements: Iterable[str], threshold: int) -> Dict[str, int]:
+    """Statement shapes executed at least ``threshold`` times: likely N+1 queries."""
+    counts = collections.Counter(statement_shape(s) for s in statements)
+    return {shape: n for shape, n in counts.items() if n >= threshold}
+
+
+class QueryCounter:
+    """Count statements on every engine while active (tests and scripts).
+
+    Unlike the request-scoped listeners this hooks the ``Engine`` class, so it
+    sees statements from any engine, including test-local ones.
+    """
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+
+    def _record(self, conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        return repeated_shapes(self.statements, threshold)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(Engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        event.remove(Engine, "before_cursor_execute", self._record)
@@ -0,0 +1,25 @@
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import redis
+
+
+@lru_cache(maxsize=None)
+def get_redis(url: str = "") -> "redis.Redis":
+    """Process-wide Redis client; the connection pool is shared by all callers.
+
+    Every command is bounded by ``REDIS_SOCKET_TIMEOUT`` (and connecting by
+    ``REDIS_CONNECT_TIMEOUT``), so an unreachable Redis fails fast into the
+    callers' fallbacks instead of parking their threads.
+    """
+    import redis
+
+    return redis.Redis.from_url(
+        url or os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+        health_check_interval=30,
+        socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "1.0")),
+        socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "1.0")),
+    )
@@ -0,0 +1,251 @@
+"""Set-based deadline reminder planning.
+
+Instead of walking organizations and users one at a time, each scheduler tick
+runs a single query that returns every (organization, deadline, recipient)
+whose deadline is exactly ``days_remaining`` days away for one of the
+configured thresholds. The ``due_date IN (...)`` predicate is served by
+``ix_compliance_deadlines_due_open``, so the cost scales with the number of
+reminders due today rather than with the number of organizations.
+
+Recipients are grouped by (deadline type, days remaining, locale). Every
+recipient in a group receives identical content, so each template is rendered
+once per group and delivered in batches.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Table,
+    literal,
+    select,
+)
+from sqlalchemy.orm import Session
+
+from app.database import Base, User
+from app.services.notification_delivery import (
+    CHANNEL_EMAIL,
+    CHANNEL_SMS,
+    deliver_or_queue,
+)
+from app.services.outbound import OutboundClients, run_with_clients
+from app.services.tasks import task
+
+logger = logging.getLogger(__name__)
+
+REMINDER_THRESHOLDS: Tuple[int, ...] = (30, 14, 7, 3, 1)
+DEFAULT_LOCALE = "en"
+EMAIL_BATCH_SIZE = 1000
+SMS_CONCURRENCY = 20
+
+compliance_deadlines = Table(
+    "compliance_deadlines",
+    Base.metadata,
+    Column("id", String, primary_key=True),
+    Column(
+        "organization_id", String, ForeignKey("organizations.id"), nullable=False, index=True
+    ),
+    Column("deadline_type", String, nullable=False),
+    Column("due_date", Date, nullable=False),
+    Column("completed_at", DateTime, nullable=True),
+)
+
+Index(
+    "ix_compliance_deadlines_due_open",
+    compliance_deadlines.c.due_date,
+    compliance_deadlines.c.organization_id,
+    postgresql_where=compliance_deadlines.c.completed_at.is_(None),
+    sqlite_where=compliance_deadlines.c.completed_at.is_(None),
+)
+
+DEADLINE_LABELS = {
+    "quarterly_report": "quarterly EPR report",
+    "annual_report": "annual EPR report",
+    "fee_payment": "EPR fee payment",
+    "registration_renewal": "producer registration renewal",
+}
+
+TEMPLATES: Dict[str, Dict[str, str]] = {
+    "en": {
+        "subject": "Reminder: {label} due in {days} day{plural}",
+        "html": (
+            "<p>Your {label} is due on <strong>{due_date}</strong> "
+            "({days} day{plural} from today).</p>"
+            "<p>Log in to EPR Co-Pilot to review and submit.</p>"
+        ),
+        "sms": "EPR Co-Pilot: your {label} is due {due_date} ({days} day{plural} left).",
+    },
+}
+
+
+@dataclass(frozen=True)
+class Recipient:
+    organization_id: str
+    email: Optional[str]
+    phone: Optional[str] = None
+
+
+@dataclass
+class ReminderBatch:
+    deadline_type: str
+    days_remaining: int
+    due_date: date
+    locale: str
+    subject: str
+    html_content: str
+    sms_message: str
+    recipients: List[Recipient] = field(default_factory=list)
+
+
+def render(deadline_type: str, days_remaining: int, due_date: date, locale: str) -> Dict[str, str]:
+    templates = TEMPLATES.get(locale) or TEMPLATES[DEFAULT_LOCALE]
+    context = {
+        "label": DEADLINE_LABELS.get(deadline_type, deadline_type.replace("_", " ")),
+        "days": days_remaining,
+        "plural": "" if days_remaining == 1 else "s",
+        "due_date": due_date.isoformat(),
+    }
+    return {name: template.format(**context) for name, template in templates.items()}
+
+
+def reminder_query(today: date, thresholds: Sequence[int] = REMINDER_THRESHOLDS) -> Any:
+    users = User.__table__
+    deadlines = compliance_deadlines
+    locale = users.c.locale if "locale" in users.c else literal(DEFAULT_LOCALE)
+    phone = users.c.phone_number if "phone_number" in users.c else literal(None)
+    due_dates = [today + timedelta(days=days) for days in thresholds]
+    return (
+        select(
+            deadlines.c.organization_id,
+            deadlines.c.deadline_type,
+            deadlines.c.due_date,
+            users.c.email,
+            locale.label("locale"),
+            phone.label("phone"),
+        )
+        .join(users, users.c.organization_id == deadlines.c.organization_id)
+        .where(deadlines.c.due_date.in_(due_dates), deadlines.c.completed_at.is_(None))
+    )
+
+
+def plan_reminders(
+    session: Session, today: date, thresholds: Sequence[int] = REMINDER_THRESHOLDS
+) -> List[ReminderBatch]:
+    """Compute all reminder batches for ``today`` with a single query."""
+    groups: Dict[Tuple[str, date, str], ReminderBatch] = {}
+    for row in session.execute(reminder_query(today, thresholds)):
+        locale = row.locale or DEFAULT_LOCALE
+        key = (row.deadline_type, row.due_date, locale)
+        batch = groups.get(key)
+        if batch is None:
+            days_remaining = (row.due_date - today).days
+            rendered = render(row.deadline_type, days_remaining, row.due_date, locale)
+            batch = groups[key] = ReminderBatch(
+                deadline_type=row.deadline_type,
+                days_remaining=days_remaining,
+                due_date=row.due_date,
+                locale=locale,
+                subject=rendered["subject"],
+                html_content=rendered["html"],
+                sms_message=rendered["sms"],
+            )
+        batch.recipients.append(Recipient(row.organization_id, row.email, row.phone))
+    return list(groups.values())
+
+
+class ReminderSink(Protocol):
+    async def send_batch(self, batch: ReminderBatch) -> int: ...
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class NotificationReminderSink:
+    """Deliver batches through the pooled SendGrid and Twilio clients.
+
+    One SendGrid request carries up to ``EMAIL_BATCH_SIZE`` recipients, each of
+    whom receives an individual copy. SMS has no bulk API, so messages are sent
+    with bounded concurrency. Both go through ``deliver_or_queue``: while a
+    provider is unavailable the reminder is queued rather than dropped.
+    Counts include queued messages.
+    """
+
+    def __init__(self, clients: Optional[OutboundClients] = None, from_email: Optional[str] = None) -> None:
+        self.clients = clients
+        self.from_email = from_email or os.getenv("SENDGRID_FROM_EMAIL", "noreply@eprcopilot.com")
+
+    async def send_batch(self, batch: ReminderBatch) -> int:
+        sent = 0
+        emails = sorted({r.email for r in batch.recipients if r.email})
+        for chunk in _chunks(emails, EMAIL_BATCH_SIZE):
+            payload = {
+                "to": list(chunk),
+                "subject": batch.subject,
+                "html": batch.html_content,
+                "from_email": self.from_email,
+            }
+            try:
+                await deliver_or_queue(CHANNEL_EMAIL, payload, self.clients)
+                sent += len(chunk)
+            except Exception:
+                logger.exception("Failed to send %s reminder batch", batch.deadline_type)
+
+        phones = sorted({r.phone for r in batch.recipients if r.phone})
+        if phones:
+            semaphore = asyncio.Semaphore(SMS_CONCURRENCY)
+
+            async def send_sms(number: str) -> bool:
+                async with semaphore:
+                    try:
+                        await deliver_or_queue(
+                            CHANNEL_SMS, {"to": number, "body": batch.sms_message}, self.clients
+                        )
+                        return True
+                    except Exception:
+                        logger.exception("Failed to send %s reminder SMS", batch.deadline_type)
+                        return False
+
+            results = await asyncio.gather(*(send_sms(number) for number in phones))
+            sent += sum(results)
+        return sent
+
+
+async def deliver(batches: Sequence[ReminderBatch], sink: ReminderSink) -> int:
+    total = 0
+    for batch in batches:
+        total += await sink.send_batch(batch)
+        logger.info(
+            "Sent %s reminder (%d days, %s) to %d recipients",
+            batch.deadline_type,
+            batch.days_remaining,
+            batch.locale,
+            len(batch.recipients),
+        )
+    return total
+
+
+@task(name="reminders.plan_deadline_reminders")
+def plan_deadline_reminders(scheduled_time: Optional[float] = None, missed_runs: int = 0) -> int:
+    from app.database import SessionLocal
+    from app.db_routing import read_replica
+
+    today = (
+        datetime.fromtimestamp(scheduled_time, timezone.utc).date()
+        if scheduled_time is not None
+        else date.today()
+    )
+    with read_replica(), SessionLocal() as session:
+        batches = plan_reminders(session, today)
+    return run_with_clients(lambda clients: deliver(batches, NotificationReminderSink(clients)))
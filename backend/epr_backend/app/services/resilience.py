@@ -0,0 +1,247 @@
+"""Circuit breakers and bulkheads for external dependencies.
+
+Each dependency (SendGrid, Twilio, Stripe, S3) gets a ``DependencyGuard``:
+
+* a bulkhead capping concurrent calls, so a slow provider can tie up at most
+  ``max_concurrency`` requests instead of every worker and DB connection;
+* a circuit breaker that opens after ``failure_threshold`` consecutive
+  failures, fails fast while open, and after ``recovery_timeout`` lets a
+  single half-open probe through to decide whether to close again.
+
+Rejections raise ``DependencyUnavailable`` (``CircuitOpenError`` or
+``BulkheadFullError``) immediately with a ``retry_after`` hint, which callers
+turn into a fallback: queue the notification, answer 202 for the report.
+
+Guards are per process and shared by name, so every client for a provider
+sees the same breaker. Their state is exported as metrics and as
+non-critical readiness dependencies.
+"""
+
+import contextlib
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_HALF_OPEN = "half_open"
+STATE_OPEN = "open"
+STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+
+class DependencyUnavailable(RuntimeError):
+    def __init__(self, dependency: str, reason: str, retry_after: float) -> None:
+        super().__init__(f"{dependency} unavailable: {reason}")
+        self.dependency = dependency
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(DependencyUnavailable):
+    pass
+
+
+class BulkheadFullError(DependencyUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return STATE_CLOSED
+        if self.clock() - self.opened_at >= self.recovery_timeout:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(1.0, self.recovery_timeout - (self.clock() - self.opened_at))
+
+    def before_call(self) -> None:
+        """Raise ``CircuitOpenError`` unless the call may proceed.
+
+        While half-open only one probe is in flight; everyone else keeps
+        failing fast until it reports back.
+        """
+        state = self.state
+        if state == STATE_CLOSED:
+            return
+        if state == STATE_HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError(self.name, "circuit open", self.retry_after())
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info("Circuit for %s closed", self.name)
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                logger.warning("Circuit for %s opened after %d failures", self.name, self.failures)
+            self.opened_at = self.clock()
+        self._probing = False
+
+
+class Bulkhead:
+    """Fail-fast concurrency limit (a semaphore that never queues callers)."""
+
+    def __init__(self, name: str, max_concurrency: int) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.in_use = 0
+
+    def acquire(self) -> None:
+        if self.in_use >= self.max_concurrency:
+            raise BulkheadFullError(self.name, "too many concurrent calls", 1.0)
+        self.in_use += 1
+
+    def release(self) -> None:
+        self.in_use -= 1
+
+
+class CallSlot:
+    """Handle for one guarded call; ``fail()`` marks an unsuccessful result that raised nothing."""
+
+    def __init__(self) -> None:
+        self.failed = False
+
+    def fail(self) -> None:
+        self.failed = True
+
+
+calls_rejected = registry.counter(
+    "dependency_calls_rejected_total", "Calls refused by a circuit breaker or bulkhead", ("dependency", "reason")
+)
+
+
+class DependencyGuard:
+    def __init__(self, breaker: CircuitBreaker, bulkhead: Bulkhead) -> None:
+        self.name = breaker.name
+        self.breaker = breaker
+        self.bulkhead = bulkhead
+
+    @contextlib.asynccontextmanager
+    async def slot(
+        self, is_failure: Optional[Callable[[BaseException], bool]] = None
+    ) -> AsyncIterator[CallSlot]:
+        """Run one call under the bulkhead and breaker.
+
+        An exception escaping the block (unless ``is_failure`` says it is the
+        caller's fault, e.g. a 404), or ``slot.fail()``, counts as a failure;
+        anything else closes the circuit.
+        """
+        try:
+            self.bulkhead.acquire()
+        except BulkheadFullError:
+            calls_rejected.inc((self.name, "bulkhead"))
+            raise
+        try:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                calls_rejected.inc((self.name, "circuit_open"))
+                raise
+            call = CallSlot()
+            try:
+                yield call
+            except BaseException as exc:
+                if is_failure is None or is_failure(exc):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                raise
+            if call.failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        finally:
+            self.bulkhead.release()
+
+    async def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        async with self.slot():
+            return await fn(*args, **kwargs)
+
+
+_guards: Dict[str, DependencyGuard] = {}
+
+
+def guard_for(
+    name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0, max_concurrency: int = 20
+) -> DependencyGuard:
+    """The process-wide guard for ``name``, created on first use."""
+    guard = _guards.get(name)
+    if guard is None:
+        guard = DependencyGuard(
+            CircuitBreaker(name, failure_threshold, recovery_timeout), Bulkhead(name, max_concurrency)
+        )
+        _guards[name] = guard
+    return guard
+
+
+def guards() -> Dict[str, DependencyGuard]:
+    return dict(_guards)
+
+
+def reset_guards() -> None:
+    _guards.clear()
+
+
+def _breaker_states() -> Dict[Tuple[str, ...], float]:
+    return {(name,): float(STATE_VALUES[guard.breaker.state]) for name, guard in list(_guards.items())}
+
+
+def _bulkhead_usage() -> Dict[Tuple[str, ...], float]:
+    return {(name,): float(guard.bulkhead.in_use) for name, guard in list(_guards.items())}
+
+
+registry.gauge(
+    "circuit_breaker_state",
+    "Circuit state per dependency (0 closed, 1 half-open, 2 open)",
+    ("dependency",),
+    callback=_breaker_states,
+)
+registry.gauge(
+    "bulkhead_in_use", "Concurrent calls in flight per dependency", ("dependency",), callback=_bulkhead_usage
+)
+
+
+def circuit_probe(name: str) -> Callable[[], Any]:
+    """Health probe that fails while ``name``'s circuit is open."""
+
+    async def probe() -> None:
+        guard = _guards.get(name)
+        if guard is not None and guard.breaker.state == STATE_OPEN:
+            raise RuntimeError(f"circuit open, retry in {guard.breaker.retry_after():.0f}s")
+
+    return probe
+
+
+def register_circuit_probes(monitor: Any, names: Iterable[str]) -> None:
+    """Report breaker state under ``/readiness`` without ever failing it."""
+    for name in names:
+        monitor.register(f"circuit:{name}", circuit_probe(name), critical=False)
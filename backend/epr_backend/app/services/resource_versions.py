@@ -0,0 +1,120 @@
+"""Version counters for HTTP validators on rarely changing resources.
+
+Each cacheable resource has a row in ``resource_versions`` whose counter is
+incremented in the same transaction as any ORM write to it, so the counter
+is consistent across workers and never runs ahead of committed data.
+``ConditionalGetMiddleware`` derives ETag and Last-Modified from it and can
+answer ``If-None-Match`` with a single primary-key lookup instead of running
+the endpoint.
+
+A resource without a row has version 0. Writes that bypass the ORM (seed
+scripts, Core bulk loads, migrations) must call ``bump`` themselves.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, String, Table, event, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database import Base, Material, Product, Report
+
+resource_versions = Table(
+    "resource_versions",
+    Base.metadata,
+    Column("key", String, primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+# Mapped class -> resource key(s) a write to an instance invalidates.
+VERSIONED: Dict[type, Callable[[Any], str]] = {
+    Material: lambda material: "materials",
+    Product: lambda product: f"products:{product.organization_id}",
+    Report: lambda report: f"reports:{report.id}",
+}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def bump(conn: Connection, keys: Iterable[str]) -> None:
+    """Increment the version of every resource in ``keys``."""
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    now = _utcnow()
+    if conn.dialect.name in ("postgresql", "sqlite"):
+        from sqlalchemy.dialects import postgresql, sqlite
+
+        statement = (
+            postgresql.insert(resource_versions) if conn.dialect.name == "postgresql" else sqlite.insert(resource_versions)
+        )
+        conn.execute(
+            statement.on_conflict_do_update(
+                index_elements=[resource_versions.c.key],
+                set_={"version": resource_versions.c.version + 1, "updated_at": statement.excluded.updated_at},
+            ),
+            [{"key": key, "version": 1, "updated_at": now} for key in keys],
+        )
+        return
+    for key in keys:
+        result = conn.execute(
+            update(resource_versions)
+            .where(resource_versions.c.key == key)
+            .values(version=resource_versions.c.version + 1, updated_at=now)
+        )
+        if not result.rowcount:
+            conn.execute(resource_versions.insert().values(key=key, version=1, updated_at=now))
+
+
+def get_version(conn: Connection, key: str) -> Tuple[int, Optional[datetime]]:
+    row = conn.execute(
+        select(resource_versions.c.version, resource_versions.c.updated_at).where(
+            resource_versions.c.key == key
+        )
+    ).first()
+    return (row.version, row.updated_at) if row is not None else (0, None)
+
+
+def get_versions(conn: Connection, keys: Iterable[str]) -> Dict[str, int]:
+    keys = list(keys)
+    found = dict(
+        conn.execute(
+            select(resource_versions.c.key, resource_versions.c.version).where(
+                resource_versions.c.key.in_(keys)
+            )
+        ).all()
+    )
+    return {key: found.get(key, 0) for key in keys}
+
+
+def changed_keys(session: Session) -> Set[str]:
+    keys = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        key_for = VERSIONED.get(type(obj))
+        if key_for is not None and (obj in session.new or session.is_modified(obj) or obj in session.deleted):
+            keys.add(key_for(obj))
+    return keys
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    keys = changed_keys(session)
+    if keys:
+        bump(session.connection(), keys)
+
+
+def install() -> None:
+    """Bump versions from ORM writes on every session (idempotent)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+def uninstall() -> None:
+    if event.contains(Session, "after_flush", _after_flush):
+        event.remove(Session, "after_flush", _after_flush)
+
+
+install()
@@ -0,0 +1,51 @@
+"""Cached, lazily imported third-party SDK clients.
+
+Stripe, SendGrid, Twilio and boto3 together add well over a second to
+interpreter start-up when imported at module level, and most requests never
+touch them. Services call these factories at the point of use instead: the
+SDK is imported on the first call and the configured client is reused for
+the life of the process. ``reset_clients`` drops the cached instances (after
+a fork, or between tests that change credentials).
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, Callable, List
+
+
+@lru_cache(maxsize=None)
+def stripe_sdk() -> Any:
+    """The ``stripe`` module configured with ``STRIPE_SECRET_KEY``."""
+    import stripe
+
+    stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "")
+    return stripe
+
+
+@lru_cache(maxsize=None)
+def sendgrid_client() -> Any:
+    from sendgrid import SendGridAPIClient
+
+    return SendGridAPIClient(os.getenv("SENDGRID_API_KEY", ""))
+
+
+@lru_cache(maxsize=None)
+def twilio_client() -> Any:
+    from twilio.rest import Client
+
+    return Client(os.getenv("TWILIO_ACCOUNT_SID", ""), os.getenv("TWILIO_AUTH_TOKEN", ""))
+
+
+def s3_client() -> Any:
+    """The application-wide S3 client, pooled and closed with the app lifespan (see ``outbound``)."""
+    from app.services.outbound import outbound_clients
+
+    return outbound_clients.s3()
+
+
+FACTORIES: List[Callable[[], Any]] = [stripe_sdk, sendgrid_client, twilio_client]
+
+
+def reset_clients() -> None:
+    for factory in FACTORIES:
+        factory.cache_clear()  # type: ignore[attr-defined]
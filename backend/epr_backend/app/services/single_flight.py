@@ -0,0 +1,188 @@
+"""Request coalescing for identical expensive computations.
+
+At quarter end many users of one organization open the fee screen at once and
+each request triggers the same fee calculation. ``SingleFlight`` makes them
+share one computation:
+
+* within a worker, concurrent callers with the same key await one in-flight
+  task;
+* across workers, the first caller takes a short Redis lock, computes and
+  publishes the JSON result under a short TTL; the others poll for the
+  result instead of computing. If the lock holder dies the lock expires and a
+  waiter takes over.
+
+Redis errors degrade to computing locally, never to failing the request.
+Keys must capture everything the result depends on; for fees that includes
+the material and product version counters from ``resource_versions``, so a
+rate or catalogue change produces a new key instead of a stale result.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it.
+RELEASE_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+flight_requests = registry.counter(
+    "single_flight_requests_total", "Single-flight calls by how they were served", ("namespace", "outcome")
+)
+
+
+def _default_client() -> Any:
+    if not os.getenv("REDIS_URL"):
+        return None
+    from app.services.redis_client import get_redis
+
+    return get_redis()
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float = 30.0,
+        lock_timeout: float = 30.0,
+        poll_interval: float = 0.05,
+        client_factory: Callable[[], Any] = _default_client,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.client_factory = client_factory
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return ``compute()``'s result, sharing it with concurrent callers of ``key``."""
+        task = self._inflight.get(key)
+        if task is not None:
+            flight_requests.inc((self.namespace, "local"))
+        else:
+            # A task, not the caller's coroutine: a leader that disconnects
+            # must not cancel the computation its followers are waiting on.
+            task = asyncio.ensure_future(self._resolve(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done))
+        return await asyncio.shield(task)
+
+    def _settle(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
+
+    async def _call(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(method, *args, **kwargs)
+
+    async def _resolve(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        client = self.client_factory()
+        if client is None:
+            flight_requests.inc((self.namespace, "leader"))
+            return await compute()
+        result_key = f"sf:{self.namespace}:result:{key}"
+        lock_key = f"sf:{self.namespace}:lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            while True:
+                cached = await self._call(client.get, result_key)
+                if cached is not None:
+                    flight_requests.inc((self.namespace, "shared"))
+                    return json.loads(cached)
+                if await self._call(client.set, lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+                    break
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"single-flight lock {lock_key} held too long")
+                await asyncio.sleep(self.poll_interval)
+        except Exception as exc:
+            logger.warning("Single-flight coordination failed for %s, computing locally: %s", key, exc)
+            flight_requests.inc((self.namespace, "fallback"))
+            return await compute()
+
+        flight_requests.inc((self.namespace, "leader"))
+        try:
+            result = await compute()
+            try:
+                await self._call(client.set, result_key, json.dumps(result), px=int(self.ttl * 1000))
+            except Exception:
+                logger.warning("Could not publish single-flight result for %s", key, exc_info=True)
+            return result
+        finally:
+            try:
+                await self._call(client.eval, RELEASE_SCRIPT, 1, lock_key, token)
+            except Exception:
+                logger.warning("Could not release single-flight lock %s", lock_key, exc_info=True)
+
+
+# -- fee calculation -----------------------------------------------------------
+
+_PERIOD = re.compile(r"^(?:Q([1-4])-(\d{4})|(\d{4})-Q([1-4]))$")
+
+fee_flight = SingleFlight(
+    "fees",
+    ttl=float(os.getenv("FEE_RESULT_TTL", "30")),
+    lock_timeout=float(os.getenv("FEE_LOCK_TIMEOUT", "30")),
+)
+
+
+def normalize_period(period: str) -> str:
+    """``Q1-2024`` and ``2024-q1`` both become ``2024-Q1``."""
+    match = _PERIOD.match(period.strip().upper())
+    if match is None:
+        return period.strip().upper()
+    quarter, year, year_first, quarter_last = match.groups()
+    return f"{year or year_first}-Q{quarter or quarter_last}"
+
+
+def fee_calculation_key(
+    organization_id: str, product_ids: Iterable[Any], period: str, data_version: str
+) -> str:
+    products = ",".join(sorted({str(product_id) for product_id in product_ids}))
+    raw = f"{organization_id}|{products}|{normalize_period(period)}|{data_version}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def fee_data_version(organization_id: str) -> str:
+    """Material rate, catalogue and fee schedule versions the fee result depends on."""
+    from app.database import SessionLocal
+    from app.services.fee_schedule import fee_schedules
+    from app.services.resource_versions import get_versions
+
+    keys = ["materials", f"products:{organization_id}"]
+    with SessionLocal() as session:
+        versions = get_versions(session.connection(), keys)
+    return ".".join([*(str(versions[key]) for key in keys), fee_schedules.get().checksum])
+
+
+async def calculate_fees_once(
+    organization_id: str,
+    product_ids: Iterable[Any],
+    period: str,
+    compute: Callable[[], Any],
+    data_version: Optional[str] = None,
+) -> Any:
+    """Run the fee engine once per identical request in flight.
+
+    ``compute`` is the synchronous fee calculation; it runs in a worker
+    thread and must return a JSON-serializable result. It should open its
+    own session rather than use the leader's request-scoped one, which
+    closes if that client disconnects.
+    """
+    product_ids = list(product_ids)
+    if data_version is None:
+        data_version = await asyncio.to_thread(fee_data_version, organization_id)
+    key = fee_calculation_key(organization_id, product_ids, period, data_version)
+    return await fee_flight.do(key, lambda: asyncio.to_thread(compute))
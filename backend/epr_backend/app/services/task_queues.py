@@ -0,0 +1,208 @@
+"""Celery queue topology, routing and per-queue worker profiles.
+
+Work is split across three queues so a report backlog can never delay a
+password-reset email:
+
+``interactive``
+    Short tasks a user is waiting on (default queue).
+``notifications``
+    Email/SMS sends and reminder fan-out. Small, latency sensitive.
+``bulk``
+    Report generation, imports, exports and other long-running jobs.
+
+Each queue is consumed by its own worker deployment (see docker-compose), and
+``apply_worker_profile`` tunes prefetch/ack behaviour for the queue a worker
+was started with. Call ``configure_celery(celery_app)`` once where the Celery
+app is created; it also connects the signal handlers below, so importing this
+module does not load Celery or kombu.
+
+Queue latency (publish -> task start) is recorded per task name from a header
+stamped at publish time.
+"""
+
+import fnmatch
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.metrics import celery_queue_latency
+from app.services.tasks import register_tasks
+
+logger = logging.getLogger(__name__)
+
+QUEUE_INTERACTIVE = "interactive"
+QUEUE_NOTIFICATIONS = "notifications"
+QUEUE_BULK = "bulk"
+QUEUES = (QUEUE_INTERACTIVE, QUEUE_NOTIFICATIONS, QUEUE_BULK)
+
+# Lower numbers are consumed first on Redis (priority_steps/queue_order_strategy).
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 3
+PRIORITY_LOW = 6
+MAX_PRIORITY = 9
+
+ENQUEUED_AT_HEADER = "enqueued_at"
+
+
+@dataclass(frozen=True)
+class WorkerProfile:
+    queue: str
+    concurrency: int
+    autoscale: Tuple[int, int]
+    prefetch_multiplier: int
+    acks_late: bool
+
+    def cli_args(self, autoscale: bool = True) -> List[str]:
+        pool_size = (
+            f"--autoscale={self.autoscale[1]},{self.autoscale[0]}"
+            if autoscale
+            else f"--concurrency={self.concurrency}"
+        )
+        return [
+            "-Q", self.queue,
+            pool_size,
+            f"--prefetch-multiplier={self.prefetch_multiplier}",
+            f"--hostname={self.queue}@%h",
+        ]
+
+
+# Short tasks prefetch a few messages to keep workers busy; long bulk tasks
+# prefetch one so a slow report cannot strand queued work behind it, and ack
+# late so a crashed worker's job is redelivered.
+WORKER_PROFILES: Dict[str, WorkerProfile] = {
+    QUEUE_INTERACTIVE: WorkerProfile(QUEUE_INTERACTIVE, 4, (2, 8), 4, False),
+    QUEUE_NOTIFICATIONS: WorkerProfile(QUEUE_NOTIFICATIONS, 8, (2, 16), 8, True),
+    QUEUE_BULK: WorkerProfile(QUEUE_BULK, 2, (1, 4), 1, True),
+}
+
+# Ordered (pattern, queue, priority); first match wins.
+ROUTES: List[Tuple[str, str, int]] = [
+    ("*password_reset*", QUEUE_NOTIFICATIONS, PRIORITY_HIGH),
+    ("*verification*", QUEUE_NOTIFICATIONS, PRIORITY_HIGH),
+    ("*invitation*", QUEUE_NOTIFICATIONS, PRIORITY_NORMAL),
+    ("*send_email*", QUEUE_NOTIFICATIONS, PRIORITY_NORMAL),
+    ("*send_sms*", QUEUE_NOTIFICATIONS, PRIORITY_NORMAL),
+    ("notifications.*", QUEUE_NOTIFICATIONS, PRIORITY_NORMAL),
+    ("reminders.*", QUEUE_NOTIFICATIONS, PRIORITY_LOW),
+    ("*report*", QUEUE_BULK, PRIORITY_NORMAL),
+    ("*import*", QUEUE_BULK, PRIORITY_NORMAL),
+    ("*export*", QUEUE_BULK, PRIORITY_LOW),
+    ("encryption.*", QUEUE_BULK, PRIORITY_LOW),
+    ("summaries.*", QUEUE_BULK, PRIORITY_LOW),
+]
+
+TASK_MODULES = [
+    "app.security.encryption",
+    "app.services.reminder_planner",
+    "app.services.job_status",
+    "app.services.compliance_summary",
+    "app.services.notification_delivery",
+]
+
+
+def route_task(
+    name: str, args: Any = None, kwargs: Any = None, options: Any = None, task: Any = None, **kw: Any
+) -> Dict[str, Any]:
+    for pattern, queue, priority in ROUTES:
+        if fnmatch.fnmatchcase(name, pattern):
+            return {"queue": queue, "priority": priority}
+    return {"queue": QUEUE_INTERACTIVE, "priority": PRIORITY_NORMAL}
+
+
+def configure_celery(app: Any) -> None:
+    from celery import signals
+    from kombu import Queue
+
+    app.conf.update(
+        task_queues=[
+            Queue(name, routing_key=name, queue_arguments={"x-max-priority": MAX_PRIORITY})
+            for name in QUEUES
+        ],
+        task_default_queue=QUEUE_INTERACTIVE,
+        task_default_priority=PRIORITY_NORMAL,
+        task_queue_max_priority=MAX_PRIORITY,
+        task_routes=(route_task,),
+        broker_transport_options={
+            "priority_steps": list(range(MAX_PRIORITY + 1)),
+            "sep": ":",
+            "queue_order_strategy": "priority",
+            "visibility_timeout": 3600,
+        },
+        task_reject_on_worker_lost=True,
+        # Progress and outcomes are tracked in app.services.job_status instead.
+        task_ignore_result=True,
+        worker_send_task_events=False,
+    )
+    app.conf.imports = list(app.conf.imports or ()) + [
+        module for module in TASK_MODULES if module not in (app.conf.imports or ())
+    ]
+    register_tasks(app)
+    # Connecting an already connected receiver is a no-op.
+    signals.import_modules.connect(bind_declared_tasks, weak=False)
+    signals.celeryd_init.connect(apply_worker_profile, weak=False)
+    signals.before_task_publish.connect(stamp_enqueue_time, weak=False)
+    signals.task_prerun.connect(record_queue_latency, weak=False)
+
+
+def bind_declared_tasks(sender: Any = None, **kwargs: Any) -> None:
+    """Bind tasks declared with ``app.services.tasks.task`` once the worker imported TASK_MODULES."""
+    if sender is not None:
+        register_tasks(sender)
+
+
+def apply_worker_profile(sender: Any = None, conf: Any = None, options: Any = None, **kwargs: Any) -> None:
+    queues = (options or {}).get("queues") or os.getenv("CELERY_WORKER_QUEUE")
+    if isinstance(queues, str):
+        queues = queues.split(",")
+    if not queues or len(queues) != 1 or queues[0] not in WORKER_PROFILES:
+        return
+    profile = WORKER_PROFILES[queues[0]]
+    conf.worker_prefetch_multiplier = profile.prefetch_multiplier
+    conf.task_acks_late = profile.acks_late
+    logger.info("Applied %s worker profile to %s", profile.queue, sender)
+
+
+class QueueLatencyRecorder:
+    """Per-task queue latency aggregates for the current worker process."""
+
+    def __init__(self) -> None:
+        self._stats: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, task_name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(task_name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {"count": count, "sum": total, "max": peak}
+                for name, (count, total, peak) in self._stats.items()
+            }
+
+
+queue_latency = QueueLatencyRecorder()
+
+
+def stamp_enqueue_time(headers: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+    if headers is not None:
+        headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+
+
+def record_queue_latency(task: Any = None, **kwargs: Any) -> None:
+    if task is None:
+        return
+    request = task.request
+    enqueued_at = getattr(request, ENQUEUED_AT_HEADER, None)
+    if enqueued_at is None and request.headers:
+        enqueued_at = request.headers.get(ENQUEUED_AT_HEADER)
+    if enqueued_at is not None:
+        latency = max(0.0, time.time() - float(enqueued_at))
+        queue_latency.record(task.name, latency)
+        celery_queue_latency.observe(latency, (task.name,))
@@ -0,0 +1,67 @@
+"""Celery task declarations that do not import Celery.
+
+Service modules are imported by every API worker, but API processes only
+ever enqueue tasks by name; importing Celery and kombu there costs a few
+hundred milliseconds of boot time for nothing. ``task`` records the function
+instead of binding it to an app, and ``register_tasks`` binds the recorded
+functions in worker processes (``task_queues.configure_celery`` and the
+``import_modules`` signal call it).
+
+The declared function stays directly callable; ``delay`` and ``apply_async``
+enqueue by name through the configured Celery app (``CELERY_APP_MODULE``),
+importing Celery and that module on first use so API processes publish with
+the same broker and routes as the workers.
+"""
+
+import functools
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CELERY_APP_MODULE = "app.services.background_jobs"
+
+
+@functools.lru_cache(maxsize=None)
+def get_celery_app() -> Any:
+    """The configured Celery app, imported on first use."""
+    from celery.app.utils import find_app
+
+    return find_app(CELERY_APP_MODULE)
+
+
+class DeferredTask:
+    def __init__(self, name: str, fn: Callable[..., Any], options: Dict[str, Any]) -> None:
+        functools.update_wrapper(self, fn)
+        self.name = name
+        self.fn = fn
+        self.options = options
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.fn(*args, **kwargs)
+
+    def apply_async(
+        self, args: Tuple[Any, ...] = (), kwargs: Optional[Dict[str, Any]] = None, **options: Any
+    ) -> Any:
+        return get_celery_app().send_task(self.name, args=args, kwargs=kwargs or {}, **options)
+
+    def delay(self, *args: Any, **kwargs: Any) -> Any:
+        return self.apply_async(args, kwargs)
+
+
+_registry: Dict[str, DeferredTask] = {}
+
+
+def task(name: str, **options: Any) -> Callable[[Callable[..., Any]], DeferredTask]:
+    """Declare a Celery task without importing Celery (``shared_task`` equivalent)."""
+
+    def decorator(fn: Callable[..., Any]) -> DeferredTask:
+        deferred = DeferredTask(name, fn, options)
+        _registry[name] = deferred
+        return deferred
+
+    return decorator
+
+
+def register_tasks(app: Any) -> None:
+    """Bind every declared task to ``app``; safe to call repeatedly."""
+    for name, deferred in list(_registry.items()):
+        if name not in app.tasks:
+            app.task(name=name, **deferred.options)(deferred.fn)
@@ -0,0 +1,115 @@
+"""Start-up warm-up held behind the readiness gate.
+
+After a deploy the first requests used to pay for seeding checks, catalogue
+loads and rule compilation. ``warmup_lifespan`` closes the ``warmup``
+readiness gate, runs the registered steps in order in a background task,
+and opens the gate once they all succeed. Orchestrators therefore route
+traffic to the process only when it is warm, while ``/healthz`` keeps
+answering so a slow boot is not mistaken for a hung one. A failed step is
+retried with backoff; the gate stays closed until it passes.
+
+Steps receive a connection inside one transaction per step and run in a
+worker thread::
+
+    warmup.register("material_rates", load_material_rates)
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+
+from app.services.health import HealthMonitor, health_monitor
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+GATE = "warmup"
+
+Step = Callable[[Connection], Any]
+
+warmup_step_seconds = registry.gauge(
+    "warmup_step_duration_seconds", "Duration of the last run of each start-up warm-up step", ("step",)
+)
+
+
+class Warmup:
+    def __init__(self, retry_delay: float = 1.0, max_retry_delay: float = 30.0) -> None:
+        self.steps: List[Tuple[str, Step]] = []
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+    def register(self, name: str, step: Step) -> None:
+        self.steps = [(n, s) for n, s in self.steps if n != name] + [(name, step)]
+
+    def run_steps(self, engine: Engine) -> None:
+        for name, step in self.steps:
+            started = time.perf_counter()
+            with engine.begin() as conn:
+                step(conn)
+            elapsed = time.perf_counter() - started
+            warmup_step_seconds.set(elapsed, (name,))
+            logger.info("Warm-up step %s finished in %.0fms", name, elapsed * 1000)
+
+    async def run(self, engine: Engine, monitor: HealthMonitor) -> None:
+        monitor.set_gate(GATE, False)
+        delay = self.retry_delay
+        while True:
+            try:
+                await asyncio.to_thread(self.run_steps, engine)
+                break
+            except Exception:
+                logger.exception("Warm-up failed; retrying in %.0fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+        monitor.set_gate(GATE, True)
+
+
+def seed_materials(conn: Connection) -> None:
+    from app.services.material_catalogue import seed_catalogue
+
+    seed_catalogue(conn)
+
+
+def load_material_rates(conn: Connection) -> None:
+    from app.services.material_catalogue import material_rates
+
+    material_rates.load(conn)
+
+
+def compile_fee_schedule(conn: Connection) -> None:
+    from app.services.fee_schedule import fee_schedules
+
+    fee_schedules.reload()
+
+
+warmup = Warmup()
+warmup.register("seed_materials", seed_materials)
+warmup.register("material_rates", load_material_rates)
+warmup.register("fee_schedule", compile_fee_schedule)
+
+
+@contextlib.asynccontextmanager
+async def warmup_lifespan(
+    app: Any = None,
+    engine: Optional[Engine] = None,
+    monitor: Optional[HealthMonitor] = None,
+    steps: Optional[Warmup] = None,
+) -> AsyncIterator[None]:
+    """FastAPI ``lifespan`` (or a piece of one) running the warm-up behind the readiness gate."""
+    if engine is None:
+        from app.database import engine as default_engine
+
+        engine = default_engine
+    monitor = monitor or health_monitor
+    monitor.set_gate(GATE, False)
+    task = asyncio.get_running_loop().create_task((steps or warmup).run(engine, monitor))
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
@@ -0,0 +1,130 @@
+"""Queue-latency benchmark for the Celery queue topology.
+
+Requires a local Redis broker (``REDIS_URL``, default redis://localhost:6379/15).
+
+Usage::
+
+    python -m benchmarks.celery_queues --topology shared
+    python -m benchmarks.celery_queues --topology routed
+
+Enqueues a backlog of slow report tasks followed by password-reset emails and
+measures how long the emails wait before a worker starts them. ``shared``
+reproduces the previous single-queue worker; ``routed`` runs one worker per
+queue with the profiles from ``app.services.task_queues``.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, List
+
+import redis
+from celery import Celery
+
+from app.services import task_queues
+
+BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/15")
+LATENCY_KEY = "bench:latency:{}"
+TOPOLOGY = os.getenv("BENCH_TOPOLOGY", "routed")
+
+app = Celery("benchmarks.celery_queues", broker=BROKER_URL)
+app.conf.task_ignore_result = True
+if TOPOLOGY == "routed":
+    task_queues.configure_celery(app)
+
+_redis = redis.Redis.from_url(BROKER_URL)
+
+
+def bench_task(name: str) -> Callable[[Callable[..., None]], Any]:
+    """``app.task`` with a signature mypy can follow."""
+    decorator: Callable[[Callable[..., None]], Any] = app.task(name=name)
+    return decorator
+
+
+def _record(name: str, enqueued_at: float) -> None:
+    _redis.rpush(LATENCY_KEY.format(name), time.time() - enqueued_at)
+
+
+@bench_task("bench.generate_report")
+def generate_report(enqueued_at: float, seconds: float) -> None:
+    _record("generate_report", enqueued_at)
+    time.sleep(seconds)
+
+
+@bench_task("bench.send_password_reset_email")
+def send_password_reset_email(enqueued_at: float) -> None:
+    _record("send_password_reset_email", enqueued_at)
+
+
+def start_workers(topology: str, concurrency: int) -> List[subprocess.Popen[bytes]]:
+    env = {**os.environ, "BENCH_TOPOLOGY": topology, "REDIS_URL": BROKER_URL}
+    base = [sys.executable, "-m", "celery", "-A", "benchmarks.celery_queues", "worker",
+            "--loglevel=warning", "--without-gossip", "--without-mingle", "--without-heartbeat"]
+    if topology == "shared":
+        commands = [base + [f"--concurrency={concurrency}", "--hostname=shared@%h"]]
+    else:
+        commands = [
+            base + profile.cli_args(autoscale=False)
+            for profile in task_queues.WORKER_PROFILES.values()
+        ]
+    return [
+        subprocess.Popen(command, env={**env, "CELERY_WORKER_QUEUE": command[command.index("-Q") + 1]}
+                         if "-Q" in command else env)
+        for command in commands
+    ]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topology", choices=("shared", "routed"), default=TOPOLOGY)
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--report-seconds", type=float, default=0.2)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    _redis.flushdb()
+    workers = start_workers(args.topology, args.concurrency)
+    try:
+        time.sleep(3)
+        for _ in range(args.reports):
+            generate_report.delay(time.time(), args.report_seconds)
+        for _ in range(args.emails):
+            send_password_reset_email.delay(time.time())
+
+        deadline = time.time() + args.timeout
+        key = LATENCY_KEY.format("send_password_reset_email")
+        while _redis.llen(key) < args.emails and time.time() < deadline:
+            time.sleep(0.1)
+        latencies = [float(v) for v in _redis.lrange(key, 0, -1)]
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait(timeout=30)
+
+    print(json.dumps({
+        "topology": args.topology,
+        "reports_backlog": args.reports,
+        "emails": args.emails,
+        "emails_started": len(latencies),
+        "email_queue_latency_seconds": {
+            "p50": round(statistics.median(latencies), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "max": round(max(latencies), 4),
+        } if latencies else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
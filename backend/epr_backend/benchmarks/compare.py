@@ -0,0 +1,92 @@
+"""Fail when load benchmark results regress against the stored baseline.
+
+Usage::
+
+    python -m benchmarks.compare results.json [--baseline benchmarks/baseline.json]
+        [--tolerance 0.2] [--update]
+
+For every request in the baseline, p95 latency may exceed the baseline value
+by at most ``--tolerance`` (a fraction) and the error rate may not exceed
+``max_error_rate``. Requests missing from the results count as regressions.
+``--update`` rewrites the baseline from the results instead of comparing.
+Exits non-zero on any regression.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_MAX_ERROR_RATE = 0.01
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[Dict[str, Any]]:
+    measured = results["requests"]
+    regressions = []
+    for name, expected in baseline["requests"].items():
+        actual = measured.get(name)
+        if actual is None or not actual["count"]:
+            regressions.append({"request": name, "reason": "missing from results"})
+            continue
+        limit = expected["p95_ms"] * (1 + tolerance)
+        if actual["p95_ms"] > limit:
+            regressions.append({
+                "request": name,
+                "reason": "p95 latency",
+                "baseline_ms": expected["p95_ms"],
+                "limit_ms": round(limit, 2),
+                "actual_ms": actual["p95_ms"],
+            })
+        max_error_rate = expected.get("max_error_rate", DEFAULT_MAX_ERROR_RATE)
+        if actual["error_rate"] > max_error_rate:
+            regressions.append({
+                "request": name,
+                "reason": "error rate",
+                "limit": max_error_rate,
+                "actual": actual["error_rate"],
+            })
+    return regressions
+
+
+def baseline_from(results: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": results["meta"],
+        "requests": {
+            name: {"p95_ms": stats["p95_ms"], "max_error_rate": DEFAULT_MAX_ERROR_RATE}
+            for name, stats in results["requests"].items()
+            if name != "total"
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.results) as handle:
+        results = json.load(handle)
+
+    if args.update:
+        with open(args.baseline, "w") as handle:
+            json.dump(baseline_from(results), handle, indent=2)
+            handle.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    regressions = compare(results, baseline, args.tolerance)
+    print(json.dumps({"regressions": regressions}, indent=2))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Compare CPU cost against bandwidth saved for response compression.
+
+Usage::
+
+    python -m benchmarks.compression [--rounds 20] [--mbps 50]
+
+Builds representative API payloads (product lists from the synthetic
+dataset, a fee breakdown, report metadata) and compresses each one with
+every available codec at several levels. Reports the compression ratio, the
+CPU time per response, and the transfer time saved on a ``--mbps`` link. A
+level is worth it while ``transfer_saved_ms`` comfortably exceeds ``cpu_ms``.
+Brotli and zstd rows appear only when their packages are installed.
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from app.middleware.compression import available_codecs
+from benchmarks.dataset import MATERIALS, product_rows
+
+LEVELS = {"gzip": (1, 5, 6, 9), "br": (1, 4, 6, 11), "zstd": (1, 3, 9, 19)}
+
+
+def _json(value: Any) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+
+def payloads() -> Dict[str, bytes]:
+    rng = random.Random(42)
+    products = list(product_rows("bench-org", 1000, rng, "bench"))
+    for product in products:
+        product["material_composition"] = json.loads(product["material_composition"])
+    fees = {
+        "organization_id": "bench-org",
+        "period": "2024-Q1",
+        "jurisdictions": [
+            {
+                "jurisdiction": jurisdiction,
+                "lines": [
+                    {"product_id": p["id"], "material": name, "weight_kg": p["weight"], "rate": rate,
+                     "fee": round(p["weight"] * rate, 4)}
+                    for p in products[:200]
+                    for _, name, _, rate in MATERIALS[:2]
+                ],
+            }
+            for jurisdiction in ("CA", "OR", "CO", "ME", "MN")
+        ],
+    }
+    reports = [
+        {"id": f"bench-r{i:04d}", "title": f"Quarterly EPR report {2023 + i // 4}-Q{i % 4 + 1}",
+         "type": "quarterly", "status": rng.choice(["completed", "pending", "failed"]),
+         "total_fee": round(rng.uniform(50, 25_000), 2), "created_at": f"2024-0{i % 9 + 1}-01T00:00:00Z"}
+        for i in range(50)
+    ]
+    return {
+        "products_page_50": _json(products[:50]),
+        "products_1000": _json(products),
+        "fee_breakdown": _json(fees),
+        "report_list_50": _json(reports),
+    }
+
+
+def measure(codec: Any, level: int, body: bytes, rounds: int) -> Dict[str, float]:
+    timings: List[float] = []
+    size = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        compressor = codec(level)
+        size = len(compressor.compress(body) + compressor.finish())
+        timings.append(time.perf_counter() - started)
+    return {"bytes": size, "seconds": min(timings)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--mbps", type=float, default=50.0, help="client link speed used for transfer time")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for payload, body in payloads().items():
+        for name, codec in available_codecs().items():
+            for level in LEVELS[name]:
+                m = measure(codec, level, body, args.rounds)
+                saved = len(body) - m["bytes"]
+                results.append({
+                    "payload": payload,
+                    "encoding": name,
+                    "level": level,
+                    "original_bytes": len(body),
+                    "compressed_bytes": m["bytes"],
+                    "ratio": round(len(body) / m["bytes"], 2),
+                    "cpu_ms": round(m["seconds"] * 1000, 3),
+                    "cpu_us_per_kb_saved": round(m["seconds"] * 1e6 / max(saved / 1024, 1e-9), 2),
+                    "transfer_saved_ms": round(saved * 8 / (args.mbps * 1e6) * 1000, 3),
+                })
+    print(json.dumps({"mbps": args.mbps, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
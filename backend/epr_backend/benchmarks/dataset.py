@@ -0,0 +1,340 @@
+"""Deterministic synthetic dataset for scale and performance testing.
+
+Usage::
+
+    python -m benchmarks.dataset [--organizations 1000] [--products-per-org 1000]
+        [--users-per-org 5] [--reports-per-org 8] [--skew 0.8] [--seed 42]
+        [--database-url URL] [--create-tables]
+
+Generates organizations, users, products with realistic material
+compositions, the materials catalogue and reports. Output depends only on the
+spec and seed: each organization draws from its own ``Random`` seeded with
+``(seed, prefix, organization index)``, so any slice of the dataset can be
+regenerated without producing the rest, and row identity does not depend on
+chunking.
+
+Rows are streamed in chunks and loaded with ``COPY ... FROM STDIN`` on
+PostgreSQL or a single ``executemany`` per chunk elsewhere; only columns
+present on the mapped tables are written.
+"""
+
+import argparse
+import bisect
+import csv
+import io
+import itertools
+import json
+import math
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import Table, create_engine, select
+from sqlalchemy.engine import Connection, Engine
+
+CHUNK_SIZE = 50_000
+EPOCH = datetime(2023, 1, 1)
+# Not a usable credential: generated users cannot log in.
+PASSWORD_HASH = "!synthetic"
+# COPY null marker; unlike an empty field it cannot be confused with "".
+NULL = "\\N"
+
+# (composition key, catalogue name, category, fee rate per kg)
+MATERIALS: Tuple[Tuple[str, str, str, float], ...] = (
+    ("paper", "Paper (Label)", "Paper", 0.12),
+    ("cardboard", "Cardboard", "Paper", 0.08),
+    ("plastic", "Plastic (PET)", "Plastic", 0.45),
+    ("hdpe", "Plastic (HDPE)", "Plastic", 0.41),
+    ("film", "Plastic (LDPE Film)", "Plastic", 0.62),
+    ("glass", "Glass", "Glass", 0.05),
+    ("metal", "Metal (Steel)", "Metal", 0.09),
+    ("aluminum", "Aluminum", "Metal", 0.07),
+)
+
+# Product category -> (weight in the catalogue, mean kg, material keys with weights)
+CATEGORIES: Dict[str, Tuple[int, float, Dict[str, int]]] = {
+    "Food": (35, 0.4, {"plastic": 4, "film": 3, "cardboard": 3, "glass": 2, "metal": 2, "paper": 2}),
+    "Beverages": (15, 0.8, {"plastic": 5, "glass": 4, "aluminum": 4, "paper": 1}),
+    "Household": (20, 1.2, {"hdpe": 5, "plastic": 2, "cardboard": 3, "paper": 1}),
+    "Electronics": (10, 2.5, {"cardboard": 5, "film": 3, "plastic": 2, "paper": 2}),
+    "Personal Care": (12, 0.3, {"hdpe": 4, "plastic": 3, "paper": 2, "aluminum": 1}),
+    "Packaging": (8, 1.0, {"cardboard": 6, "paper": 3, "film": 2}),
+}
+
+PRODUCT_WORDS = ("Classic", "Organic", "Family", "Premium", "Eco", "Original", "Value", "Fresh")
+REPORT_TYPES: Dict[str, int] = {"quarterly": 6, "monthly": 3, "annual": 1}
+REPORT_STATUSES: Dict[str, int] = {"completed": 85, "pending": 8, "processing": 4, "failed": 3}
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    organizations: int = 100
+    users_per_org: int = 5
+    products_per_org: int = 100
+    reports_per_org: int = 8
+    # Zipf-like exponent for product counts per organization; 0 is uniform.
+    skew: float = 0.8
+    seed: int = 42
+    prefix: str = "syn"
+
+    @property
+    def total_products(self) -> int:
+        return self.organizations * self.products_per_org
+
+
+def _rng(spec: DatasetSpec, kind: str, index: int) -> random.Random:
+    return random.Random(f"{spec.seed}:{spec.prefix}:{kind}:{index}")
+
+
+def organization_id(spec: DatasetSpec, index: int) -> str:
+    return f"{spec.prefix}-org-{index:07d}"
+
+
+def organization_sizes(spec: DatasetSpec) -> List[int]:
+    """Products per organization; skewed, but always summing to the total."""
+    weights = [1.0 / (rank + 1) ** spec.skew for rank in range(spec.organizations)]
+    random.Random(f"{spec.seed}:{spec.prefix}:sizes").shuffle(weights)
+    scale = spec.total_products / sum(weights) if weights else 0.0
+    sizes = [int(weight * scale) for weight in weights]
+    remainder = spec.total_products - sum(sizes)
+    by_fraction = sorted(
+        range(len(weights)), key=lambda i: weights[i] * scale - sizes[i], reverse=True
+    )
+    for i in by_fraction[:remainder]:
+        sizes[i] += 1
+    return sizes
+
+
+def material_rows() -> List[Dict[str, Any]]:
+    return [
+        {"name": name, "category": category, "epr_rate": rate, "updated_at": EPOCH}
+        for _, name, category, rate in MATERIALS
+    ]
+
+
+def _cumulative(weights: Iterable[float]) -> Tuple[List[float], float]:
+    cumulative = list(itertools.accumulate(weights))
+    return cumulative, cumulative[-1]
+
+
+def _pick(rng: random.Random, items: Sequence[Any], cumulative: Tuple[List[float], float]) -> Any:
+    # random.choices() rebuilds cumulative weights per call; this is the hot loop.
+    weights, total = cumulative
+    return items[bisect.bisect(weights, rng.random() * total)]
+
+
+_CATEGORY_NAMES = list(CATEGORIES)
+_CATEGORY_WEIGHTS = _cumulative(CATEGORIES[name][0] for name in _CATEGORY_NAMES)
+_MATERIAL_KEYS = {name: list(spec[2]) for name, spec in CATEGORIES.items()}
+_MATERIAL_WEIGHTS = {name: _cumulative(spec[2].values()) for name, spec in CATEGORIES.items()}
+_MATERIAL_COUNTS = (1, 2, 3)
+_MATERIAL_COUNT_WEIGHTS = _cumulative((3, 5, 2))
+_LOG_MEAN_KG = {name: math.log(spec[1]) for name, spec in CATEGORIES.items()}
+
+
+def composition(rng: random.Random, category: str) -> Dict[str, int]:
+    """Pick 1-3 of the category's materials and split 100% between them in steps of 5."""
+    keys = _MATERIAL_KEYS[category]
+    weights = _MATERIAL_WEIGHTS[category]
+    count = min(len(keys), _pick(rng, _MATERIAL_COUNTS, _MATERIAL_COUNT_WEIGHTS))
+    chosen: List[str] = []
+    while len(chosen) < count:
+        key = _pick(rng, keys, weights)
+        if key not in chosen:
+            chosen.append(key)
+    if count == 1:
+        return {chosen[0]: 100}
+    cuts = sorted(rng.sample(range(1, 20), count - 1))
+    shares = [(b - a) * 5 for a, b in zip([0] + cuts, cuts + [20])]
+    return dict(zip(chosen, shares))
+
+
+def product_rows(
+    organization: str, count: int, rng: random.Random, sku_prefix: str
+) -> Iterator[Dict[str, Any]]:
+    sku_upper = sku_prefix.upper()
+    for i in range(count):
+        category = _pick(rng, _CATEGORY_NAMES, _CATEGORY_WEIGHTS)
+        created = EPOCH + timedelta(minutes=rng.randrange(0, 2 * 365 * 24 * 60))
+        yield {
+            "id": f"{sku_prefix}-p{i:07d}",
+            "name": f"{rng.choice(PRODUCT_WORDS)} {category} Item {i}",
+            "sku": f"{sku_upper}-{i:07d}",
+            "description": f"Synthetic {category.lower()} product",
+            "category": category,
+            "weight": round(rng.lognormvariate(_LOG_MEAN_KG[category], 0.6), 3),
+            "material_composition": json.dumps(composition(rng, category)),
+            "organization_id": organization,
+            "created_at": created,
+            "updated_at": created,
+        }
+
+
+def generate_organizations(spec: DatasetSpec) -> Iterator[Dict[str, Any]]:
+    for i in range(spec.organizations):
+        rng = _rng(spec, "org", i)
+        yield {
+            "id": organization_id(spec, i),
+            "name": f"Synthetic Producer {i}",
+            "created_at": EPOCH + timedelta(days=rng.randrange(0, 365)),
+        }
+
+
+def generate_users(spec: DatasetSpec) -> Iterator[Dict[str, Any]]:
+    for i in range(spec.organizations):
+        rng = _rng(spec, "users", i)
+        for j in range(spec.users_per_org):
+            yield {
+                "id": f"{organization_id(spec, i)}-u{j:03d}",
+                "email": f"user{j}.{i}@{spec.prefix}.example.com",
+                "password_hash": PASSWORD_HASH,
+                "organization_id": organization_id(spec, i),
+                "created_at": EPOCH + timedelta(days=rng.randrange(0, 365)),
+            }
+
+
+def generate_products(spec: DatasetSpec) -> Iterator[Dict[str, Any]]:
+    for i, size in enumerate(organization_sizes(spec)):
+        org = organization_id(spec, i)
+        yield from product_rows(org, size, _rng(spec, "products", i), org)
+
+
+def generate_reports(spec: DatasetSpec) -> Iterator[Dict[str, Any]]:
+    types, type_weights = list(REPORT_TYPES), list(REPORT_TYPES.values())
+    statuses, status_weights = list(REPORT_STATUSES), list(REPORT_STATUSES.values())
+    for i in range(spec.organizations):
+        rng = _rng(spec, "reports", i)
+        for j in range(spec.reports_per_org):
+            start = EPOCH + timedelta(days=91 * j)
+            report_type = rng.choices(types, type_weights)[0]
+            length = {"monthly": 30, "quarterly": 90, "annual": 364}[report_type]
+            status = rng.choices(statuses, status_weights)[0]
+            yield {
+                "id": f"{organization_id(spec, i)}-r{j:04d}",
+                "title": f"{report_type.title()} EPR report {start:%Y-%m}",
+                "type": report_type,
+                "status": status,
+                "start_date": start,
+                "end_date": start + timedelta(days=length),
+                "total_fee": round(rng.uniform(50, 25_000), 2) if status == "completed" else None,
+                "organization_id": organization_id(spec, i),
+                "created_at": start + timedelta(days=length + 1),
+                "updated_at": start + timedelta(days=length + 1),
+            }
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _copy(conn: Connection, table: Table, columns: Sequence[str], rows: List[Dict[str, Any]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [NULL if value is None else value for value in map(row.get, columns)] for row in rows
+    )
+    buffer.seek(0)
+    statement = (
+        f'COPY {table.fullname} ({", ".join(columns)}) '
+        f"FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+    )
+    cursor = conn.connection.dbapi_connection.cursor()  # type: ignore[union-attr]
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(statement, buffer)
+        else:  # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def bulk_load(
+    conn: Connection, table: Table, rows: Iterable[Dict[str, Any]], chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Insert ``rows`` into ``table`` in chunks; returns the number loaded."""
+    columns: List[str] = []
+    use_copy = conn.dialect.name == "postgresql"
+    loaded = 0
+    for chunk in _chunks(rows, chunk_size):
+        if not columns:
+            columns = [name for name in chunk[0] if name in table.c]
+        if use_copy:
+            _copy(conn, table, columns, chunk)
+        else:
+            conn.execute(table.insert(), [{c: row.get(c) for c in columns} for row in chunk])
+        loaded += len(chunk)
+    return loaded
+
+
+def ensure_materials(conn: Connection, table: Table) -> int:
+    """Add catalogue materials that are not present yet (matched by name)."""
+    existing = set(conn.execute(select(table.c.name)).scalars())
+    missing = [row for row in material_rows() if row["name"] not in existing]
+    if not missing:
+        return 0
+    return bulk_load(conn, table, missing)
+
+
+def load_dataset(engine: Engine, spec: DatasetSpec) -> Dict[str, int]:
+    from app.database import Material, Organization, Product, Report, User
+
+    counts: Dict[str, int] = {}
+    with engine.begin() as conn:
+        counts["materials"] = ensure_materials(conn, Material.__table__)
+        counts["organizations"] = bulk_load(conn, Organization.__table__, generate_organizations(spec))
+        counts["users"] = bulk_load(conn, User.__table__, generate_users(spec))
+        counts["products"] = bulk_load(conn, Product.__table__, generate_products(spec))
+        counts["reports"] = bulk_load(conn, Report.__table__, generate_reports(spec))
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--organizations", type=int, default=1_000)
+    parser.add_argument("--users-per-org", type=int, default=5)
+    parser.add_argument("--products-per-org", type=int, default=1_000)
+    parser.add_argument("--reports-per-org", type=int, default=8)
+    parser.add_argument("--skew", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="syn")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./synthetic.db"))
+    parser.add_argument("--create-tables", action="store_true")
+    args = parser.parse_args()
+
+    spec = DatasetSpec(
+        organizations=args.organizations,
+        users_per_org=args.users_per_org,
+        products_per_org=args.products_per_org,
+        reports_per_org=args.reports_per_org,
+        skew=args.skew,
+        seed=args.seed,
+        prefix=args.prefix,
+    )
+    engine = create_engine(args.database_url)
+    if args.create_tables:
+        from app.database import Base
+
+        Base.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    counts = load_dataset(engine, spec)
+    seconds = time.perf_counter() - started
+    print(json.dumps({
+        "spec": asdict(spec),
+        "rows": counts,
+        "seconds": round(seconds, 2),
+        "rows_per_second": round(sum(counts.values()) / seconds) if seconds else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
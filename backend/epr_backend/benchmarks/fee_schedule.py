@@ -0,0 +1,167 @@
+"""Benchmark compiled fee schedules at 100k products x 10 jurisdictions.
+
+Usage::
+
+    python -m benchmarks.fee_schedule [--products 100000] [--jurisdictions 10]
+        [--period 2025-Q3] [--naive-sample 5000] [--seed 42]
+
+Generates a schedule with tiered category and material rates revised every
+half year, eco-modulation windows and minimum fees, and products with the
+synthetic dataset's compositions. Times compilation, flattening the
+products and evaluating every jurisdiction from the tables, against a rule
+interpreter that resolves the applicable rules per product line (measured
+on a sample and extrapolated). Totals of both are compared.
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date
+from typing import Any, Dict, List, Mapping, Sequence
+
+from app.services.fee_schedule import DEFAULT_SCHEDULE, MODULATION_CLASSES, compile_schedule
+from benchmarks.dataset import product_rows
+
+REVISIONS = ("2024-01-01", "2024-07-01", "2025-01-01", "2025-07-01", "2026-01-01")
+
+
+def make_schedule(jurisdictions: int, rng: random.Random) -> Dict[str, Any]:
+    materials = DEFAULT_SCHEDULE["materials"]
+    categories = sorted(set(materials.values()))
+    spec: Dict[str, Any] = {}
+    for j in range(jurisdictions):
+        rates: List[Dict[str, Any]] = []
+        for revision in REVISIONS:
+            for category in categories:
+                rate = round(rng.uniform(0.05, 0.6), 3)
+                rates.append({
+                    "category": category,
+                    "effective_from": revision,
+                    "tiers": [[0, rate], [5_000, round(rate * 0.9, 3)], [50_000, round(rate * 0.8, 3)]],
+                })
+            material = rng.choice(sorted(materials))
+            rates.append({
+                "material": material,
+                "effective_from": revision,
+                "tiers": [[0, round(rng.uniform(0.3, 0.9), 3)]],
+            })
+        spec[f"J{j:02d}"] = {
+            "rates": rates,
+            "modulation": [
+                {"class": "recyclable", "factor": 0.85, "effective_from": "2024-01-01"},
+                {"class": "recycled_content", "factor": 0.9, "effective_from": "2024-07-01"},
+                {"class": "hard_to_recycle", "factor": 1.3, "category": "Plastic",
+                 "effective_from": "2025-01-01", "effective_to": "2026-01-01"},
+            ],
+            "minimum_fee": [{"amount": 500, "effective_from": "2024-01-01"}],
+        }
+    return {"materials": materials, "jurisdictions": spec}
+
+
+def make_products(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    products = list(product_rows("bench-org", count, rng, "bench"))
+    for product in products:
+        product["eco_modulation"] = rng.choice(MODULATION_CLASSES)
+    return products
+
+
+def _in_force(rule: Mapping[str, Any], day: date) -> bool:
+    end = rule.get("effective_to")
+    return date.fromisoformat(rule["effective_from"]) <= day and (not end or day < date.fromisoformat(end))
+
+
+def interpret(
+    schedule: Mapping[str, Any], products: Sequence[Mapping[str, Any]], jurisdiction: str, day: date
+) -> float:
+    """Baseline: resolve rate and modulation rules for every product line."""
+    spec = schedule["jurisdictions"][jurisdiction]
+    categories = schedule["materials"]
+    kg: Dict[str, Dict[str, float]] = {}
+    modulated: Dict[str, float] = {}
+    for product in products:
+        composition = json.loads(product["material_composition"])
+        for key, share in composition.items():
+            line_kg = product["weight"] * share / 100.0
+            kg.setdefault(key, {}).setdefault(product["eco_modulation"], 0.0)
+            kg[key][product["eco_modulation"]] += line_kg
+            factor = 1.0
+            for rule in spec.get("modulation", ()):
+                if rule["class"] == product["eco_modulation"] and _in_force(rule, day) and (
+                    rule.get("category", categories[key]) == categories[key]
+                ):
+                    factor = rule["factor"]
+            modulated[key] = modulated.get(key, 0.0) + line_kg * factor
+
+    total = 0.0
+    for key, by_class in kg.items():
+        applicable = [
+            rule for rule in spec["rates"]
+            if _in_force(rule, day) and rule.get("material", key) == key
+            and rule.get("category", categories[key]) == categories[key]
+        ]
+        if not applicable:
+            continue
+        rule = max(applicable, key=lambda rule: ("material" in rule, rule["effective_from"]))
+        material_kg = sum(by_class.values())
+        fee, tiers = 0.0, rule["tiers"]
+        for (bound, rate), upper in zip(tiers, [t[0] for t in tiers[1:]] + [float("inf")]):
+            if material_kg > bound:
+                fee += (min(material_kg, upper) - bound) * rate
+        total += fee / material_kg * modulated[key]
+    minimum = max((r["amount"] for r in spec.get("minimum_fee", ()) if _in_force(r, day)), default=0.0)
+    return max(total, minimum)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--jurisdictions", type=int, default=10)
+    parser.add_argument("--period", default="2025-Q3")
+    parser.add_argument("--naive-sample", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    schedule = make_schedule(args.jurisdictions, rng)
+    products = make_products(args.products, rng)
+    year, quarter = args.period.split("-Q")
+    day = date(int(year), (int(quarter) - 1) * 3 + 1, 1)
+
+    started = time.perf_counter()
+    compiled = compile_schedule(schedule)
+    compile_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    lines = compiled.prepare(products)
+    prepare_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = [compiled.calculate(lines, name, args.period) for name in compiled.jurisdictions]
+    calculate_seconds = time.perf_counter() - started
+
+    sample = products[:min(args.naive_sample, len(products))]
+    sample_lines = compiled.prepare(sample)
+    expected = [compiled.calculate(sample_lines, name, args.period).total for name in compiled.jurisdictions]
+    started = time.perf_counter()
+    naive = [interpret(schedule, sample, name, day) for name in compiled.jurisdictions]
+    naive_seconds = (time.perf_counter() - started) * len(products) / len(sample)
+    mismatches = sum(abs(a - b) > 1e-6 * max(1.0, b) for a, b in zip(naive, expected))
+
+    print(json.dumps({
+        "products": len(products),
+        "jurisdictions": len(compiled.jurisdictions),
+        "lines": len(lines.keys),
+        "cells": len(compiled.covered),
+        "compile_seconds": round(compile_seconds, 4),
+        "prepare_seconds": round(prepare_seconds, 3),
+        "calculate_seconds": round(calculate_seconds, 3),
+        "per_jurisdiction_ms": round(calculate_seconds * 1000 / len(results), 1),
+        "total_fees": round(sum(result.total for result in results), 2),
+        "naive_extrapolated_seconds": round(naive_seconds, 2),
+        "naive_mismatches": mismatches,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""Python load benchmark for the API: the k6 scenario mix without k6.
+
+Usage::
+
+    python -m benchmarks.load [--target inprocess|uvicorn|gunicorn] [--base-url URL]
+        [--products 10000] [--users 50] [--duration 30] [--output results.json]
+
+Seeds one benchmark organization with ``--products`` products directly in the
+database (``DATABASE_URL``), optionally surrounded by ``--dataset-orgs``
+synthetic organizations from ``benchmarks.dataset``, then runs ``--users`` concurrent virtual users
+for ``--duration`` seconds. Every iteration picks a scenario with the weights
+used by ``performance/k6-load-test.js``. Per-request latency percentiles,
+error rates and throughput are printed as JSON and written to ``--output``
+for ``benchmarks.compare``.
+
+``inprocess`` drives the ASGI app through httpx without sockets, isolating
+application cost; ``uvicorn`` starts a local server so the HTTP stack is
+included (the Dockerfile's former single-process launch with ``--workers 1``);
+``gunicorn`` starts the production profile from ``gunicorn.conf.py``;
+``--base-url`` targets a server that is already running.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks import dataset
+
+PERIOD = "Q1-2024"
+
+
+@dataclass
+class Context:
+    headers: Dict[str, str]
+    product_ids: List[str]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        self.samples.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        results = {name: _stats(samples, self.errors.get(name, 0), elapsed)
+                   for name, samples in sorted(self.samples.items())}
+        everything = [s for samples in self.samples.values() for s in samples]
+        results["total"] = _stats(everything, sum(self.errors.values()), elapsed)
+        return results
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _stats(samples: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 2) if count else 0.0,
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if count else 0.0,
+    }
+
+
+async def timed(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    method: str,
+    url: str,
+    expected: int,
+    **kwargs: Any,
+) -> Optional[httpx.Response]:
+    started = time.perf_counter()
+    try:
+        response: Optional[httpx.Response] = await client.request(method, url, **kwargs)
+        ok = response is not None and response.status_code == expected
+    except httpx.HTTPError:
+        response, ok = None, False
+    recorder.record(f"{method} {url}", time.perf_counter() - started, ok)
+    return response
+
+
+async def healthcheck(client: httpx.AsyncClient, ctx: Context, rng: random.Random, rec: Recorder) -> None:
+    await timed(client, rec, "GET", "/healthz", 200)
+
+
+async def products(client: httpx.AsyncClient, ctx: Context, rng: random.Random, rec: Recorder) -> None:
+    listing = await timed(client, rec, "GET", "/api/products/", 200, headers=ctx.headers)
+    if listing is not None and listing.status_code == 200:
+        await timed(client, rec, "POST", "/api/products/", 201, headers=ctx.headers, json={
+            "name": f"Load Test Product {rng.random()}",
+            "description": "Product created during load testing",
+            "category": "Electronics",
+            "weight": rng.random() * 10,
+            "material_composition": json.dumps({"plastic": 70, "metal": 30}),
+        })
+
+
+async def materials(client: httpx.AsyncClient, ctx: Context, rng: random.Random, rec: Recorder) -> None:
+    await timed(client, rec, "GET", "/api/materials/", 200, headers=ctx.headers)
+
+
+async def fees(client: httpx.AsyncClient, ctx: Context, rng: random.Random, rec: Recorder) -> None:
+    params = {"products": rng.sample(ctx.product_ids, min(3, len(ctx.product_ids))), "period": PERIOD}
+    await timed(client, rec, "GET", "/api/fees/calculate", 200, headers=ctx.headers, params=params)
+
+
+async def reports(client: httpx.AsyncClient, ctx: Context, rng: random.Random, rec: Recorder) -> None:
+    listing = await timed(client, rec, "GET", "/api/reports/", 200, headers=ctx.headers)
+    if listing is not None and listing.status_code == 200:
+        await timed(client, rec, "POST", "/api/reports/generate", 201, headers=ctx.headers, json={
+            "title": f"Load Test Report {time.time()}",
+            "type": "monthly",
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-31",
+        })
+
+
+ScenarioFn = Callable[[httpx.AsyncClient, Context, random.Random, Recorder], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    weight: int
+    run: ScenarioFn = field(compare=False)
+
+
+# Same mix as performance/k6-load-test.js.
+SCENARIOS = (
+    Scenario("healthcheck", 10, healthcheck),
+    Scenario("products", 30, products),
+    Scenario("materials", 20, materials),
+    Scenario("fees", 25, fees),
+    Scenario("reports", 15, reports),
+)
+
+
+def seed_products(organization_id: str, count: int, rng: random.Random) -> List[str]:
+    """Bulk insert ``count`` synthetic products for the benchmark organization."""
+    from app.database import Product, engine
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    rows = list(dataset.product_rows(organization_id, count, rng, prefix))
+    with engine.begin() as conn:
+        dataset.bulk_load(conn, Product.__table__, rows)
+    return [row["id"] for row in rows]
+
+
+def seed_background(spec: dataset.DatasetSpec) -> Dict[str, int]:
+    """Load other organizations' data so tables have production-like volume."""
+    from app.database import engine
+
+    return dataset.load_dataset(engine, spec)
+
+
+def organization_for(email: str) -> str:
+    from sqlalchemy import select
+
+    from app.database import User, engine
+
+    with engine.connect() as conn:
+        organization_id: str = conn.execute(
+            select(User.__table__.c.organization_id).where(User.__table__.c.email == email)
+        ).scalar_one()
+    return organization_id
+
+
+async def setup(client: httpx.AsyncClient, products: int, rng: random.Random) -> Context:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    response = await client.post("/api/auth/register", json={
+        "email": email,
+        "password": "benchmark-password-123",
+        "organization_name": "Benchmark Organization",
+    })
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    product_ids = await asyncio.to_thread(seed_products, organization_for(email), products, rng)
+    return Context(headers=headers, product_ids=product_ids)
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    ctx: Context,
+    rng: random.Random,
+    recorder: Recorder,
+    deadline: float,
+    think_time: float,
+) -> None:
+    weights = [scenario.weight for scenario in SCENARIOS]
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(SCENARIOS, weights)[0]
+        await scenario.run(client, ctx, rng, recorder)
+        if think_time:
+            await asyncio.sleep(think_time)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Any) -> AsyncIterator[None]:
+    """Run the app's ASGI lifespan, which httpx.ASGITransport does not do."""
+    inbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    outbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    task = asyncio.create_task(
+        app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, inbox.get, outbox.put)
+    )
+    await inbox.put({"type": "lifespan.startup"})
+    message = await outbox.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"Application startup failed: {message.get('message', '')}")
+    try:
+        yield
+    finally:
+        await inbox.put({"type": "lifespan.shutdown"})
+        await outbox.get()
+        await task
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def server_command(target: str, port: int, workers: int) -> List[str]:
+    if target == "gunicorn":
+        command = [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app",
+            "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+        ]
+        return command + (["--workers", str(workers)] if workers else [])
+    return [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers or 1), "--no-access-log", "--log-level", "warning",
+    ]
+
+
+@contextlib.asynccontextmanager
+async def local_server(target: str, workers: int, timeout: float = 30.0) -> AsyncIterator[str]:
+    port = _free_port()
+    process = await asyncio.create_subprocess_exec(*server_command(target, port, workers))
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(base_url=base_url) as probe:
+            while True:
+                try:
+                    if (await probe.get("/healthz")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or process.returncode is not None:
+                    raise RuntimeError(f"{target} did not become healthy")
+                await asyncio.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        await process.wait()
+
+
+@contextlib.asynccontextmanager
+async def open_client(args: argparse.Namespace) -> AsyncIterator[httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    timeout = httpx.Timeout(args.request_timeout)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+            yield client
+    elif args.target in ("uvicorn", "gunicorn"):
+        async with local_server(args.target, args.workers) as base_url:
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+                yield client
+    else:
+        from app.main import app
+
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://testserver", timeout=timeout
+            ) as client:
+                yield client
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    async with open_client(args) as client:
+        started = time.perf_counter()
+        background: Dict[str, int] = {}
+        if args.dataset_orgs:
+            background = await asyncio.to_thread(seed_background, dataset.DatasetSpec(
+                organizations=args.dataset_orgs,
+                products_per_org=args.dataset_products_per_org,
+                seed=args.seed,
+                prefix=f"bench{uuid.uuid4().hex[:6]}",
+            ))
+        ctx = await setup(client, args.products, rng)
+        seed_seconds = time.perf_counter() - started
+
+        recorder = Recorder()
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            virtual_user(client, ctx, random.Random(args.seed + i), recorder, deadline, args.think_time)
+            for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "meta": {
+            "target": args.base_url or args.target,
+            "workers": args.workers,
+            "products": args.products,
+            "users": args.users,
+            "duration_s": args.duration,
+            "think_time_s": args.think_time,
+            "seed": args.seed,
+            "background_rows": background,
+            "seed_seconds": round(seed_seconds, 2),
+            "python": platform.python_version(),
+            "database": os.getenv("DATABASE_URL", "").split("://", 1)[0] or "default",
+        },
+        "requests": recorder.summary(elapsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("inprocess", "uvicorn", "gunicorn"), default="inprocess")
+    parser.add_argument("--base-url", help="Benchmark an already running server instead")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Server workers (default: 1 for uvicorn, the CPU quota for gunicorn)")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--dataset-orgs", type=int, default=0,
+                        help="Also load this many synthetic organizations (benchmarks.dataset)")
+    parser.add_argument("--dataset-products-per-org", type=int, default=1_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    rendered = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(rendered + "\n")
+    print(rendered)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure the per-request cost of PrometheusMiddleware.
+
+Usage::
+
+    python -m benchmarks.metrics_overhead [--requests 200000]
+
+Drives a trivial ASGI app directly (no HTTP server, no client) with and
+without the middleware and reports the difference per request.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+
+from app.middleware.metrics import Message, PrometheusMiddleware, Receive, Scope, Send
+from app.services.metrics import Registry
+
+
+class _Route:
+    path = "/api/products/{product_id}"
+
+
+async def endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def drive(app: Callable[[Scope, Receive, Send], Awaitable[None]], requests: int) -> float:
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        pass
+
+    started = time.perf_counter()
+    for i in range(requests):
+        scope = {"type": "http", "method": "GET", "path": f"/api/products/{i % 100}"}
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    instrumented = PrometheusMiddleware(endpoint, metrics_registry=Registry())
+    baseline_runs, instrumented_runs = [], []
+    for _ in range(args.rounds):
+        baseline_runs.append(asyncio.run(drive(endpoint, args.requests)))
+        instrumented_runs.append(asyncio.run(drive(instrumented, args.requests)))
+
+    baseline = min(baseline_runs) / args.requests
+    measured = min(instrumented_runs) / args.requests
+    print(json.dumps({
+        "requests": args.requests,
+        "baseline_us_per_request": round(baseline * 1e6, 3),
+        "instrumented_us_per_request": round(measured * 1e6, 3),
+        "overhead_us_per_request": round((measured - baseline) * 1e6, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
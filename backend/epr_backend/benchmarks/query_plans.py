@@ -0,0 +1,354 @@
+"""EXPLAIN the application's critical queries and suggest missing indexes.
+
+Usage::
+
+    python -m benchmarks.query_plans [--database-url URL] [--create-tables]
+
+Runs every query in ``critical_queries()`` through ``EXPLAIN QUERY PLAN``
+(SQLite) or ``EXPLAIN (FORMAT JSON)`` (PostgreSQL) and reports full scans
+and explicit sorts on large tables. On PostgreSQL sequential scans are
+disabled for the EXPLAIN, so a reported ``Seq Scan`` means no usable index
+exists rather than that the planner preferred one for a small table.
+
+For each flagged query the advisor derives a composite index from the
+statement itself: equality predicates first, then one range or ORDER BY
+column, with low-cardinality constant predicates (status, soft-delete
+markers) turned into a partial-index ``WHERE``. An existing index only
+counts as covering the query when it is a full index or its own ``WHERE``
+matches that predicate. Exits non-zero when any query full-scans a large
+table.
+
+``audit_range_scan`` needs an ``audit_logs`` table, which the schema does not
+define yet; until it does, the query is reported as skipped instead of
+silently left out.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    ColumnElement,
+    Select,
+    Table,
+    create_engine,
+    desc,
+    func,
+    inspect,
+    literal,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, ClauseElement, Null, UnaryExpression
+from sqlalchemy.sql.expression import Executable
+
+# Tables expected to grow with customers; a full scan of these is a failure.
+LARGE_TABLES = {"products", "reports", "users", "audit_logs", "compliance_deadlines"}
+# Columns worth a partial index when compared with a constant.
+PARTIAL_COLUMNS = {"status", "state", "deleted_at", "completed_at", "archived_at"}
+
+EQUALITY_OPS = {operators.eq, operators.in_op}
+RANGE_OPS = {operators.gt, operators.ge, operators.lt, operators.le, operators.between_op}
+
+SAMPLE_ORG = "org-plan-check"
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select, prefix: str) -> None:
+        self.statement = statement
+        self.prefix = prefix
+
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler: Any, **kw: Any) -> str:
+    return f"{element.prefix} {compiler.process(element.statement, **kw)}"
+
+
+@dataclass(frozen=True)
+class CriticalQuery:
+    name: str
+    build: Optional[Callable[[], Select]]
+    skip_reason: Optional[str] = None
+
+
+@dataclass
+class PlanReport:
+    name: str
+    plan: List[str]
+    full_scans: List[str] = field(default_factory=list)
+    sorts: List[str] = field(default_factory=list)
+    suggestions: List[str] = field(default_factory=list)
+    skipped: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.full_scans
+
+
+def critical_queries() -> List[CriticalQuery]:
+    """The hot read paths, written the way the endpoints issue them."""
+    from app.database import Base, Material, Product, Report
+
+    products = Product.__table__
+    reports = Report.__table__
+    materials = Material.__table__
+    queries = [
+        CriticalQuery("product_list_by_org", lambda: (
+            select(products)
+            .where(products.c.organization_id == SAMPLE_ORG)
+            .order_by(desc(products.c.created_at))
+            .limit(50)
+        )),
+        CriticalQuery("product_sku_lookup", lambda: (
+            select(products).where(
+                products.c.organization_id == SAMPLE_ORG, products.c.sku == "SKU-0001"
+            )
+        )),
+        CriticalQuery("fee_products", lambda: (
+            select(products.c.id, products.c.weight, products.c.material_composition).where(
+                products.c.organization_id == SAMPLE_ORG,
+                products.c.id.in_(["p-1", "p-2", "p-3"]),
+            )
+        )),
+        CriticalQuery("fee_material_rates", lambda: (
+            select(materials.c.name, materials.c.epr_rate).where(
+                materials.c.name.in_(["Cardboard", "Plastic (PET)"])
+            )
+        )),
+        CriticalQuery("fee_period_total", lambda: (
+            select(func.sum(reports.c.total_fee)).where(
+                reports.c.organization_id == SAMPLE_ORG,
+                # Rendered inline so the partial index predicate can match.
+                reports.c.status == literal("completed", literal_execute=True),
+                reports.c.start_date >= datetime(2024, 1, 1),
+                reports.c.start_date < datetime(2025, 1, 1),
+            )
+        )),
+        CriticalQuery("report_list_by_org", lambda: (
+            select(reports)
+            .where(reports.c.organization_id == SAMPLE_ORG)
+            .order_by(desc(reports.c.created_at))
+            .limit(50)
+        )),
+    ]
+    audit = Base.metadata.tables.get("audit_logs")
+    if audit is not None and {"organization_id", "created_at"} <= set(audit.c.keys()):
+        queries.append(CriticalQuery("audit_range_scan", lambda: (
+            select(audit)
+            .where(
+                audit.c.organization_id == SAMPLE_ORG,
+                audit.c.created_at >= datetime(2024, 1, 1),
+                audit.c.created_at < datetime(2024, 2, 1),
+            )
+            .order_by(audit.c.created_at)
+        )))
+    else:
+        queries.append(CriticalQuery(
+            "audit_range_scan", None, skip_reason="no audit_logs table with organization_id and created_at"
+        ))
+    return queries
+
+
+def _sqlite_plan(conn: Connection, statement: Select) -> Tuple[List[str], List[str], List[str]]:
+    details = [row[-1] for row in conn.execute(Explain(statement, "EXPLAIN QUERY PLAN"))]
+    full_scans, sorts = [], []
+    for detail in details:
+        words = detail.split()
+        if words[:1] == ["SCAN"]:
+            table = words[2] if words[1] == "TABLE" else words[1]
+            if table in LARGE_TABLES and "USING INTEGER PRIMARY KEY" not in detail:
+                full_scans.append(table)
+        elif detail.startswith("USE TEMP B-TREE"):
+            sorts.append(detail)
+    return details, full_scans, sorts
+
+
+def _walk_pg(node: Dict[str, Any], depth: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+    nodes = [(depth, node)]
+    for child in node.get("Plans", ()):
+        nodes.extend(_walk_pg(child, depth + 1))
+    return nodes
+
+
+def _postgres_plan(conn: Connection, statement: Select) -> Tuple[List[str], List[str], List[str]]:
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        document: Any = conn.execute(Explain(statement, "EXPLAIN (FORMAT JSON)")).scalar()
+    finally:
+        # Rolling back to the savepoint also undoes SET LOCAL.
+        savepoint.rollback()
+    if isinstance(document, str):
+        document = json.loads(document)
+    lines, full_scans, sorts = [], [], []
+    for depth, node in _walk_pg(document[0]["Plan"]):
+        kind = node["Node Type"]
+        table = node.get("Relation Name")
+        lines.append("  " * depth + kind + (f" on {table}" if table else "")
+                     + (f" using {node['Index Name']}" if "Index Name" in node else ""))
+        if table in LARGE_TABLES and (
+            kind == "Seq Scan"
+            or (kind in ("Index Scan", "Index Only Scan") and "Index Cond" not in node)
+        ):
+            full_scans.append(table)
+        if kind in ("Sort", "Incremental Sort"):
+            sorts.append(f"{kind} on {', '.join(node.get('Sort Key', []))}")
+    return lines, full_scans, sorts
+
+
+@dataclass
+class _Predicates:
+    equality: List[Column] = field(default_factory=list)
+    ranges: List[Column] = field(default_factory=list)
+    partial: List[ColumnElement] = field(default_factory=list)
+
+
+def _column(element: Any) -> Optional[Column]:
+    return element if isinstance(element, Column) and isinstance(element.table, Table) else None
+
+
+def _is_partial_candidate(column: Column, right: Any) -> bool:
+    if isinstance(right, Null):
+        return True
+    return (column.name in PARTIAL_COLUMNS or isinstance(column.type, Boolean)) and isinstance(
+        right, BindParameter
+    ) and right.value is not None and not isinstance(right.value, (list, tuple))
+
+
+def predicates(statement: Select) -> Dict[Table, _Predicates]:
+    found: Dict[Table, _Predicates] = {}
+    if statement.whereclause is None:
+        return found
+    for element in visitors.iterate(statement.whereclause):
+        if not isinstance(element, BinaryExpression):
+            continue
+        column = _column(element.left)
+        if column is None:
+            continue
+        entry = found.setdefault(column.table, _Predicates())
+        op = element.operator
+        if op in (operators.is_, operators.eq) and _is_partial_candidate(column, element.right):
+            entry.partial.append(element)
+        elif op in EQUALITY_OPS:
+            entry.equality.append(column)
+        elif op in RANGE_OPS:
+            entry.ranges.append(column)
+    return found
+
+
+def _order_columns(statement: Select) -> List[Column]:
+    columns = []
+    for clause in statement._order_by_clauses:
+        inner = clause.element if isinstance(clause, UnaryExpression) else clause
+        column = _column(inner)
+        if column is not None:
+            columns.append(column)
+    return columns
+
+
+def _normalize_predicate(predicate: str) -> str:
+    """Drop casts, parentheses and spacing so reflected and rendered predicates compare equal."""
+    return re.sub(r"::[\w ]+|[()\s]", "", predicate).lower()
+
+
+def _existing_indexes(conn: Connection, table: str) -> List[Tuple[List[str], Optional[str]]]:
+    """Column lists of the table's indexes, with the normalized partial-index predicate if any."""
+    indexes: List[Tuple[List[str], Optional[str]]] = []
+    for index in inspect(conn).get_indexes(table):
+        options = index.get("dialect_options") or {}
+        where = options.get("postgresql_where", options.get("sqlite_where"))
+        columns = [name for name in index["column_names"] if name is not None]
+        indexes.append((columns, _normalize_predicate(str(where)) if where is not None else None))
+    primary = inspect(conn).get_pk_constraint(table).get("constrained_columns") or []
+    if primary:
+        indexes.append((list(primary), None))
+    return indexes
+
+
+def suggest_indexes(conn: Connection, statement: Select) -> List[str]:
+    """Composite/partial index DDL for the statement's unindexed predicates."""
+    order_by = _order_columns(statement)
+    suggestions = []
+    for table, found in predicates(statement).items():
+        columns: List[str] = []
+        for column in found.equality:
+            if column.name not in columns:
+                columns.append(column.name)
+        trailing = found.ranges[:1] or [c for c in order_by if c.table is table][:1]
+        columns.extend(c.name for c in trailing if c.name not in columns)
+        if not columns:
+            continue
+        where = " AND ".join(
+            str(p.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True, "include_table": False}))
+            for p in found.partial
+        )
+        # A partial index only serves queries that repeat its predicate.
+        wanted = {None, _normalize_predicate(where)} if where else {None}
+        existing = _existing_indexes(conn, table.name)
+        if any(cols[:len(columns)] == columns and predicate in wanted for cols, predicate in existing):
+            continue
+        name = f"ix_{table.name}_{'_'.join(columns)}"
+        ddl = f"CREATE INDEX {name} ON {table.name} ({', '.join(columns)})"
+        if where:
+            ddl += f" WHERE {where}"
+        suggestions.append(ddl)
+    return suggestions
+
+
+def analyze(conn: Connection, query: CriticalQuery) -> PlanReport:
+    if query.build is None:
+        return PlanReport(query.name, [], skipped=query.skip_reason)
+    statement = query.build()
+    if conn.dialect.name == "postgresql":
+        plan, full_scans, sorts = _postgres_plan(conn, statement)
+    else:
+        plan, full_scans, sorts = _sqlite_plan(conn, statement)
+    report = PlanReport(query.name, plan, full_scans, sorts)
+    if full_scans or sorts:
+        report.suggestions = suggest_indexes(conn, statement)
+    return report
+
+
+def check(conn: Connection, queries: Optional[Sequence[CriticalQuery]] = None) -> List[PlanReport]:
+    return [analyze(conn, query) for query in (queries or critical_queries())]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite://"))
+    parser.add_argument("--create-tables", action="store_true")
+    args = parser.parse_args()
+
+    import app.indexes  # noqa: F401
+    from app.database import Base
+
+    engine = create_engine(args.database_url)
+    if args.create_tables or args.database_url == "sqlite://":
+        Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        reports = check(conn)
+
+    print(json.dumps([report.__dict__ for report in reports], indent=2))
+    failing: Set[str] = {report.name for report in reports if not report.ok}
+    for report in reports:
+        if report.skipped:
+            print(f"Skipped {report.name}: {report.skipped}", file=sys.stderr)
+    if failing:
+        print(f"Full scans on large tables: {', '.join(sorted(failing))}", file=sys.stderr)
+    sys.exit(1 if failing else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Benchmark set-wise deadline reminder planning at 100k organizations.
+
+Usage::
+
+    python -m benchmarks.reminder_planner [--organizations 100000] [--database-url URL]
+
+Seeds organizations, two users per organization and four open deadlines per
+organization spread over the next 120 days, then times one planner tick
+against the naive per-organization loop (measured on a sample and
+extrapolated).
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.database import Base, Organization, User
+from app.services.reminder_planner import (
+    REMINDER_THRESHOLDS,
+    compliance_deadlines,
+    plan_reminders,
+)
+
+DEADLINE_TYPES = ("quarterly_report", "annual_report", "fee_payment", "registration_renewal")
+CHUNK = 20_000
+
+
+def seed(engine: Engine, organizations: int, today: date, rng: random.Random) -> None:
+    created = datetime(2024, 1, 1)
+    org_rows: List[Dict[str, Any]] = []
+    user_rows: List[Dict[str, Any]] = []
+    deadline_rows: List[Dict[str, Any]] = []
+    with engine.begin() as conn:
+        for i in range(organizations):
+            org_id = f"org-{i:06d}"
+            org_rows.append({"id": org_id, "name": f"Organization {i}", "created_at": created})
+            for j in range(2):
+                user_rows.append({
+                    "id": f"user-{i:06d}-{j}",
+                    "email": f"user{j}.{i}@example.com",
+                    "password_hash": "x",
+                    "organization_id": org_id,
+                    "created_at": created,
+                })
+            for k, deadline_type in enumerate(DEADLINE_TYPES):
+                deadline_rows.append({
+                    "id": f"dl-{i:06d}-{k}",
+                    "organization_id": org_id,
+                    "deadline_type": deadline_type,
+                    "due_date": today + timedelta(days=rng.randint(0, 120)),
+                })
+            if len(deadline_rows) >= CHUNK:
+                _flush(conn, org_rows, user_rows, deadline_rows)
+        _flush(conn, org_rows, user_rows, deadline_rows)
+
+
+def _flush(
+    conn: Connection,
+    org_rows: List[Dict[str, Any]],
+    user_rows: List[Dict[str, Any]],
+    deadline_rows: List[Dict[str, Any]],
+) -> None:
+    for table, rows in (
+        (Organization.__table__, org_rows),
+        (User.__table__, user_rows),
+        (compliance_deadlines, deadline_rows),
+    ):
+        if rows:
+            conn.execute(table.insert(), rows)
+            rows.clear()
+
+
+def naive_tick(session: Session, org_ids: Sequence[str], today: date) -> int:
+    """Per-organization baseline: one deadline query plus one user query each."""
+    reminders = 0
+    for org_id in org_ids:
+        deadlines = session.execute(
+            select(compliance_deadlines).where(compliance_deadlines.c.organization_id == org_id)
+        ).all()
+        for deadline in deadlines:
+            if (deadline.due_date - today).days in REMINDER_THRESHOLDS:
+                users = session.execute(
+                    select(User.__table__).where(User.__table__.c.organization_id == org_id)
+                ).all()
+                reminders += len(users)
+    return reminders
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--organizations", type=int, default=100_000)
+    parser.add_argument("--naive-sample", type=int, default=2_000)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    today = date(2024, 1, 1)
+
+    started = time.perf_counter()
+    seed(engine, args.organizations, today, random.Random(args.seed))
+    seed_seconds = time.perf_counter() - started
+
+    queries = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*_: Any) -> None:
+        nonlocal queries
+        queries += 1
+
+    with Session(engine) as session:
+        started = time.perf_counter()
+        batches = plan_reminders(session, today)
+        planner_seconds = time.perf_counter() - started
+        planner_queries = queries
+
+        sample = [f"org-{i:06d}" for i in range(min(args.naive_sample, args.organizations))]
+        queries = 0
+        started = time.perf_counter()
+        naive_tick(session, sample, today)
+        naive_seconds = (time.perf_counter() - started) * args.organizations / len(sample)
+        naive_queries = queries * args.organizations // len(sample)
+
+    print(json.dumps({
+        "organizations": args.organizations,
+        "seed_seconds": round(seed_seconds, 2),
+        "planner": {
+            "seconds": round(planner_seconds, 4),
+            "queries": planner_queries,
+            "batches": len(batches),
+            "recipients": sum(len(batch.recipients) for batch in batches),
+        },
+        "naive_extrapolated": {
+            "seconds": round(naive_seconds, 2),
+            "queries": naive_queries,
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
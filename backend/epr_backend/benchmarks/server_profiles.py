@@ -0,0 +1,81 @@
+"""Compare throughput of the single-process launch with the production profile.
+
+Usage::
+
+    python -m benchmarks.server_profiles [--users 200] [--duration 30] [--output results.json]
+
+Runs the ``benchmarks.load`` scenario mix against a local server started
+two ways: ``uvicorn app.main:app`` with one worker (the Dockerfile's old
+launch, where the QA_REPORT numbers come from), and ``gunicorn -c
+gunicorn.conf.py`` with workers sized from the CPU quota. Prints total
+throughput, p95 latency and error rate for each, plus the throughput ratio.
+Both runs use the same database (``DATABASE_URL``) and Redis, so run it
+against disposable services.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, Tuple
+
+from benchmarks import load
+
+# name -> (target, workers); 0 workers sizes gunicorn from the CPU quota.
+PROFILES: Dict[str, Tuple[str, int]] = {
+    "uvicorn_single": ("uvicorn", 1),
+    "gunicorn_production": ("gunicorn", 0),
+}
+
+
+def load_args(args: argparse.Namespace, target: str, workers: int) -> argparse.Namespace:
+    return argparse.Namespace(
+        target=target,
+        base_url=None,
+        workers=workers,
+        products=args.products,
+        dataset_orgs=0,
+        dataset_products_per_org=0,
+        users=args.users,
+        duration=args.duration,
+        think_time=0.0,
+        request_timeout=30.0,
+        seed=args.seed,
+        output=None,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    profiles: Dict[str, Any] = {}
+    for name, profile in PROFILES.items():
+        results = asyncio.run(load.run(load_args(args, *profile)))
+        total = results["requests"]["total"]
+        profiles[name] = {
+            "rps": total["rps"],
+            "p95_ms": total["p95_ms"],
+            "p99_ms": total["p99_ms"],
+            "error_rate": total["error_rate"],
+            "requests": results["requests"],
+        }
+    baseline = profiles["uvicorn_single"]["rps"]
+    rendered = json.dumps({
+        "users": args.users,
+        "duration_s": args.duration,
+        "throughput_ratio": round(profiles["gunicorn_production"]["rps"] / baseline, 2) if baseline else None,
+        "profiles": profiles,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(rendered + "\n")
+    print(rendered)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Production launch profile; see app/server.py.
+#
+#     gunicorn -c gunicorn.conf.py app.main:app
+import os
+from typing import Any
+
+from app.server import check_scheduler, post_fork, worker_count  # noqa: F401  (post_fork is a gunicorn hook)
+
+# Scheduled jobs run in the dedicated scheduler service, not in API workers,
+# and rate limits are counted in Redis so they hold across workers.
+os.environ.setdefault("RUN_SCHEDULER", "false")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "redis")
+
+bind = os.getenv("BIND", "0.0.0.0:8001")
+workers = worker_count()
+worker_class = "app.server.ProductionUvicornWorker"
+preload_app = True
+
+# SIGTERM: stop accepting, let in-flight requests finish, then exit.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Recycle workers now and then to bound memory growth; jitter avoids synchronized restarts.
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+def on_starting(server: Any) -> None:
+    check_scheduler(workers)
@@ -3,6 +3,7 @@ import pytest_asyncio
 import asyncio
 from typing import AsyncGenerator, Generator
 from unittest.mock import Mock, patch
+import httpx
 from httpx import AsyncClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -26,6 +27,7 @@ with patch('app.services.scheduler.RedisJobStore') as mock_redis_store:
 from app.database import get_db, Base
 from app.auth import get_current_user
 from app.schemas import User
+from app.services.query_stats import QueryCounter
 
 TEST_DATABASE_URL = "sqlite:///./test.db"
 
@@ -51,6 +53,117 @@ def anyio_backend():
     return "asyncio"
 
 
+# Identical statement shapes allowed per test before it is treated as N+1.
+DEFAULT_MAX_REPEATS = 5
+
+
+@pytest.fixture
+def query_counter():
+    """Count SQL statements executed on any engine during the test."""
+    with QueryCounter() as counter:
+        yield counter
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    """Enforce ``@pytest.mark.query_budget(max_queries, max_repeats=...)``.
+
+    Only statements executed by the test body count; fixture setup does not.
+    """
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+    max_queries = marker.args[0] if marker.args else marker.kwargs["max_queries"]
+    max_repeats = marker.kwargs.get("max_repeats", DEFAULT_MAX_REPEATS)
+    with QueryCounter() as counter:
+        result = yield
+    problems = []
+    if counter.count > max_queries:
+        problems.append(f"executed {counter.count} SQL statements (budget {max_queries})")
+    for shape, count in counter.repeated(max_repeats + 1).items():
+        problems.append(f"possible N+1: {count} x {shape[:200]}")
+    if problems:
+        pytest.fail("Query budget exceeded: " + "; ".join(problems), pytrace=False)
+    return result
+
+
+# -- middleware and outbound client doubles -------------------------------------
+
+
+class StubApp:
+    """Stand-in ASGI endpoint for middleware tests.
+
+    Records each request's path in ``calls`` and body in ``bodies``, then
+    answers with ``status`` and ``body`` (either may be a callable: ``status``
+    gets the scope, ``body`` the stub). ``chunks`` streams the body instead,
+    without a Content-Length; ``release`` and ``delay`` hold the response back.
+    """
+
+    def __init__(self, status=200, body=b"{}", headers=(), chunks=None, delay=0.0, release=None,
+                 before=None):
+        self.status = status
+        self.body = body
+        self.headers = list(headers)
+        self.chunks = chunks
+        self.delay = delay
+        self.release = release
+        self.before = before
+        self.calls = []
+        self.bodies = []
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        self.calls.append(scope["path"])
+        self.bodies.append(message.get("body", b""))
+        if self.before is not None:
+            self.before(scope)
+        if self.release is not None:
+            await self.release.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status = self.status(scope) if callable(self.status) else self.status
+        body = self.body(self) if callable(self.body) else self.body
+        headers = list(self.headers)
+        if self.chunks is None:
+            headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if self.chunks is None:
+            await send({"type": "http.response.body", "body": body})
+            return
+        for chunk in self.chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+@pytest.fixture
+def stub_app():
+    """Build stand-in ASGI endpoints (see ``StubApp``)."""
+    return StubApp
+
+
+@pytest.fixture
+def asgi_client():
+    """Build an HTTP client that calls an ASGI app in-process."""
+    def make(app, base_url="http://test"):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=base_url)
+
+    return make
+
+
+@pytest.fixture
+def outbound_clients():
+    """Build pooled clients for one provider with fresh circuit breakers and bulkheads."""
+    from app.services.outbound import OutboundClients, ProviderSettings
+    from app.services.resilience import reset_guards
+
+    def make(provider, base_url, transport=None, **overrides):
+        reset_guards()
+        settings = ProviderSettings(provider, base_url, **overrides)
+        return OutboundClients({provider: settings}, transport=transport)
+
+    return make
+
+
 @pytest.fixture
 def db_session():
     """Create a fresh database session for each test."""
@@ -162,6 +162,7 @@ class TestAuthEndpoints:
 class TestProductEndpoints:
     """Test product management endpoints"""
 
+    @pytest.mark.query_budget(8)
     def test_create_product(self, client, authenticated_user, auth_headers):
         """Test creating a new product"""
         product_data = {
@@ -178,6 +179,7 @@ class TestProductEndpoints:
         assert "created_at" in data
         assert "organization_id" in data
 
+    @pytest.mark.query_budget(5)
     def test_get_products_list(self, client, auth_headers, test_product):
         """Test retrieving products list"""
         response = client.get("/api/products/", headers=auth_headers)
@@ -190,6 +192,7 @@ class TestProductEndpoints:
         product_ids = [p["id"] for p in data]
         assert test_product["id"] in product_ids
 
+    @pytest.mark.query_budget(5)
     def test_get_product_by_id(self, client, auth_headers, test_product):
         """Test retrieving a specific product"""
         product_id = test_product["id"]
@@ -200,12 +203,14 @@ class TestProductEndpoints:
         assert data["id"] == product_id
         assert data["name"] == test_product["name"]
 
+    @pytest.mark.query_budget(5)
     def test_get_nonexistent_product(self, client, auth_headers):
         """Test retrieving a non-existent product"""
         response = client.get("/api/products/99999", headers=auth_headers)
 
         assert response.status_code == 404
 
+    @pytest.mark.query_budget(8)
     def test_update_product(self, client, auth_headers, test_product):
         """Test updating a product"""
         product_id = test_product["id"]
@@ -222,6 +227,7 @@ class TestProductEndpoints:
         assert data["description"] == update_data["description"]
         assert data["weight"] == update_data["weight"]
 
+    @pytest.mark.query_budget(20)
     def test_delete_product(self, client, auth_headers):
         """Test deleting a product"""
         import json
@@ -245,6 +251,7 @@ class TestProductEndpoints:
 class TestMaterialEndpoints:
     """Test material management endpoints"""
 
+    @pytest.mark.query_budget(5)
     def test_get_materials_list(self, client, auth_headers):
         """Test retrieving materials list"""
         response = client.get("/api/materials/", headers=auth_headers)
@@ -258,6 +265,7 @@ class TestMaterialEndpoints:
         for material in expected_materials:
             assert material in material_names
 
+    @pytest.mark.query_budget(10)
     def test_get_material_by_id(self, client, auth_headers):
         """Test retrieving a specific material"""
         list_response = client.get("/api/materials/", headers=auth_headers)
@@ -274,6 +282,7 @@ class TestMaterialEndpoints:
 class TestFeeEndpoints:
     """Test EPR fee calculation endpoints"""
 
+    @pytest.mark.query_budget(10)
     def test_calculate_fees(self, client, auth_headers, test_product):
         """Test fee calculation for products"""
         params = {
@@ -289,6 +298,7 @@ class TestFeeEndpoints:
         assert isinstance(data["total_fee"], (int, float))
         assert data["total_fee"] >= 0
 
+    @pytest.mark.query_budget(20)
     def test_calculate_fees_multiple_products(self, client, auth_headers, test_product):
         """Test fee calculation for multiple products"""
         import json
@@ -316,6 +326,7 @@ class TestFeeEndpoints:
 class TestReportEndpoints:
     """Test compliance report endpoints"""
 
+    @pytest.mark.query_budget(5)
     def test_get_reports_list(self, client, auth_headers):
         """Test retrieving reports list"""
         response = client.get("/api/reports/", headers=auth_headers)
@@ -324,6 +335,7 @@ class TestReportEndpoints:
         data = response.json()
         assert isinstance(data, list)
 
+    @pytest.mark.query_budget(10)
     def test_generate_report(self, client, auth_headers):
         """Test generating a new compliance report"""
         report_data = {
@@ -341,6 +353,7 @@ class TestReportEndpoints:
         assert "id" in data
         assert "status" in data
 
+    @pytest.mark.query_budget(15)
     def test_get_report_by_id(self, client, auth_headers):
         """Test retrieving a specific report"""
         report_data = {
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.middleware.admission import AdmissionControlMiddleware
+from app.services.admission import (
+    PRIORITY_CRITICAL,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    AdmissionController,
+    LoadMonitor,
+)
+
+
+class TestAdmissionController:
+    """Test route priorities and shed levels."""
+
+    def test_route_priorities(self):
+        """Health is critical, bulk lists and exports are low, the rest normal."""
+        controller = AdmissionController(LoadMonitor())
+        assert controller.priority("GET", "/healthz") == PRIORITY_CRITICAL
+        assert controller.priority("GET", "/api/products/") == PRIORITY_LOW
+        assert controller.priority("GET", "/api/reports/r1/export") == PRIORITY_LOW
+        assert controller.priority("POST", "/api/reports/generate") == PRIORITY_LOW
+        assert controller.priority("POST", "/api/products/") == PRIORITY_NORMAL
+        assert controller.priority("GET", "/api/fees/calculate") == PRIORITY_NORMAL
+
+    def test_levels_follow_signals(self):
+        """Soft thresholds shed low priority, hard ones shed normal priority too."""
+        monitor = LoadMonitor()
+        controller = AdmissionController(monitor, max_in_flight=100, loop_lag_threshold=0.1)
+        assert controller.level(10) == 0
+        assert controller.level(80) == 1
+        assert controller.level(100) == 2
+        monitor.record_lag(0.15)
+        assert controller.level(0) == 1
+        monitor.record_lag(0.5)
+        assert controller.level(0) == 2
+        assert controller.admit(PRIORITY_CRITICAL, 1000)
+
+    def test_lag_recovers_gradually(self):
+        """A single quiet sample does not drop the smoothed lag to zero."""
+        monitor = LoadMonitor(decay=0.5)
+        monitor.record_lag(0.4)
+        monitor.record_lag(0.0)
+        assert monitor.loop_lag == pytest.approx(0.2)
+
+
+class TestLoadMonitor:
+    """Test the background saturation signals."""
+
+    @pytest.mark.asyncio
+    async def test_blocking_the_loop_is_measured(self):
+        """A synchronous stall shows up as event loop lag."""
+        monitor = LoadMonitor(interval=0.01)
+        await monitor.start()
+        try:
+            await asyncio.sleep(0.02)
+            time.sleep(0.15)
+            await asyncio.sleep(0.02)
+        finally:
+            await monitor.stop()
+        assert monitor.loop_lag >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_exhausted_pool_reports_wait(self):
+        """An outstanding pool probe counts with its current age."""
+        engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=1, max_overflow=0, pool_timeout=5)
+        monitor = LoadMonitor(engine)
+        held = engine.connect()
+        probe = asyncio.ensure_future(monitor.probe_pool())
+        await asyncio.sleep(0.1)
+        assert monitor.pool_wait >= 0.1
+        held.close()
+        await probe
+        assert monitor.pool_wait >= 0.1
+
+
+class TestAdmissionControlMiddleware:
+    """Test shedding at the ASGI edge."""
+
+    @pytest.mark.asyncio
+    async def test_overload_sheds_low_priority_only(self, stub_app, asgi_client):
+        """Under soft overload bulk lists get 503 + Retry-After while interactive and health pass."""
+        monitor = LoadMonitor()
+        monitor.record_lag(0.2)
+        app = stub_app(body=b"ok")
+        middleware = AdmissionControlMiddleware(
+            app, controller=AdmissionController(monitor, loop_lag_threshold=0.1), enabled=True
+        )
+        async with asgi_client(middleware) as client:
+            bulk = await client.get("/api/products/")
+            interactive = await client.get("/api/products/p1")
+            health = await client.get("/healthz")
+
+        assert bulk.status_code == 503
+        assert bulk.headers["retry-after"] == "2"
+        assert interactive.status_code == health.status_code == 200
+        assert app.calls == ["/api/products/p1", "/healthz"]
+
+    @pytest.mark.asyncio
+    async def test_in_flight_cap_sheds_normal_priority(self, stub_app, asgi_client):
+        """Requests beyond the in-flight cap are refused before reaching the app."""
+        release = asyncio.Event()
+        middleware = AdmissionControlMiddleware(
+            stub_app(release=release), controller=AdmissionController(LoadMonitor(), max_in_flight=2),
+            enabled=True,
+        )
+        async with asgi_client(middleware) as client:
+            running = [asyncio.ensure_future(client.get("/api/fees/calculate")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            refused = await client.get("/api/fees/calculate")
+            release.set()
+            done = await asyncio.gather(*running)
+
+        assert refused.status_code == 503
+        assert refused.headers["retry-after"] == "5"
+        assert [response.status_code for response in done] == [200, 200]
+        assert middleware.in_flight == 0
@@ -0,0 +1,54 @@
+from benchmarks.compare import baseline_from, compare
+from benchmarks.load import Recorder
+
+
+def results_with(p95_ms: float, error_rate: float = 0.0):
+    return {
+        "meta": {},
+        "requests": {
+            "GET /api/products/": {"count": 100, "p95_ms": p95_ms, "error_rate": error_rate},
+            "total": {"count": 100, "p95_ms": p95_ms, "error_rate": error_rate},
+        },
+    }
+
+
+class TestRecorder:
+    """Test load benchmark result aggregation."""
+
+    def test_summary_percentiles_and_errors(self):
+        """Test nearest-rank percentiles and per-request error rates."""
+        recorder = Recorder()
+        for i in range(1, 101):
+            recorder.record("GET /healthz", i / 1000, ok=i != 100)
+
+        summary = recorder.summary(elapsed=2.0)
+
+        assert summary["GET /healthz"]["p50_ms"] == 50.0
+        assert summary["GET /healthz"]["p95_ms"] == 95.0
+        assert summary["GET /healthz"]["error_rate"] == 0.01
+        assert summary["total"]["rps"] == 50.0
+
+
+class TestRegressionGate:
+    """Test comparison against the stored baseline."""
+
+    def test_within_tolerance_passes(self):
+        """Test that small latency changes are not regressions."""
+        baseline = baseline_from(results_with(100.0))
+
+        assert compare(results_with(115.0), baseline, tolerance=0.2) == []
+
+    def test_latency_and_error_regressions_fail(self):
+        """Test that slow or failing requests are reported."""
+        baseline = baseline_from(results_with(100.0))
+
+        regressions = compare(results_with(130.0, error_rate=0.05), baseline, tolerance=0.2)
+
+        assert [r["reason"] for r in regressions] == ["p95 latency", "error rate"]
+
+    def test_missing_request_is_a_regression(self):
+        """Test that a scenario that stopped running is caught."""
+        baseline = baseline_from(results_with(100.0))
+        results = {"meta": {}, "requests": {}}
+
+        assert compare(results, baseline, tolerance=0.2)[0]["reason"] == "missing from results"
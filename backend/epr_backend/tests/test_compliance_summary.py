@@ -0,0 +1,187 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, Organization, Product, Report
+from app.services.compliance_summary import (
+    get_summary,
+    period_of,
+    refresh_organization_summary,
+    refresh_summaries,
+    summaries,
+)
+from benchmarks.query_plans import Explain
+
+NOW = period_of()
+
+
+@pytest.fixture
+def summary_session():
+    """Create a database with two organizations and summary maintenance enabled."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        for org_id in ("org-a", "org-b"):
+            session.add(Organization(id=org_id, name=org_id, created_at=datetime(2024, 1, 1)))
+        session.commit()
+        yield session
+
+
+def _product(product_id, org_id="org-a", weight=2.0):
+    return Product(
+        id=product_id, name=product_id, sku=product_id, weight=weight,
+        material_composition='{"plastic": 100}', organization_id=org_id,
+        created_at=datetime(2024, 1, 1),
+    )
+
+
+def _report(report_id, status="completed", fee=10.0, start=datetime(2024, 4, 1), org_id="org-a"):
+    return Report(
+        id=report_id, title=report_id, type="quarterly", status=status, start_date=start,
+        end_date=start, total_fee=fee, organization_id=org_id, created_at=start,
+    )
+
+
+def _counters(session, org_id, period):
+    summary = get_summary(session, org_id, period) or {}
+    return {
+        key: summary.get(key)
+        for key in ("product_count", "material_kg", "reports_total", "reports_completed",
+                    "reports_pending", "reports_failed", "fees_due")
+    }
+
+
+class TestPeriods:
+    """Test quarter labelling."""
+
+    def test_period_of_quarter_boundaries(self):
+        """Months map onto calendar quarters."""
+        assert period_of(datetime(2024, 1, 1)) == "2024-Q1"
+        assert period_of(datetime(2024, 6, 30)) == "2024-Q2"
+        assert period_of(datetime(2024, 10, 1)) == "2024-Q4"
+
+
+class TestIncrementalMaintenance:
+    """Test summary rows following ORM writes."""
+
+    def test_inserts_create_and_increment_rows(self, summary_session):
+        """The first write seeds the row, later writes apply deltas."""
+        summary_session.add(_product("p1"))
+        summary_session.commit()
+        summary_session.add_all([_product("p2", weight=3.0), _report("r1"), _report("r2", status="processing")])
+        summary_session.commit()
+
+        assert _counters(summary_session, "org-a", NOW)["product_count"] == 2
+        assert _counters(summary_session, "org-a", NOW)["material_kg"] == 5.0
+        q2 = _counters(summary_session, "org-a", "2024-Q2")
+        assert q2["reports_total"] == 2
+        assert q2["reports_completed"] == 1
+        assert q2["reports_pending"] == 1
+        assert q2["fees_due"] == 10.0
+        assert get_summary(summary_session, "org-b", NOW) is None
+
+    def test_updates_move_counts_between_buckets_and_periods(self, summary_session):
+        """Status, fee and date changes subtract the old contribution and add the new one."""
+        summary_session.add_all([_report("r1", status="processing", fee=0.0), _report("r2")])
+        summary_session.commit()
+
+        report = summary_session.get(Report, "r1")
+        report.status = "completed"
+        report.total_fee = 25.0
+        summary_session.commit()
+        q2 = _counters(summary_session, "org-a", "2024-Q2")
+        assert (q2["reports_completed"], q2["reports_pending"], q2["fees_due"]) == (2, 0, 35.0)
+
+        moved = summary_session.get(Report, "r2")
+        moved.start_date = datetime(2024, 8, 1)
+        summary_session.commit()
+        assert _counters(summary_session, "org-a", "2024-Q2")["fees_due"] == 25.0
+        assert _counters(summary_session, "org-a", "2024-Q3")["fees_due"] == 10.0
+
+    def test_deletes_and_expired_updates(self, summary_session):
+        """Deletes subtract; updates of unloaded values fall back to a recompute."""
+        summary_session.add_all([_product("p1"), _product("p2")])
+        summary_session.commit()
+
+        summary_session.delete(summary_session.get(Product, "p1"))
+        summary_session.commit()
+        product = summary_session.get(Product, "p2")
+        summary_session.expire(product, ["weight"])
+        product.weight = 7.5
+        summary_session.commit()
+
+        assert _counters(summary_session, "org-a", NOW)["product_count"] == 1
+        assert _counters(summary_session, "org-a", NOW)["material_kg"] == 7.5
+
+    def test_rollback_discards_deltas(self, summary_session):
+        """Deltas are applied in the write's transaction."""
+        summary_session.add(_product("p1"))
+        summary_session.commit()
+        summary_session.add(_product("p2"))
+        summary_session.flush()
+        summary_session.rollback()
+
+        assert _counters(summary_session, "org-a", NOW)["product_count"] == 1
+
+
+class TestFullRefresh:
+    """Test the scheduled set-based refresh."""
+
+    def test_refresh_repairs_drift_from_core_writes(self, summary_session):
+        """Core bulk writes bypass the listener; the full refresh corrects them."""
+        summary_session.add_all([_product("p1"), _report("r1")])
+        summary_session.commit()
+        summary_session.execute(Product.__table__.insert(), [
+            {"id": f"bulk-{i}", "organization_id": "org-b", "weight": 1.0} for i in range(3)
+        ])
+        summary_session.execute(Report.__table__.delete().where(Report.__table__.c.id == "r1"))
+        summary_session.execute(update(summaries).values(product_count=99))
+        summary_session.commit()
+
+        refresh_summaries(summary_session.connection())
+        summary_session.commit()
+
+        assert _counters(summary_session, "org-a", NOW)["product_count"] == 1
+        assert _counters(summary_session, "org-b", NOW)["product_count"] == 3
+        q2 = _counters(summary_session, "org-a", "2024-Q2")
+        assert (q2["reports_total"], q2["fees_due"]) == (0, 0.0)
+
+    def test_first_visit_refresh_runs_in_a_task(self, summary_session, monkeypatch):
+        """The dashboard's first-visit refresh computes only the requested organization."""
+        summary_session.execute(Product.__table__.insert(), [
+            {"id": f"bulk-{org_id}", "organization_id": org_id, "weight": 1.0} for org_id in ("org-a", "org-b")
+        ])
+        summary_session.commit()
+        monkeypatch.setattr("app.database.SessionLocal", lambda: Session(summary_session.get_bind()))
+
+        refresh_organization_summary("org-a")
+
+        assert _counters(summary_session, "org-a", NOW)["product_count"] == 1
+        assert get_summary(summary_session, "org-b", NOW) is None
+
+    def test_refresh_keeps_closed_period_catalogue(self, summary_session):
+        """Only the current period's product columns are recomputed."""
+        summary_session.execute(summaries.insert().values(
+            organization_id="org-a", period="2020-Q1", product_count=40, material_kg=80.0,
+            reports_total=0, reports_completed=0, reports_pending=0, reports_failed=0,
+            fees_due=0.0, updated_at=datetime(2020, 3, 31),
+        ))
+        summary_session.add(_product("p1"))
+        summary_session.commit()
+
+        refresh_summaries(summary_session.connection(), ["org-a"])
+
+        assert _counters(summary_session, "org-a", "2020-Q1")["product_count"] == 40
+        assert _counters(summary_session, "org-a", NOW)["product_count"] == 1
+
+    def test_summary_lookup_uses_primary_key(self, summary_session):
+        """The dashboard read is a single primary-key lookup."""
+        statement = select(summaries).where(
+            summaries.c.organization_id == "org-a", summaries.c.period == NOW
+        )
+        plan = [row[-1] for row in summary_session.execute(Explain(statement, "EXPLAIN QUERY PLAN"))]
+        assert len(plan) == 1
+        assert plan[0].startswith("SEARCH organization_compliance_summaries USING INDEX")
@@ -0,0 +1,118 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+from app.middleware.compression import CompressionMiddleware, available_codecs, negotiate
+
+LARGE_JSON = json.dumps([{"id": f"p{i}", "name": f"Product {i}", "weight": 0.5} for i in range(200)]).encode()
+
+
+@pytest.fixture
+def make_app(stub_app):
+    """Build an endpoint answering 200 with ``body`` (or streamed ``chunks``)."""
+    def make(body, content_type=b"application/json", extra_headers=(), chunks=None):
+        return stub_app(body=body, headers=[(b"content-type", content_type), *extra_headers], chunks=chunks)
+
+    return make
+
+
+@pytest.fixture
+def fetch(asgi_client):
+    """GET through the compression middleware; returns the response and its raw bytes."""
+    async def fetch(app, path="/api/products/", accept="gzip", **kwargs):
+        middleware = CompressionMiddleware(app, encodings=["gzip"], **kwargs)
+        async with asgi_client(middleware) as client:
+            async with client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+                return response, raw
+
+    return fetch
+
+
+class TestNegotiation:
+    """Test Accept-Encoding parsing."""
+
+    def test_quality_values_and_preference(self):
+        """Higher q wins, ties follow server preference, q=0 and unknown codings are excluded."""
+        preference = ["zstd", "br", "gzip"]
+        assert negotiate("gzip, br", preference) == "br"
+        assert negotiate("br;q=0.5, gzip", preference) == "gzip"
+        assert negotiate("gzip;q=0, deflate", preference) is None
+        assert negotiate("*", preference) == "zstd"
+        assert negotiate("identity", preference) is None
+
+    def test_gzip_is_always_available(self):
+        """gzip needs no optional package."""
+        assert "gzip" in available_codecs()
+
+
+class TestCompressionMiddleware:
+    """Test response compression decisions."""
+
+    @pytest.mark.asyncio
+    async def test_large_json_is_compressed(self, make_app, fetch):
+        """A large JSON body is gzipped with an exact Content-Length and Vary."""
+        response, raw = await fetch(make_app(LARGE_JSON, extra_headers=[(b"etag", b'"v1"')]))
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == 'W/"v1"'
+        assert int(response.headers["content-length"]) == len(raw) < len(LARGE_JSON)
+        assert gzip.decompress(raw) == LARGE_JSON
+
+    @pytest.mark.asyncio
+    async def test_small_bodies_pass_through(self, make_app, fetch):
+        """Bodies under the threshold are sent as is, still varying on Accept-Encoding."""
+        response, raw = await fetch(make_app(b'{"ok": true}'))
+
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert raw == b'{"ok": true}'
+
+    @pytest.mark.asyncio
+    async def test_streaming_responses_are_compressed_per_chunk(self, make_app):
+        """Each streamed chunk is flushed so it is decodable on arrival."""
+        chunks = [json.dumps({"row": i}).encode() + b"\n" for i in range(3)]
+        app = make_app(None, content_type=b"application/x-ndjson", chunks=chunks)
+        middleware = CompressionMiddleware(app, encodings=["gzip"])
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/api/products/stream",
+                 "headers": [(b"accept-encoding", b"gzip")]}
+        await middleware(scope, receive, send)
+
+        headers = dict(sent[0]["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        assert decoder.decompress(sent[1]["body"]) == chunks[0]
+        assert decoder.decompress(b"".join(m["body"] for m in sent[2:])) == b"".join(chunks[1:])
+        assert decoder.eof
+
+    @pytest.mark.asyncio
+    async def test_excluded_responses_are_untouched(self, make_app, fetch):
+        """Downloads, already-encoded bodies and binary types are never recompressed."""
+        for app, path in [
+            (make_app(LARGE_JSON), "/api/reports/r1/export"),
+            (make_app(LARGE_JSON, extra_headers=[(b"content-encoding", b"br")]), "/api/products/"),
+            (make_app(LARGE_JSON, content_type=b"application/pdf"), "/api/products/"),
+            (make_app(LARGE_JSON, extra_headers=[(b"cache-control", b"no-transform")]), "/api/products/"),
+        ]:
+            response, raw = await fetch(app, path=path)
+            assert response.headers.get("content-encoding") in (None, "br")
+            assert raw == LARGE_JSON
+
+    @pytest.mark.asyncio
+    async def test_clients_without_accept_encoding_get_identity(self, make_app, fetch):
+        """Without a usable coding the response is unchanged."""
+        response, raw = await fetch(make_app(LARGE_JSON), accept="identity")
+        assert "content-encoding" not in response.headers
+        assert raw == LARGE_JSON
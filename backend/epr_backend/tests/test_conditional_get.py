@@ -0,0 +1,243 @@
+import dataclasses
+import hashlib
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, Material, Organization, Report
+from app.middleware.conditional_get import (
+    DEFAULT_POLICIES,
+    ConditionalGetMiddleware,
+    bearer_token,
+    etag_matches,
+    make_etag,
+)
+from app.services.resource_versions import bump, get_version
+
+
+@pytest.fixture
+def version_engine():
+    """Create a database holding resource version counters."""
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+# Tokens the stand-in report endpoint accepts; "revoked" was valid once.
+REPORT_READERS = {"alice", "mallory"}
+
+
+def authorize(scope, params):
+    return bearer_token(scope) in REPORT_READERS
+
+
+POLICIES = [dataclasses.replace(policy, authorize=authorize) for policy in DEFAULT_POLICIES]
+SIGNED_IN = {"Authorization": "Bearer alice"}
+
+
+@pytest.fixture
+def endpoint(stub_app):
+    """Stand-in for the materials and report endpoints, which need a known token."""
+    return stub_app(
+        status=lambda scope: 200 if bearer_token(scope) in REPORT_READERS else 401,
+        body=b"[]",
+        headers=[(b"content-type", b"application/json")],
+    )
+
+
+@pytest.fixture
+def make_client(endpoint, asgi_client):
+    """Build a client for the middleware over ``endpoint`` with versions read from ``engine``."""
+    def make(engine):
+        def lookup(key):
+            with engine.connect() as conn:
+                return get_version(conn, key)
+
+        return asgi_client(ConditionalGetMiddleware(endpoint, POLICIES, lookup=lookup))
+
+    return make
+
+
+class TestResourceVersions:
+    """Test version counters maintained from ORM writes."""
+
+    def test_orm_writes_bump_versions(self, version_engine):
+        """Material and report writes increment their resource counters."""
+        with Session(version_engine) as session:
+            session.add(Organization(id="org-a", name="org-a"))
+            session.add(Material(id=1, name="Glass", category="glass", epr_rate=0.1))
+            session.add(Report(id="r1", title="Q1", status="processing", organization_id="org-a"))
+            session.commit()
+            session.get(Material, 1).epr_rate = 0.2
+            session.get(Report, "r1").title = "Q1"  # unchanged value: no bump
+            session.commit()
+
+        with version_engine.connect() as conn:
+            assert get_version(conn, "materials")[0] == 2
+            assert get_version(conn, "reports:r1")[0] == 1
+            assert get_version(conn, "reports:missing") == (0, None)
+
+    def test_rolled_back_writes_do_not_bump(self, version_engine):
+        """The counter moves in the write's transaction."""
+        with Session(version_engine) as session:
+            session.add(Material(id=1, name="Glass", category="glass", epr_rate=0.1))
+            session.flush()
+            session.rollback()
+
+        with version_engine.connect() as conn:
+            assert get_version(conn, "materials")[0] == 0
+
+
+class TestConditionalGetMiddleware:
+    """Test validators and 304 short-circuiting."""
+
+    def test_etag_comparison_is_weak(self):
+        """Strong and weak forms of the same tag match, lists and * are honoured."""
+        etag = make_etag("materials", 3)
+        assert etag_matches(etag[2:], etag)
+        assert etag_matches(f'"other", {etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches("*", etag, exists=False)
+        assert not etag_matches(make_etag("materials", 4), etag)
+
+    @pytest.mark.asyncio
+    async def test_matching_etag_skips_endpoint(self, endpoint, make_client, version_engine):
+        """A revalidation with the current ETag is answered without running the endpoint."""
+        with version_engine.begin() as conn:
+            bump(conn, ["materials"])
+        async with make_client(version_engine) as client:
+            first = await client.get("/api/materials/", headers=SIGNED_IN)
+            second = await client.get("/api/materials/", headers={
+                **SIGNED_IN, "If-None-Match": first.headers["etag"],
+            })
+
+        assert first.status_code == 200
+        assert first.headers["cache-control"].startswith("public")
+        assert "last-modified" in first.headers
+        assert second.status_code == 304
+        assert second.headers["etag"] == first.headers["etag"]
+        assert endpoint.calls == ["/api/materials/"]
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates_etag(self, endpoint, make_client, version_engine):
+        """After a bump the old ETag no longer matches."""
+        async with make_client(version_engine) as client:
+            first = await client.get("/api/materials/", headers=SIGNED_IN)
+            with version_engine.begin() as conn:
+                bump(conn, ["materials"])
+            second = await client.get("/api/materials/", headers={
+                **SIGNED_IN, "If-None-Match": first.headers["etag"],
+            })
+
+        assert second.status_code == 200
+        assert second.headers["etag"] != first.headers["etag"]
+        assert len(endpoint.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_private_etag_is_bound_to_credentials(self, endpoint, make_client, version_engine):
+        """A report ETag obtained with one token does not validate for another."""
+        async with make_client(version_engine) as client:
+            alice = await client.get("/api/reports/r1", headers={"Authorization": "Bearer alice"})
+            replay = await client.get("/api/reports/r1", headers={
+                "Authorization": "Bearer alice", "If-None-Match": alice.headers["etag"],
+            })
+            other = await client.get("/api/reports/r1", headers={
+                "Authorization": "Bearer mallory", "If-None-Match": alice.headers["etag"],
+            })
+
+        assert alice.headers["cache-control"] == "private, no-cache"
+        assert alice.headers["vary"] == "Authorization"
+        assert replay.status_code == 304
+        assert other.status_code == 200
+        assert len(endpoint.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_private_validators_need_authorized_credentials(
+        self, endpoint, make_client, version_engine, monkeypatch
+    ):
+        """Without credentials, or once access is revoked, revalidation reaches the endpoint."""
+        with version_engine.begin() as conn:
+            for _ in range(3):
+                bump(conn, ["reports:secret-123"])
+        async with make_client(version_engine) as client:
+            # Tags in the old unkeyed format, for every plausible version.
+            guesses = [
+                await client.get("/api/reports/secret-123", headers={"If-None-Match": 'W/"{}"'.format(
+                    hashlib.blake2b(f"reports:secret-123:{version}:".encode(), digest_size=10).hexdigest()
+                )})
+                for version in range(5)
+            ]
+            first = await client.get("/api/reports/secret-123", headers={"Authorization": "Bearer revoked"})
+            monkeypatch.setattr(
+                "tests.test_conditional_get.REPORT_READERS", REPORT_READERS | {"revoked"}
+            )
+            granted = await client.get("/api/reports/secret-123", headers={"Authorization": "Bearer revoked"})
+            monkeypatch.undo()
+            replay = await client.get("/api/reports/secret-123", headers={
+                "Authorization": "Bearer revoked", "If-None-Match": granted.headers["etag"],
+            })
+
+        assert [response.status_code for response in guesses] == [401] * 5
+        assert all("etag" not in response.headers for response in guesses)
+        assert first.status_code == 401 and "etag" not in first.headers
+        assert granted.status_code == 200
+        assert replay.status_code == 401
+        assert len(endpoint.calls) == 8
+
+    @pytest.mark.asyncio
+    async def test_wildcard_needs_credentials_and_an_existing_resource(
+        self, endpoint, make_client, version_engine
+    ):
+        """``If-None-Match: *`` is no shortcut past the endpoint's 401 or to unknown resources."""
+        with version_engine.begin() as conn:
+            bump(conn, ["materials"])
+        async with make_client(version_engine) as client:
+            anonymous = await client.get("/api/materials/", headers={"If-None-Match": "*"})
+            forged = await client.get("/api/materials/", headers={"Authorization": "Bearer forged",
+                                                                  "If-None-Match": "*"})
+            unknown = await client.get("/api/reports/never-written", headers={**SIGNED_IN, "If-None-Match": "*"})
+            known = await client.get("/api/materials/", headers={**SIGNED_IN, "If-None-Match": "*"})
+
+        assert anonymous.status_code == 401 and "etag" not in anonymous.headers
+        assert forged.status_code == 401 and "etag" not in forged.headers
+        assert unknown.status_code == 200
+        assert known.status_code == 304
+        assert len(endpoint.calls) == 3
+
+    def test_etag_is_keyed(self, monkeypatch):
+        """Tags depend on SECRET_KEY, so they cannot be computed from the key and version alone."""
+        from app.middleware import conditional_get
+
+        tags = []
+        for secret in ("one", "two"):
+            monkeypatch.setenv("SECRET_KEY", secret)
+            conditional_get._etag_secret.cache_clear()
+            tags.append(make_etag("reports:r1", 3, "caller"))
+        conditional_get._etag_secret.cache_clear()
+        assert tags[0] != tags[1]
+
+    @pytest.mark.asyncio
+    async def test_if_modified_since_and_unmatched_routes(self, endpoint, make_client, version_engine):
+        """If-Modified-Since is honoured; other routes and methods pass through untouched."""
+        with version_engine.begin() as conn:
+            bump(conn, ["materials"])
+        async with make_client(version_engine) as client:
+            first = await client.get("/api/materials/", headers=SIGNED_IN)
+            cached = await client.get("/api/materials/", headers={
+                **SIGNED_IN, "If-Modified-Since": first.headers["last-modified"],
+            })
+            stale = await client.get("/api/materials/", headers={
+                **SIGNED_IN, "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+            })
+            other = await client.get("/api/products/", headers=SIGNED_IN)
+            post = await client.post("/api/materials/", headers=SIGNED_IN)
+
+        assert cached.status_code == 304
+        assert stale.status_code == 200
+        assert "etag" not in other.headers
+        assert "etag" not in post.headers
+        assert len(endpoint.calls) == 4
@@ -0,0 +1,64 @@
+import json
+from itertools import islice
+
+from sqlalchemy import create_engine, func, select
+
+from app.database import Base, Material, Product
+from benchmarks.dataset import (
+    DatasetSpec,
+    generate_products,
+    load_dataset,
+    organization_sizes,
+)
+
+
+class TestGeneration:
+    """Test deterministic synthetic data generation."""
+
+    def test_same_seed_same_rows(self):
+        """Test that a spec and seed always produce identical rows."""
+        spec = DatasetSpec(organizations=5, products_per_org=20)
+
+        assert list(generate_products(spec)) == list(generate_products(spec))
+        assert list(generate_products(spec)) != list(generate_products(DatasetSpec(
+            organizations=5, products_per_org=20, seed=7
+        )))
+
+    def test_skewed_sizes_sum_to_total(self):
+        """Test that skewed organization sizes keep the requested volume."""
+        spec = DatasetSpec(organizations=37, products_per_org=100, skew=1.0)
+
+        sizes = organization_sizes(spec)
+
+        assert sum(sizes) == spec.total_products
+        assert max(sizes) > 5 * min(sizes)
+
+    def test_compositions_add_up_to_100(self):
+        """Test that every material composition is a complete split."""
+        spec = DatasetSpec(organizations=3, products_per_org=200)
+
+        for product in islice(generate_products(spec), 500):
+            shares = json.loads(product["material_composition"])
+            assert sum(shares.values()) == 100
+            assert 1 <= len(shares) <= 3
+
+
+class TestBulkLoad:
+    """Test loading the dataset into a database."""
+
+    def test_load_dataset_into_sqlite(self):
+        """Test that rows are loaded and the catalogue is not duplicated."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        spec = DatasetSpec(organizations=4, products_per_org=50, reports_per_org=2)
+
+        counts = load_dataset(engine, spec)
+        again = load_dataset(engine, DatasetSpec(organizations=1, prefix="more"))
+
+        with engine.connect() as conn:
+            products = conn.execute(select(func.count()).select_from(Product.__table__)).scalar()
+            materials = conn.execute(select(func.count()).select_from(Material.__table__)).scalar()
+        assert counts["products"] == 200
+        assert products == 200 + again["products"]
+        assert materials == counts["materials"]
+        assert again["materials"] == 0
@@ -0,0 +1,157 @@
+import threading
+import time
+
+import httpx
+import pytest
+from sqlalchemy import Column, MetaData, String, Table, create_engine, insert, select
+
+from app.db_routing import (
+    DatabaseRouter,
+    DatabaseRoutingMiddleware,
+    StickyWindow,
+    _state,
+    read_replica,
+    user_key,
+)
+
+metadata = MetaData()
+markers = Table("markers", metadata, Column("id", String, primary_key=True), Column("source", String))
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """Create primary and replica stand-ins that identify themselves."""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, source in ((primary, "primary"), (replica, "replica")):
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(markers).values(id="whoami", source=source))
+    return primary, replica
+
+
+@pytest.fixture
+def router(engines):
+    """Create a router with one replica and a 60 second sticky window."""
+    primary, replica = engines
+    return DatabaseRouter(primary, [replica], sticky=StickyWindow(60.0))
+
+
+def whoami(session):
+    return session.execute(select(markers.c.source).where(markers.c.id == "whoami")).scalar()
+
+
+class TestSessionRouting:
+    """Test statement routing inside sessions."""
+
+    def test_primary_by_default(self, router):
+        """Test that sessions outside a read-only scope use the primary."""
+        with router.sessionmaker()() as session:
+            assert whoami(session) == "primary"
+
+    def test_read_replica_scope(self, router):
+        """Test that worker reads can be sent to the replica."""
+        with read_replica(), router.sessionmaker()() as session:
+            assert whoami(session) == "replica"
+
+    def test_session_sticks_to_primary_after_write(self, router):
+        """Test read-your-writes within one session."""
+        with read_replica(), router.sessionmaker()() as session:
+            session.execute(insert(markers).values(id="new", source="written"))
+            session.commit()
+
+            assert session.execute(
+                select(markers.c.source).where(markers.c.id == "new")
+            ).scalar() == "written"
+
+    def test_commit_starts_sticky_window_for_caller(self, router):
+        """Test that a writer's later requests stay on the primary."""
+        with read_replica(user_key="caller-1"), router.sessionmaker()() as session:
+            session.execute(insert(markers).values(id="x", source="y"))
+            session.commit()
+
+        assert router.sticky.is_sticky("caller-1")
+        assert not router.sticky.is_sticky("caller-2")
+
+
+class TestReplicaLag:
+    """Test fallback to the primary when a replica lags."""
+
+    def test_lagging_replica_is_skipped(self, engines):
+        """Test that reads fall back to the primary above the lag budget."""
+        primary, replica = engines
+        lag = {"value": 10.0}
+        router = DatabaseRouter(
+            primary, [replica], max_lag=2.0, lag_check_interval=0.0,
+            lag_probe=lambda conn: lag["value"],
+        )
+
+        with read_replica(), router.sessionmaker()() as session:
+            assert whoami(session) == "primary"
+            lag["value"] = 0.5
+            session.close()
+            assert whoami(session) == "replica"
+
+    def test_failing_probe_takes_replica_out_of_rotation(self, engines):
+        """Test that an unreachable replica is not used."""
+        primary, replica = engines
+
+        def broken(conn):
+            raise RuntimeError("replica down")
+
+        router = DatabaseRouter(primary, [replica], lag_probe=broken)
+
+        assert router.reader() is primary
+
+    def test_probe_does_not_block_other_sessions(self, engines):
+        """Test that a hanging lag probe only holds up the session running it."""
+        primary, replica = engines
+        other = create_engine(replica.url)
+        release = threading.Event()
+        probes = []
+
+        def first_probe_hangs(conn):
+            probes.append(conn)
+            if len(probes) == 1:
+                release.wait(5)
+            return 0.0
+
+        router = DatabaseRouter(
+            primary, [replica, other], lag_check_interval=60.0, lag_probe=first_probe_hangs
+        )
+        prober = threading.Thread(target=router.reader)
+        prober.start()
+        time.sleep(0.05)
+        try:
+            started = time.perf_counter()
+            assert router.reader() is other
+            assert time.perf_counter() - started < 0.5
+        finally:
+            release.set()
+            prober.join()
+
+
+class TestRoutingMiddleware:
+    """Test request-level routing decisions."""
+
+    @pytest.mark.asyncio
+    async def test_safe_methods_read_from_replica_unless_sticky(self, router):
+        """Test that GETs use replicas and a recent writer's GETs do not."""
+        seen = []
+
+        async def app(scope, receive, send):
+            state = _state.get()
+            seen.append((scope["method"], state.read_only))
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        transport = httpx.ASGITransport(app=DatabaseRoutingMiddleware(app, router))
+        headers = {"Authorization": "Bearer token-a"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/api/products/", headers=headers)
+            await client.post("/api/products/", headers=headers)
+            router.sticky.mark(user_key({"headers": [(b"authorization", b"Bearer token-a")]}))
+            await client.get("/api/products/", headers=headers)
+            await client.get("/api/products/", headers={"Authorization": "Bearer token-b"})
+
+        assert seen == [("GET", True), ("POST", False), ("GET", False), ("GET", True)]
@@ -0,0 +1,173 @@
+from contextlib import nullcontext
+from unittest.mock import Mock
+
+import pytest
+
+from app.services.distributed_scheduler import (
+    MISFIRE_SKIP,
+    NEXT_RUN_KEY,
+    DistributedScheduler,
+    HashRing,
+    ScheduledJob,
+    plan_run,
+)
+
+
+@pytest.fixture
+def hourly_job():
+    """Create a job that runs once an hour."""
+    return ScheduledJob(id="deadline-check", task="tasks.deadline_check", interval=3600)
+
+
+@pytest.fixture
+def redis_client():
+    """Create an in-process Redis with Lua scripting."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeStrictRedis()
+
+
+def failing_celery_app():
+    celery_app = Mock()
+    celery_app.producer_or_acquire.side_effect = lambda: nullcontext(Mock())
+    celery_app.send_task.side_effect = ConnectionError("broker unreachable")
+    return celery_app
+
+
+class TestHashRing:
+    """Test consistent-hash ownership of jobs."""
+
+    def test_every_job_has_exactly_one_owner(self):
+        """Test that ownership is deterministic across instances."""
+        members = ["scheduler-a", "scheduler-b", "scheduler-c"]
+        ring_a = HashRing(members)
+        ring_b = HashRing(list(reversed(members)))
+
+        for i in range(200):
+            assert ring_a.owner(f"job-{i}") == ring_b.owner(f"job-{i}")
+
+    def test_adding_member_moves_few_jobs(self):
+        """Test that scaling out only reassigns a fraction of the jobs."""
+        jobs = [f"job-{i}" for i in range(1000)]
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+
+        moved = sum(before.owner(job) != after.owner(job) for job in jobs)
+
+        assert moved < 400
+
+    def test_empty_ring_has_no_owner(self):
+        """Test that no instance owns jobs when membership is empty."""
+        assert HashRing([]).owner("job-1") is None
+
+
+class TestMisfireHandling:
+    """Test catch-up of runs missed during downtime."""
+
+    def test_first_tick_schedules_next_run(self, hourly_job):
+        """Test that a new job is scheduled one interval ahead."""
+        assert plan_run(hourly_job, None, 1000.0) == (None, 0, 4600.0)
+
+    def test_on_time_run(self, hourly_job):
+        """Test that a due job runs at its scheduled time."""
+        assert plan_run(hourly_job, 1000.0, 1005.0) == (1000.0, 0, 4600.0)
+
+    def test_missed_runs_are_coalesced(self, hourly_job):
+        """Test that several missed windows produce one run."""
+        scheduled, missed, next_run = plan_run(hourly_job, 0.0, 3 * 3600 + 10)
+
+        assert scheduled == 3 * 3600
+        assert missed == 3
+        assert next_run == 4 * 3600
+
+    def test_skip_policy_drops_missed_runs(self):
+        """Test that the skip policy does not catch up."""
+        job = ScheduledJob(id="j", task="t", interval=60, misfire=MISFIRE_SKIP)
+
+        assert plan_run(job, 0.0, 150.0) == (None, 0, 180.0)
+
+    def test_runs_beyond_grace_time_are_dropped(self):
+        """Test that a run later than its grace time is not replayed."""
+        job = ScheduledJob(id="daily", task="t", interval=86400, misfire_grace_time=3600)
+
+        scheduled, _, _ = plan_run(job, 0.0, 7200.0)
+
+        assert scheduled is None
+
+
+class TestDispatch:
+    """Test batched dispatch into Celery."""
+
+    def test_dispatch_batches_share_a_producer(self, hourly_job):
+        """Test that due runs are sent with one producer per batch."""
+        celery_app = Mock()
+        celery_app.producer_or_acquire.side_effect = lambda: nullcontext(Mock())
+        scheduler = DistributedScheduler(
+            Mock(), [hourly_job], instance_id="a", batch_size=2, celery_app=celery_app
+        )
+
+        sent = scheduler.dispatch([(hourly_job, 100.0, 0)] * 3 + [(hourly_job, 200.0, 4)])
+
+        assert sent == 4
+        assert celery_app.producer_or_acquire.call_count == 2
+        last_kwargs = celery_app.send_task.call_args.kwargs["kwargs"]
+        assert last_kwargs == {"scheduled_time": 200.0, "missed_runs": 4}
+
+
+class TestCoordination:
+    """Test run collection and claiming against Redis."""
+
+    def test_collect_due_tracks_next_run(self, redis_client, hourly_job):
+        """The first tick only schedules; a late tick coalesces the missed windows."""
+        scheduler = DistributedScheduler(redis_client, [hourly_job], instance_id="a")
+
+        assert scheduler.collect_due(1000.0) == []
+        assert float(redis_client.hget(NEXT_RUN_KEY, hourly_job.id)) == 4600.0
+
+        due = scheduler.collect_due(4600.0 + 2 * 3600 + 5)
+        assert due == [(hourly_job, 4600.0 + 2 * 3600, 2)]
+        assert float(redis_client.hget(NEXT_RUN_KEY, hourly_job.id)) == 4600.0 + 3 * 3600
+
+    def test_run_is_claimed_once_across_schedulers(self, redis_client, hourly_job):
+        """Two instances that both believe they own a job dispatch its run once."""
+        first = DistributedScheduler(redis_client, [hourly_job], instance_id="a")
+        second = DistributedScheduler(redis_client, [hourly_job], instance_id="b", heartbeat_ttl=1)
+        redis_client.hset(NEXT_RUN_KEY, hourly_job.id, "4600.0")
+
+        assert first.collect_due(4601.0) == [(hourly_job, 4600.0, 0)]
+        # The second instance read the schedule before the first one's update
+        # and no longer sees the first in its membership view.
+        redis_client.hset(NEXT_RUN_KEY, hourly_job.id, "4600.0")
+        assert second.owned_jobs(second.heartbeat(4603.0)) == [hourly_job]
+        assert second.collect_due(4603.0) == []
+
+    def test_failed_publish_is_retried_next_tick(self, redis_client, hourly_job):
+        """A run that could not be published is released instead of dropped."""
+        scheduler = DistributedScheduler(
+            redis_client, [hourly_job], instance_id="a", celery_app=failing_celery_app()
+        )
+        redis_client.hset(NEXT_RUN_KEY, hourly_job.id, "4600.0")
+
+        with pytest.raises(ConnectionError):
+            scheduler.tick(4601.0)
+
+        assert scheduler.collect_due(4602.0) == [(hourly_job, 4600.0, 0)]
+
+    def test_broker_errors_do_not_stop_the_loop(self, redis_client, hourly_job):
+        """run_forever keeps ticking through errors other than Redis ones."""
+        scheduler = DistributedScheduler(
+            redis_client, [hourly_job], instance_id="a", tick_interval=0
+        )
+        ticks = []
+
+        def tick():
+            ticks.append(1)
+            if len(ticks) == 1:
+                raise ConnectionError("broker unreachable")
+            scheduler.stop()
+            return 0
+
+        scheduler.tick = tick
+        scheduler.run_forever()
+
+        assert len(ticks) == 2
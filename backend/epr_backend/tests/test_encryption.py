@@ -0,0 +1,185 @@
+import os
+
+import pytest
+from sqlalchemy import Column, MetaData, String, Table, create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.security.encryption import (
+    DataKeyCache,
+    EncryptionError,
+    EnvelopeEncryptor,
+    InMemoryDataKeyStore,
+    SQLDataKeyStore,
+    organization_data_keys,
+    reencrypt_table,
+    rotate_organization_key_task,
+    token_key_version,
+)
+from app.services.task_queues import QUEUE_BULK, route_task
+
+
+@pytest.fixture
+def encryptor():
+    """Create an encryptor backed by an in-memory key store."""
+    return EnvelopeEncryptor(os.urandom(32), store=InMemoryDataKeyStore())
+
+
+class TestEnvelopeEncryption:
+    """Test envelope encryption with per-organization data keys."""
+
+    def test_round_trip(self, encryptor):
+        """Test that encrypted values decrypt to the original plaintext."""
+        token = encryptor.encrypt("sensitive information", "org-1")
+
+        assert token != "sensitive information"
+        assert encryptor.decrypt(token, "org-1") == "sensitive information"
+
+    def test_batch_round_trip_preserves_order_and_nulls(self, encryptor):
+        """Test encrypt_many/decrypt_many on a batch containing NULLs."""
+        values = ["a", None, "b" * 1000, ""]
+        tokens = encryptor.encrypt_many(values, "org-1")
+
+        assert tokens[1] is None
+        assert encryptor.decrypt_many(tokens, "org-1") == values
+
+    def test_tokens_are_bound_to_organization(self, encryptor):
+        """Test that a token cannot be decrypted under another organization."""
+        token = encryptor.encrypt("secret", "org-1")
+        encryptor.encrypt("other", "org-2")
+
+        with pytest.raises(EncryptionError):
+            encryptor.decrypt(token, "org-2")
+
+    def test_data_key_unwrapped_once_per_ttl(self, encryptor):
+        """Test that bulk operations reuse the cached data key."""
+        encryptor.encrypt("warm", "org-1")
+        encryptor.cache.clear()
+        encryptor.cache.hits = encryptor.cache.misses = 0
+
+        encryptor.decrypt_many(encryptor.encrypt_many(["x"] * 500, "org-1"), "org-1")
+
+        assert encryptor.cache.misses == 1
+
+    def test_cache_is_bounded(self):
+        """Test that the data key cache evicts least recently used keys."""
+        cache = DataKeyCache(max_entries=2, ttl=60)
+        encryptor = EnvelopeEncryptor(os.urandom(32), cache=cache)
+        for org in ("org-1", "org-2", "org-3"):
+            encryptor.encrypt("value", org)
+
+        assert cache.get(("org-1", 1)) is None
+        assert cache.get(("org-3", 1)) is not None
+
+    def test_rotation_keeps_old_tokens_readable(self, encryptor):
+        """Test that rotating a key does not break existing ciphertexts."""
+        old_token = encryptor.encrypt("value", "org-1")
+        assert encryptor.rotate_key("org-1") == 2
+
+        new_token = encryptor.encrypt("value", "org-1")
+
+        assert token_key_version(new_token) == 2
+        assert encryptor.decrypt(old_token, "org-1") == "value"
+
+
+class LaggingKeyStore(SQLDataKeyStore):
+    """Answers ``get_active`` from ``stale`` first, like a worker that read before another wrote."""
+
+    def __init__(self, session_factory, stale):
+        super().__init__(session_factory)
+        self.stale = list(stale)
+
+    def get_active(self, organization_id):
+        if self.stale:
+            return self.stale.pop(0)
+        return super().get_active(organization_id)
+
+
+@pytest.fixture
+def key_sessions():
+    """Create a database holding the organization_data_keys table."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    organization_data_keys.create(engine)
+    return sessionmaker(engine)
+
+
+class TestSQLDataKeyStore:
+    """Test the persisted key store shared by several worker processes."""
+
+    def test_active_version_is_cached(self, key_sessions):
+        """Repeated encryption looks up the active key version once per TTL."""
+        encryptor = EnvelopeEncryptor(os.urandom(32), store=SQLDataKeyStore(key_sessions))
+        encryptor.encrypt("warm", "org-1")
+        statements = []
+        event.listen(key_sessions.kw["bind"], "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        for _ in range(20):
+            encryptor.encrypt("value", "org-1")
+
+        assert statements == []
+
+    def test_first_key_race_reuses_winner(self, key_sessions):
+        """A worker that loses the race to create version 1 adopts the stored key."""
+        master = os.urandom(32)
+        first = EnvelopeEncryptor(master, store=SQLDataKeyStore(key_sessions))
+        second = EnvelopeEncryptor(master, store=LaggingKeyStore(key_sessions, [None, None]))
+        first.encrypt("a", "org-1")
+
+        token = second.encrypt("b", "org-1")
+
+        assert token_key_version(token) == 1
+        assert first.decrypt(token, "org-1") == "b"
+
+    def test_concurrent_rotation_creates_one_version(self, key_sessions):
+        """Two workers rotating at once end up on the same new version."""
+        master = os.urandom(32)
+        first = EnvelopeEncryptor(master, store=SQLDataKeyStore(key_sessions))
+        first.encrypt("a", "org-1")
+        stale = first.store.get_active("org-1")
+        second = EnvelopeEncryptor(master, store=LaggingKeyStore(key_sessions, [stale]))
+
+        assert first.rotate_key("org-1") == 2
+        assert second.rotate_key("org-1") == 2
+        assert first.decrypt(second.encrypt("b", "org-1"), "org-1") == "b"
+
+
+class TestKeyRotationJob:
+    """Test chunked re-encryption of stored rows."""
+
+    def test_reencrypt_table_in_chunks(self, encryptor):
+        """Test that every row moves to the active key version."""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        table = Table(
+            "encrypted_contacts",
+            MetaData(),
+            Column("id", String, primary_key=True),
+            Column("organization_id", String),
+            Column("phone", String),
+        )
+        table.metadata.create_all(engine)
+
+        with Session(engine) as session:
+            tokens = encryptor.encrypt_many([f"+1555{i:04d}" for i in range(25)], "org-1")
+            session.execute(
+                table.insert(),
+                [
+                    {"id": f"c-{i:03d}", "organization_id": "org-1", "phone": token}
+                    for i, token in enumerate(tokens)
+                ],
+            )
+            session.commit()
+
+            encryptor.rotate_key("org-1")
+            rewritten = reencrypt_table(
+                session, table, ["phone"], "org-1", chunk_size=10, encryptor=encryptor
+            )
+            phones = session.execute(table.select().order_by(table.c.id)).all()
+
+        assert rewritten == 25
+        assert all(token_key_version(row.phone) == 2 for row in phones)
+        assert encryptor.decrypt(phones[3].phone, "org-1") == "+15550003"
+
+    def test_rotation_is_a_bulk_task(self):
+        """The rotation job is a registered Celery task routed to the bulk queue."""
+        assert rotate_organization_key_task.name == "encryption.rotate_organization_key"
+        assert route_task(rotate_organization_key_task.name)["queue"] == QUEUE_BULK
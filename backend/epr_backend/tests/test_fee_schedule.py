@@ -0,0 +1,121 @@
+import pytest
+
+from app.services.fee_schedule import DEFAULT_SCHEDULE, compile_schedule
+
+SCHEDULE = {
+    "materials": {"plastic": "Plastic", "film": "Plastic", "glass": "Glass"},
+    "jurisdictions": {
+        "US-CA": {
+            "rates": [
+                {"category": "Plastic", "effective_from": "2024-01-01", "tiers": [[0, 0.50], [1000, 0.30]]},
+                {"category": "Glass", "effective_from": "2024-01-01", "tiers": [[0, 0.10]]},
+                {"material": "film", "effective_from": "2025-01-01", "tiers": [[0, 0.80]]},
+            ],
+            "modulation": [
+                {"class": "recyclable", "factor": 0.8, "effective_from": "2024-01-01"},
+                {"class": "hard_to_recycle", "factor": 1.5, "category": "Plastic",
+                 "effective_from": "2024-04-01", "effective_to": "2024-10-01"},
+            ],
+            "minimum_fee": [{"amount": 100, "effective_from": "2024-07-01"}],
+        },
+        "US-OR": {
+            "rates": [
+                {"category": "Plastic", "effective_from": "2024-01-01", "tiers": [[0, 0.20]]},
+                {"category": "Plastic", "effective_from": "2024-05-15", "tiers": [[0, 0.25]]},
+            ],
+        },
+    },
+}
+
+
+@pytest.fixture
+def schedule():
+    """Compile the two-jurisdiction test schedule."""
+    return compile_schedule(SCHEDULE, horizon_years=1)
+
+
+class TestCompileSchedule:
+    """Test resolution of declarative rules into lookup tables."""
+
+    def test_tiers_are_marginal(self, schedule):
+        """Kg above a tier bound pays the next band's rate only on the excess."""
+        assert schedule.fee("US-CA", "plastic", "2024-Q1", 500) == pytest.approx(250)
+        assert schedule.fee("US-CA", "plastic", "2024-Q1", 1500) == pytest.approx(500 + 150)
+
+    def test_effective_dates_and_specificity(self, schedule):
+        """Newer rules take over at the next quarter start and material rules beat categories."""
+        assert schedule.fee("US-CA", "film", "2024-Q4", 100) == pytest.approx(50)
+        assert schedule.fee("US-CA", "film", "Q1-2025", 100) == pytest.approx(80)
+        assert schedule.fee("US-CA", "plastic", "2025-Q1", 100) == pytest.approx(50)
+        # A mid-quarter start applies from the following quarter.
+        assert schedule.fee("US-OR", "plastic", "2024-Q2", 100) == pytest.approx(20)
+        assert schedule.fee("US-OR", "plastic", "2024-Q3", 100) == pytest.approx(25)
+        # Later periods reuse the last compiled quarter; earlier ones are refused.
+        assert schedule.fee("US-OR", "plastic", "2040-Q1", 100) == pytest.approx(25)
+        with pytest.raises(ValueError):
+            schedule.fee("US-OR", "plastic", "2023-Q4", 100)
+
+    def test_modulation_windows(self, schedule):
+        """Bonuses and maluses scale fees only in their class, scope and dates."""
+        assert schedule.fee("US-CA", "glass", "2024-Q1", 100, "recyclable") == pytest.approx(8)
+        assert schedule.fee("US-CA", "plastic", "2024-Q3", 100, "hard_to_recycle") == pytest.approx(75)
+        assert schedule.fee("US-CA", "plastic", "2024-Q4", 100, "hard_to_recycle") == pytest.approx(50)
+        assert schedule.fee("US-CA", "glass", "2024-Q3", 100, "hard_to_recycle") == pytest.approx(10)
+        assert schedule.fee("US-OR", "glass", "2024-Q3", 100) == 0.0
+
+    def test_invalid_schedules_are_rejected(self):
+        """Bad tiers, unknown targets and inverted dates fail at compile time."""
+        for rule in (
+            {"category": "Plastic", "effective_from": "2024-01-01", "tiers": [[10, 0.5]]},
+            {"category": "Plastic", "effective_from": "2024-01-01", "tiers": [[0, 0.5], [0, 0.4]]},
+            {"category": "Metal", "effective_from": "2024-01-01", "tiers": [[0, 0.5]]},
+            {"category": "Plastic", "effective_from": "2024-04-01", "effective_to": "2024-01-01",
+             "tiers": [[0, 0.5]]},
+        ):
+            broken = {"materials": SCHEDULE["materials"], "jurisdictions": {"X": {"rates": [rule]}}}
+            with pytest.raises(ValueError):
+                compile_schedule(broken)
+
+
+class TestCalculate:
+    """Test batch evaluation over prepared products."""
+
+    def test_producer_totals_drive_tiers(self, schedule):
+        """Tiers apply to the producer's total kg; products share the average rate."""
+        lines = schedule.prepare([
+            {"weight": 1000, "material_composition": '{"plastic": 100}'},
+            {"weight": 1000, "material_composition": {"plastic": 50, "glass": 50}},
+            {"weight": 10, "material_composition": {"paper": 100}},
+        ])
+        fees = schedule.calculate(lines, "US-CA", "2024-Q1")
+
+        plastic = 1000 * 0.50 + 500 * 0.30
+        assert fees.by_material == pytest.approx({"plastic": plastic, "glass": 50})
+        assert fees.product_fees == pytest.approx([plastic / 1.5, plastic / 3 + 50, 0])
+        assert fees.total == pytest.approx(sum(fees.product_fees))
+        assert lines.uncovered_kg == pytest.approx(10)
+
+    def test_modulation_and_minimum_fee(self, schedule):
+        """Modulated lines pay their factor and small producers are topped up to the minimum."""
+        lines = schedule.prepare([
+            {"weight": 100, "material_composition": {"glass": 100}, "eco_modulation": "recyclable"},
+            {"weight": 100, "material_composition": {"glass": 100}},
+        ])
+        early = schedule.calculate(lines, "US-CA", "2024-Q2")
+        late = schedule.calculate(lines, "US-CA", "2024-Q3")
+
+        assert early.product_fees == pytest.approx([8, 10])
+        assert (early.total, early.minimum_top_up) == pytest.approx((18, 0))
+        assert (late.total, late.minimum_top_up) == pytest.approx((100, 82))
+
+    def test_unknown_modulation_class_is_rejected(self, schedule):
+        """A typo in eco_modulation fails with a message naming the valid classes."""
+        with pytest.raises(ValueError, match="recyclable"):
+            schedule.prepare([{"weight": 1, "material_composition": {"glass": 100}, "eco_modulation": "green"}])
+
+    def test_default_schedule_matches_catalogue_rates(self):
+        """The bundled schedule reproduces the flat per-kg material rates."""
+        schedule = compile_schedule(DEFAULT_SCHEDULE)
+        lines = schedule.prepare([{"weight": 2.5, "material_composition": {"plastic": 70, "metal": 30}}])
+        fees = schedule.calculate(lines, "DEFAULT", "Q1-2024")
+        assert fees.total == pytest.approx(2.5 * 0.7 * 0.45 + 2.5 * 0.3 * 0.09)
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from app.middleware.health import HealthCheckMiddleware
+from app.services.health import STATUS_DOWN, STATUS_UP, HealthMonitor
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def downstream(stub_app):
+    """Stand-in for the rest of the middleware stack."""
+    return stub_app(status=418, body=b"downstream")
+
+
+@pytest.fixture
+def make_client(downstream, asgi_client):
+    """Build a client for the health middleware in front of ``downstream``."""
+    return lambda monitor: asgi_client(HealthCheckMiddleware(downstream, monitor))
+
+
+class TestHealthMonitor:
+    """Test cached dependency probing."""
+
+    async def test_probe_results_are_cached(self):
+        """Test that readiness does not re-run probes."""
+        calls = []
+
+        async def probe():
+            calls.append(1)
+
+        monitor = HealthMonitor(interval=60)
+        monitor.register("database", probe)
+        await monitor.probe_all()
+
+        for _ in range(100):
+            report = monitor.readiness()
+
+        assert len(calls) == 1
+        assert report["status"] == "ready"
+        assert report["dependencies"]["database"]["status"] == STATUS_UP
+        assert report["dependencies"]["database"]["latency_ms"] is not None
+
+    async def test_critical_failure_is_not_ready(self):
+        """Test that a failing critical dependency fails readiness."""
+        async def failing():
+            raise ConnectionError("refused")
+
+        monitor = HealthMonitor()
+        monitor.register("database", failing)
+        await monitor.probe_all()
+
+        report = monitor.readiness()
+        assert report["status"] == "not_ready"
+        assert "refused" in report["dependencies"]["database"]["error"]
+
+    async def test_non_critical_failure_is_degraded(self):
+        """Test that optional dependencies only degrade readiness."""
+        async def ok():
+            pass
+
+        async def slow():
+            await asyncio.sleep(1)
+
+        monitor = HealthMonitor()
+        monitor.register("database", ok)
+        monitor.register("scheduler", slow, critical=False, timeout=0.01)
+        await monitor.probe_all()
+
+        report = monitor.readiness()
+        assert report["status"] == "ready"
+        assert report["degraded"] == ["scheduler"]
+        assert report["dependencies"]["scheduler"]["status"] == STATUS_DOWN
+
+    async def test_stale_results_fail_readiness(self):
+        """Test that results older than the staleness bound are not trusted."""
+        async def ok():
+            pass
+
+        monitor = HealthMonitor(staleness=10)
+        monitor.register("database", ok)
+        await monitor.probe_all()
+        monitor.probes["database"].result.checked_at -= 60
+
+        assert monitor.readiness()["status"] == "not_ready"
+
+    async def test_closed_gate_blocks_readiness(self):
+        """Test that startup gates hold readiness until opened."""
+        monitor = HealthMonitor()
+        monitor.set_gate("warmup", False)
+        assert monitor.readiness()["status"] == "not_ready"
+
+        monitor.set_gate("warmup", True)
+        assert monitor.readiness()["status"] == "ready"
+
+
+class TestHealthCheckMiddleware:
+    """Test health endpoints served ahead of the application."""
+
+    async def test_liveness_bypasses_application(self, make_client, downstream):
+        """Test that /healthz never reaches downstream middleware."""
+        async with make_client(HealthMonitor()) as client:
+            response = await client.get("/healthz")
+
+        assert downstream.calls == []
+        assert response.status_code == 200
+        assert response.json()["status"] == "healthy"
+        assert "EPR Co-Pilot Backend is running" in response.json()["message"]
+
+    async def test_readiness_reports_503_when_not_ready(self, make_client):
+        """Test that an unready service answers 503 from the cache."""
+        async def failing():
+            raise ConnectionError("refused")
+
+        monitor = HealthMonitor()
+        monitor.register("database", failing)
+        await monitor.probe_all()
+
+        async with make_client(monitor) as client:
+            response = await client.get("/readiness")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "not_ready"
+
+    async def test_other_paths_pass_through(self, make_client):
+        """Test that normal requests reach the application."""
+        async with make_client(HealthMonitor()) as client:
+            response = await client.get("/api/products/")
+
+        assert response.status_code == 418
@@ -0,0 +1,240 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+
+from app.middleware.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+@pytest.fixture
+def redis_client():
+    """Create an in-process Redis with Lua scripting."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeStrictRedis(decode_responses=True)
+
+
+class BrokenRedis:
+    def set(self, *args, **kwargs):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture
+def make_app(stub_app):
+    """Build a create endpoint whose response names the call that produced it."""
+    def make(status=201, delay=0.0):
+        return stub_app(
+            status=status,
+            delay=delay,
+            headers=[(b"content-type", b"application/json")],
+            body=lambda app: json.dumps({"id": f"product-{len(app.calls)}"}).encode(),
+        )
+
+    return make
+
+
+@pytest.fixture
+def make_client(asgi_client):
+    """Build a client for the idempotency middleware over ``redis``."""
+    def make(app, redis, **kwargs):
+        return asgi_client(
+            IdempotencyMiddleware(app, store=IdempotencyStore(client=redis), poll_interval=0.005, **kwargs)
+        )
+
+    return make
+
+
+HEADERS = {"Authorization": "Bearer token", "Idempotency-Key": "create-1"}
+
+
+def make_token(subject, secret="test-secret", issued=0):
+    def segment(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=")
+
+    signing_input = segment({"alg": "HS256", "typ": "JWT"}) + b"." + segment(
+        {"sub": subject, "iat": issued, "exp": int(time.time()) + 600}
+    )
+    signature = hmac.new(secret.encode(), signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + base64.urlsafe_b64encode(signature).rstrip(b"=")).decode()
+
+
+class TestIdempotencyMiddleware:
+    """Test replay of retried mutating requests."""
+
+    @pytest.mark.asyncio
+    async def test_retry_replays_stored_response(self, make_app, make_client, redis_client):
+        """The second request with the same key does not execute again."""
+        app = make_app()
+        async with make_client(app, redis_client) as client:
+            first = await client.post("/api/products/", json={"name": "Box"}, headers=HEADERS)
+            retry = await client.post("/api/products/", json={"name": "Box"}, headers=HEADERS)
+
+        assert app.bodies == [b'{"name":"Box"}']
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicate_waits_for_first(self, make_app, make_client, redis_client):
+        """A duplicate arriving mid-flight gets the first request's response."""
+        app = make_app(delay=0.05)
+        async with make_client(app, redis_client) as client:
+            first, second = await asyncio.gather(
+                client.post("/api/reports/generate", json={"type": "monthly"}, headers=HEADERS),
+                client.post("/api/reports/generate", json={"type": "monthly"}, headers=HEADERS),
+            )
+
+        assert len(app.calls) == 1
+        assert first.json() == second.json()
+
+    @pytest.mark.asyncio
+    async def test_duplicate_times_out_with_conflict(self, make_app, make_client, redis_client):
+        """A duplicate that outwaits wait_timeout is told to retry later."""
+        app = make_app(delay=0.1)
+        async with make_client(app, redis_client, wait_timeout=0.01) as client:
+            first, second = await asyncio.gather(
+                client.post("/api/products/", json={}, headers=HEADERS),
+                client.post("/api/products/", json={}, headers=HEADERS),
+            )
+
+        assert sorted([first.status_code, second.status_code]) == [201, 409]
+        assert len(app.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_key_reuse_with_different_body_is_rejected(self, make_app, make_client, redis_client):
+        """A key identifies one request; a different payload is an error."""
+        app = make_app()
+        async with make_client(app, redis_client) as client:
+            await client.post("/api/products/", json={"name": "Box"}, headers=HEADERS)
+            reused = await client.post("/api/products/", json={"name": "Crate"}, headers=HEADERS)
+
+        assert reused.status_code == 422
+        assert len(app.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_keys_are_scoped_to_the_caller(self, make_app, make_client, redis_client):
+        """Another caller using the same key executes its own request."""
+        app = make_app()
+        async with make_client(app, redis_client) as client:
+            await client.post("/api/products/", json={}, headers=HEADERS)
+            other = await client.post("/api/products/", json={}, headers={**HEADERS, "Authorization": "Bearer other"})
+
+        assert other.status_code == 201
+        assert len(app.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_refreshed_token_keeps_the_callers_records(
+        self, make_app, make_client, redis_client, monkeypatch
+    ):
+        """A retry after a token refresh replays; a forged or foreign subject does not."""
+        monkeypatch.setenv("SECRET_KEY", "test-secret")
+        app = make_app()
+
+        def headers(token):
+            return {**HEADERS, "Authorization": f"Bearer {token}"}
+
+        async with make_client(app, redis_client) as client:
+            first = await client.post("/api/products/", json={}, headers=headers(make_token("a@example.com")))
+            refreshed = await client.post(
+                "/api/products/", json={}, headers=headers(make_token("a@example.com", issued=1))
+            )
+            forged = await client.post(
+                "/api/products/", json={}, headers=headers(make_token("a@example.com", secret="guess"))
+            )
+            other = await client.post("/api/products/", json={}, headers=headers(make_token("b@example.com")))
+
+        assert refreshed.headers["idempotent-replayed"] == "true"
+        assert refreshed.json() == first.json()
+        assert "idempotent-replayed" not in forged.headers
+        assert "idempotent-replayed" not in other.headers
+        assert len(app.calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_server_errors_are_not_stored(self, make_app, make_client, redis_client):
+        """A 5xx releases the key so the retry runs again."""
+        app = make_app(status=503)
+        async with make_client(app, redis_client) as client:
+            await client.post("/api/products/", json={}, headers=HEADERS)
+            await client.post("/api/products/", json={}, headers=HEADERS)
+
+        assert len(app.calls) == 2
+        assert redis_client.keys() == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status", [401, 429])
+    async def test_retryable_client_errors_are_not_stored(self, make_app, make_client, redis_client, status):
+        """An auth or rate-limit rejection does not hold the key; the retry runs the handler."""
+        app = make_app(status=status)
+        async with make_client(app, redis_client) as client:
+            first = await client.post("/api/products/", json={}, headers=HEADERS)
+            retry = await client.post("/api/products/", json={}, headers=HEADERS)
+
+        assert first.status_code == retry.status_code == status
+        assert "idempotent-replayed" not in retry.headers
+        assert len(app.calls) == 2
+        assert redis_client.keys() == []
+
+    @pytest.mark.asyncio
+    async def test_final_client_errors_are_replayed(self, make_app, make_client, redis_client):
+        """A validation error is the request's outcome and is replayed."""
+        app = make_app(status=422)
+        async with make_client(app, redis_client) as client:
+            await client.post("/api/products/", json={}, headers=HEADERS)
+            retry = await client.post("/api/products/", json={}, headers=HEADERS)
+
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert len(app.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_passthrough_cases(self, make_app, make_client, redis_client):
+        """Requests without a key, other paths and an unavailable store execute normally."""
+        app = make_app()
+        async with make_client(app, redis_client) as client:
+            await client.post("/api/products/", json={})
+            await client.post("/api/auth/login", json={}, headers=HEADERS)
+            invalid = await client.post("/api/products/", json={}, headers={"Idempotency-Key": "x" * 300})
+        async with make_client(app, BrokenRedis()) as client:
+            degraded = await client.post("/api/products/", json={}, headers=HEADERS)
+
+        assert invalid.status_code == 400
+        assert degraded.status_code == 201
+        assert len(app.calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_oversized_response_is_not_executed_twice(self, make_app, make_client, redis_client):
+        """A response too large to store still records the outcome for the retry."""
+        app = make_app()
+        async with make_client(app, redis_client, max_body_size=4) as client:
+            first = await client.post("/api/products/", json={"name": "Box"}, headers=HEADERS)
+            retry = await client.post("/api/products/", json={"name": "Box"}, headers=HEADERS)
+
+        assert len(app.calls) == 1
+        assert first.json() == {"id": "product-1"}
+        assert retry.status_code == 201
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "too large" in retry.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_slow_request_keeps_its_claim(self, make_app, asgi_client, redis_client):
+        """The claim is renewed past lock_ttl, and a lapsed owner cannot clobber a newer record."""
+        app = make_app(delay=1.5)
+        store = IdempotencyStore(client=redis_client, lock_ttl=1)
+        async with asgi_client(IdempotencyMiddleware(app, store=store, wait_timeout=0.0)) as client:
+            slow = asyncio.ensure_future(client.post("/api/products/", json={}, headers=HEADERS))
+            await asyncio.sleep(1.2)
+            duplicate = await client.post("/api/products/", json={}, headers=HEADERS)
+            assert (await slow).status_code == 201
+
+        assert duplicate.status_code == 409
+        assert len(app.calls) == 1
+
+        lock, _ = store.claim("idem:other", "fp")
+        redis_client.set("idem:other", json.dumps({"state": "in_progress", "fingerprint": "fp", "owner": "b"}))
+        assert not store.complete("idem:other", lock, "fp", 201, [], b"{}")
+        store.release("idem:other", lock)
+        assert json.loads(redis_client.get("idem:other"))["owner"] == "b"
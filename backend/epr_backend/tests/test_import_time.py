@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Modules every API worker imports at boot.
+API_MODULES = [
+    "app.db_routing",
+    "app.middleware.admission",
+    "app.middleware.compression",
+    "app.middleware.conditional_get",
+    "app.middleware.health",
+    "app.middleware.idempotency",
+    "app.middleware.metrics",
+    "app.middleware.query_count",
+    "app.routers.dashboard",
+    "app.routers.jobs",
+    "app.services.compliance_summary",
+    "app.services.distributed_scheduler",
+    "app.services.fee_schedule",
+    "app.services.job_status",
+    "app.services.outbound",
+    "app.services.reminder_planner",
+    "app.services.resource_versions",
+    "app.services.sdk_clients",
+    "app.services.single_flight",
+    "app.services.task_queues",
+    "app.services.warmup",
+]
+
+# Packages that must only load on first use, never during API start-up.
+LAZY_PACKAGES = {"apscheduler", "boto3", "botocore", "celery", "kombu", "redis", "sendgrid", "stripe", "twilio"}
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "2500"))
+
+
+def import_profile(modules) -> Tuple[Dict[str, int], float]:
+    """Import ``modules`` in a fresh interpreter; return per-module cumulative µs and the total in ms."""
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(BACKEND_DIR), os.getenv("PYTHONPATH")]))},
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    cumulative: Dict[str, int] = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        if not total.strip().isdigit():
+            continue  # column header
+        cumulative[name.strip()] = int(total)
+        if not name.startswith("  "):
+            # Unindented entries are top-level imports; together they cover everything.
+            total_us += int(total)
+    return cumulative, total_us / 1000
+
+
+class TestImportTime:
+    """Guard API worker start-up against eager SDK imports."""
+
+    def test_heavy_sdks_are_not_imported_at_startup(self):
+        """Celery, Redis and provider SDKs load on first use, not at import."""
+        cumulative, _ = import_profile(API_MODULES)
+        eager = sorted({name.split(".")[0] for name in cumulative} & LAZY_PACKAGES)
+        assert eager == [], f"imported at start-up: {eager}"
+
+    def test_startup_import_budget(self):
+        """Importing the API modules stays within the start-up budget."""
+        _, total_ms = import_profile(API_MODULES)
+        assert total_ms < IMPORT_BUDGET_MS, f"imports took {total_ms:.0f}ms (budget {IMPORT_BUDGET_MS:.0f}ms)"
+
+    def test_declared_tasks_bind_to_celery_in_workers(self):
+        """Deferred task declarations register under their names when a worker configures Celery."""
+        celery = pytest.importorskip("celery")
+        from app.services.job_status import reconcile_job_statuses
+        from app.services.task_queues import configure_celery
+
+        app = celery.Celery("test", set_as_current=False)
+        configure_celery(app)
+
+        assert "jobs.reconcile_job_statuses" in app.tasks
+        assert app.tasks["jobs.reconcile_job_statuses"].run is reconcile_job_statuses.fn
@@ -0,0 +1,140 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, Organization, Report
+from app.services.compliance_summary import get_summary, period_of
+from app.services.job_status import (
+    STATE_COMPLETED,
+    STATE_FAILED,
+    STATE_RUNNING,
+    JobProgress,
+    JobStatusStore,
+    reconcile_terminal_states,
+    report_errors,
+)
+from app.services.resource_versions import get_version
+
+
+class TestJobProgress:
+    """Test batched progress updates."""
+
+    def test_updates_are_batched(self):
+        """Test that progress is written per percent, not per row."""
+        store = Mock()
+        progress = JobProgress("job-1", total=100_000, store=store)
+
+        progress.start()
+        for _ in range(100_000):
+            progress.advance()
+        progress.complete()
+
+        assert store.set.call_count <= 102
+        assert store.set.call_args.args == ("job-1", STATE_COMPLETED, 100)
+
+    def test_percent_never_reports_complete_before_complete(self):
+        """Test that 100% is only written by complete()."""
+        store = Mock()
+        progress = JobProgress("job-1", total=10, store=store)
+
+        progress.advance(10)
+
+        assert store.set.call_args.args == ("job-1", STATE_RUNNING, 99)
+
+    def test_failure_keeps_last_percent(self):
+        """Test that failures record the error and last known progress."""
+        store = Mock()
+        progress = JobProgress("job-1", total=4, store=store)
+        progress.advance(2)
+
+        progress.fail("Upstream timeout")
+
+        store.set.assert_called_with("job-1", STATE_FAILED, 50, error="Upstream timeout")
+
+
+class TestReconciler:
+    """Test persistence of terminal states to the reports table."""
+
+    def test_terminal_states_are_persisted(self):
+        """Test that completed and failed jobs update their report rows."""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as session:
+            session.add(Organization(id="org-1", name="Org", created_at=datetime(2024, 1, 1)))
+            for report_id in ("r-1", "r-2", "r-3"):
+                session.add(Report(id=report_id, title=report_id, status="pending",
+                                   organization_id="org-1"))
+            session.commit()
+
+            store = Mock()
+            store.pending_terminal.side_effect = [
+                {"r-1": {"state": STATE_COMPLETED}, "r-2": {"state": STATE_FAILED}},
+                {},
+            ]
+            store.get_many.return_value = {
+                "r-1": {"state": STATE_COMPLETED, "percent": 100},
+                "r-2": {"state": STATE_FAILED, "percent": 40},
+            }
+
+            persisted = reconcile_terminal_states(session, store, batch_size=2)
+            statuses = dict(session.query(Report.id, Report.status).all())
+            versions = {key: get_version(session.connection(), f"reports:{key}")[0] for key in statuses}
+
+        assert persisted == 2
+        assert statuses == {"r-1": STATE_COMPLETED, "r-2": STATE_FAILED, "r-3": "pending"}
+        store.ack_terminal.assert_called_once_with(["r-1", "r-2"])
+        # The Core update bumps the report ETags that ORM writes would have.
+        assert versions == {"r-1": 2, "r-2": 2, "r-3": 1}
+
+    def test_summaries_follow_reconciled_states(self):
+        """Test that the dashboard summary reflects a report finished by the reconciler."""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        start = datetime(2024, 4, 1)
+        with Session(engine) as session:
+            session.add(Organization(id="org-1", name="Org", created_at=datetime(2024, 1, 1)))
+            session.add(Report(id="r-1", title="r-1", status="processing", start_date=start,
+                               end_date=start, total_fee=25.0, organization_id="org-1"))
+            session.commit()
+            before = get_summary(session, "org-1", period_of(start))
+
+            store = Mock()
+            store.pending_terminal.side_effect = [{"r-1": {"state": STATE_COMPLETED}}, {}]
+            store.get_many.return_value = {"r-1": {"state": STATE_COMPLETED, "kind": "report"}}
+            reconcile_terminal_states(session, store)
+            after = get_summary(session, "org-1", period_of(start))
+
+        assert (before["reports_pending"], before["reports_completed"]) == (1, 0)
+        assert (after["reports_pending"], after["reports_completed"]) == (0, 1)
+        assert after["fees_due"] == 25.0
+
+    def test_states_survive_status_expiry(self):
+        """Test that states and errors are persisted after the status hash expired."""
+        fakeredis = pytest.importorskip("fakeredis")
+        store = JobStatusStore(fakeredis.FakeStrictRedis())
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as session:
+            session.add(Organization(id="org-1", name="Org", created_at=datetime(2024, 1, 1)))
+            for report_id in ("r-1", "r-2"):
+                session.add(Report(id=report_id, title=report_id, status="pending",
+                                   organization_id="org-1"))
+            session.commit()
+
+            store.create("r-1", "org-1")
+            store.set("r-1", STATE_FAILED, 40, error="S3 upload failed")
+            store.set("r-2", STATE_COMPLETED, 100)
+            store.client.delete("job:r-1", "job:r-2")  # reconciler was down past TERMINAL_TTL
+
+            persisted = reconcile_terminal_states(session, store)
+            statuses = dict(session.query(Report.id, Report.status).all())
+            errors = session.execute(report_errors.select()).all()
+
+        assert persisted == 2
+        assert statuses == {"r-1": STATE_FAILED, "r-2": STATE_COMPLETED}
+        assert [(row.report_id, row.error) for row in errors] == [("r-1", "S3 upload failed")]
+        assert store.pending_terminal(10) == {}
@@ -0,0 +1,117 @@
+import threading
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.middleware.metrics import PrometheusMiddleware
+from app.services import query_stats
+from app.services.metrics import Histogram, Registry, http_request_duration
+from app.services.redis_client import get_redis
+
+
+class TestHistogram:
+    """Test histogram recording and exposition."""
+
+    def test_observations_land_in_cumulative_buckets(self):
+        """Test Prometheus bucket semantics (le is inclusive)."""
+        histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, ("/api/products/",))
+
+        lines = list(histogram.collect())
+
+        assert 'latency_seconds_bucket{route="/api/products/",le="0.1"} 2' in lines
+        assert 'latency_seconds_bucket{route="/api/products/",le="1"} 3' in lines
+        assert 'latency_seconds_bucket{route="/api/products/",le="+Inf"} 4' in lines
+        assert 'latency_seconds_count{route="/api/products/"} 4' in lines
+
+    def test_registry_renders_help_and_type(self):
+        """Test that exposition includes metadata lines."""
+        registry = Registry()
+        registry.counter("jobs_total", "Jobs processed").inc()
+
+        rendered = registry.render()
+
+        assert "# TYPE jobs_total counter" in rendered
+        assert "jobs_total 1" in rendered
+
+
+class TestQueryStats:
+    """Test per-request SQL accounting."""
+
+    def test_queries_counted_only_inside_context(self):
+        """Test that statements are attributed to the active request."""
+        engine = create_engine("sqlite://")
+        query_stats.install_query_listeners(engine)
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            token = query_stats.begin()
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+            stats = query_stats.end(token)
+
+        assert stats.count == 2
+        assert stats.duration > 0
+        assert query_stats.current() is None
+
+
+class TestPrometheusMiddleware:
+    """Test the metrics ASGI middleware."""
+
+    @pytest.mark.asyncio
+    async def test_route_template_label_and_metrics_endpoint(self):
+        """Test that requests are labelled by template and exposed on /metrics."""
+        class Route:
+            path = "/api/reports/{report_id}"
+
+        async def app(scope, receive, send):
+            scope["route"] = Route
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        transport = httpx.ASGITransport(app=PrometheusMiddleware(app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/api/reports/abc")
+            await client.get("/api/reports/def")
+            response = await client.get("/metrics")
+
+        assert ("GET", "/api/reports/{report_id}", "200") in http_request_duration.series
+        assert response.status_code == 200
+        assert 'route="/api/reports/{report_id}"' in response.text
+        assert "/api/reports/abc" not in response.text
+
+    @pytest.mark.asyncio
+    async def test_metrics_are_rendered_off_the_event_loop(self):
+        """Test that scrape-time callbacks, which may block on Redis, run in a worker thread."""
+        threads = []
+        metrics = Registry()
+        metrics.gauge("probe", "Thread that sampled", (), lambda: threads.append(threading.current_thread()) or {})
+
+        async def app(scope, receive, send):
+            raise AssertionError("not reached")
+
+        transport = httpx.ASGITransport(app=PrometheusMiddleware(app, metrics_registry=metrics))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert threads and threads[0] is not threading.current_thread()
+
+
+class TestRedisClient:
+    """Test the shared Redis client settings."""
+
+    def test_commands_and_connects_time_out(self, monkeypatch):
+        """Test that a blackholed Redis cannot hang callers indefinitely."""
+        pytest.importorskip("redis")
+        monkeypatch.setenv("REDIS_SOCKET_TIMEOUT", "0.5")
+        get_redis.cache_clear()
+        try:
+            options = get_redis("redis://blackhole:6379").connection_pool.connection_kwargs
+        finally:
+            get_redis.cache_clear()
+
+        assert options["socket_timeout"] == 0.5
+        assert options["socket_connect_timeout"] == 1.0
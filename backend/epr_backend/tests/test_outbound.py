@@ -0,0 +1,145 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services.outbound import (
+    OutboundClients,
+    ProviderSettings,
+    outbound_connections,
+    outbound_lifespan,
+    run_with_clients,
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.hits.append(self.path)
+        status = server.statuses.pop(0) if server.statuses else 200
+        if self.path == "/slow":
+            time.sleep(0.5)
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.hits = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_clients(outbound_clients):
+    """Build clients for the ``stub`` provider served by ``server``."""
+    def make(server, **overrides):
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        return outbound_clients("stub", base_url, retry_backoff=0.01, **overrides)
+
+    return make
+
+
+class TestOutboundClients:
+    """Test pooled provider clients against a local HTTP stub."""
+
+    @pytest.mark.asyncio
+    async def test_connections_are_reused(self, make_clients, stub_server):
+        """Sequential calls share one keep-alive connection."""
+        clients = make_clients(stub_server)
+        before_new = outbound_connections.values.get(("stub", "new"), 0)
+        before_reused = outbound_connections.values.get(("stub", "reused"), 0)
+        async with outbound_lifespan(clients=clients):
+            for _ in range(5):
+                response = await clients.request("stub", "GET", "/ping")
+                assert response.status_code == 200
+
+        assert outbound_connections.values[("stub", "new")] - before_new == 1
+        assert outbound_connections.values[("stub", "reused")] - before_reused == 4
+
+    @pytest.mark.asyncio
+    async def test_retries_idempotent_requests(self, make_clients, stub_server):
+        """A 503 is retried with backoff for GET but not for a plain POST."""
+        stub_server.statuses = [503, 200]
+        clients = make_clients(stub_server)
+        async with outbound_lifespan(clients=clients):
+            response = await clients.request("stub", "GET", "/status")
+            assert response.status_code == 200
+            assert stub_server.hits == ["/status", "/status"]
+
+            stub_server.statuses = [503]
+            response = await clients.request("stub", "POST", "/send", json={})
+            assert response.status_code == 503
+            assert stub_server.hits.count("/send") == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_are_bounded(self, make_clients, stub_server):
+        """After ``max_retries`` the last failing response is returned."""
+        stub_server.statuses = [503, 503, 503, 503]
+        clients = make_clients(stub_server, max_retries=2)
+        async with outbound_lifespan(clients=clients):
+            response = await clients.request("stub", "GET", "/down")
+        assert response.status_code == 503
+        assert stub_server.hits == ["/down"] * 3
+
+    @pytest.mark.asyncio
+    async def test_per_provider_timeout(self, make_clients, stub_server):
+        """The provider's read timeout applies to its requests."""
+        clients = make_clients(stub_server, timeout=0.1, max_retries=0)
+        async with outbound_lifespan(clients=clients):
+            with pytest.raises(httpx.ReadTimeout):
+                await clients.request("stub", "GET", "/slow")
+
+    @pytest.mark.asyncio
+    async def test_clients_only_exist_during_lifespan(self, make_clients, stub_server):
+        """Using a provider outside the lifespan is an error, and shutdown closes the pool."""
+        clients = make_clients(stub_server)
+        with pytest.raises(RuntimeError):
+            clients.http("stub")
+        async with outbound_lifespan(clients=clients):
+            http = clients.http("stub")
+            assert not http.is_closed
+        assert http.is_closed
+        assert not clients.started
+
+    def test_sync_callers_share_one_pool(self, make_clients, stub_server):
+        """Separate synchronous calls, like Celery task runs, reuse the process pool."""
+        clients = make_clients(stub_server)
+        before_new = outbound_connections.values.get(("stub", "new"), 0)
+
+        for _ in range(3):
+            status = run_with_clients(
+                lambda c: c.request("stub", "GET", "/ping"), clients
+            ).status_code
+            assert status == 200
+
+        assert outbound_connections.values[("stub", "new")] - before_new == 1
+        run_with_clients(lambda c: c.aclose(), clients)
+
+    def test_env_overrides(self, monkeypatch):
+        """``OUTBOUND_<PROVIDER>_<SETTING>`` overrides the coded defaults."""
+        monkeypatch.setenv("OUTBOUND_STUB_TIMEOUT", "2.5")
+        monkeypatch.setenv("OUTBOUND_STUB_MAX_RETRIES", "0")
+        clients = OutboundClients({"stub": ProviderSettings("stub", "http://stub")})
+        assert clients.settings("stub").timeout == 2.5
+        assert clients.settings("stub").max_retries == 0
@@ -0,0 +1,72 @@
+import pytest
+
+from app.middleware.profiling import ProfilingMiddleware
+from app.services.profiling import TraceBuffer
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def make_app(stub_app):
+    """Build an endpoint that takes ``delay`` seconds to answer."""
+    return lambda delay: stub_app(delay=delay)
+
+
+class TestProfilingMiddleware:
+    """Test slow-request capture and opt-in profiling."""
+
+    async def test_fast_requests_are_not_stored(self, make_app, asgi_client):
+        """Test that requests under the threshold leave no trace."""
+        buffer = TraceBuffer()
+        middleware = ProfilingMiddleware(make_app(0), buffer, slow_threshold_ms=250, sample_rate=0)
+
+        async with asgi_client(middleware) as client:
+            await client.get("/api/products/")
+
+        assert buffer.list() == []
+
+    async def test_slow_requests_are_stored(self, make_app, asgi_client):
+        """Test that requests over the threshold are kept in the ring buffer."""
+        buffer = TraceBuffer()
+        middleware = ProfilingMiddleware(make_app(0.05), buffer, slow_threshold_ms=10, sample_rate=0)
+
+        async with asgi_client(middleware) as client:
+            await client.get("/api/fees/calculate")
+
+        (trace,) = buffer.list()
+        assert trace.reason == "slow"
+        assert trace.path == "/api/fees/calculate"
+        assert trace.duration_ms >= 10
+
+    async def test_profile_header_requires_admin_token(self, make_app, asgi_client, monkeypatch):
+        """Test that the profile header is ignored without a valid token."""
+        monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "s3cret")
+        buffer = TraceBuffer()
+        middleware = ProfilingMiddleware(make_app(0), buffer, slow_threshold_ms=1000, sample_rate=0)
+
+        async with asgi_client(middleware) as client:
+            denied = await client.get("/api/reports/", headers={
+                "X-Profile": "1", "X-Profile-Token": "wrong",
+            })
+            allowed = await client.get("/api/reports/", headers={
+                "X-Profile": "1", "X-Profile-Token": "s3cret",
+            })
+
+        assert "x-profile-id" not in denied.headers
+        assert "x-profile-id" in allowed.headers
+        (trace,) = buffer.list()
+        assert trace.reason == "requested"
+        assert trace.id == allowed.headers["x-profile-id"]
+
+    async def test_ring_buffer_is_bounded(self, make_app, asgi_client):
+        """Test that old traces are evicted."""
+        buffer = TraceBuffer(capacity=3)
+        middleware = ProfilingMiddleware(make_app(0), buffer, slow_threshold_ms=0, sample_rate=0)
+
+        async with asgi_client(middleware) as client:
+            for i in range(5):
+                await client.get(f"/api/products/{i}")
+
+        assert [t.path for t in buffer.list()] == [
+            "/api/products/4", "/api/products/3", "/api/products/2",
+        ]
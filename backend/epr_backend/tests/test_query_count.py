@@ -0,0 +1,101 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.middleware.query_count import QueryCountMiddleware
+from app.services import query_stats
+from app.services.query_stats import QueryCounter, repeated_shapes, statement_shape
+
+
+@pytest.fixture
+def make_app(stub_app):
+    """Build an endpoint that runs ``statements`` on ``engine`` before answering."""
+    def make(engine, statements):
+        def run(scope):
+            with engine.connect() as conn:
+                for statement in statements:
+                    conn.execute(text(statement))
+
+        return stub_app(body=b"[]", before=run)
+
+    return make
+
+
+class TestStatementShape:
+    """Test normalization of statements into shapes."""
+
+    def test_literals_and_placeholders_are_collapsed(self):
+        """Test that statements differing only in values share a shape."""
+        first = statement_shape("SELECT * FROM materials WHERE id = 5 AND name = 'PET'")
+        second = statement_shape("SELECT *  FROM materials\nWHERE id = 17 AND name = 'it''s'")
+
+        assert first == second == "SELECT * FROM materials WHERE id = ? AND name = ?"
+
+    def test_in_lists_of_any_length_match(self):
+        """Test that IN lists collapse regardless of their length."""
+        assert statement_shape("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == statement_shape(
+            "SELECT 1 FROM t WHERE id IN (%(id_1)s)"
+        )
+
+    def test_repeated_shapes_respects_threshold(self):
+        """Test that only shapes at or over the threshold are reported."""
+        statements = [f"SELECT * FROM materials WHERE id = {i}" for i in range(4)]
+        statements.append("SELECT * FROM products")
+
+        assert repeated_shapes(statements, 4) == {"SELECT * FROM materials WHERE id = ?": 4}
+        assert repeated_shapes(statements, 5) == {}
+
+
+class TestQueryCounter:
+    """Test the engine-wide statement counter used by query budgets."""
+
+    def test_counts_only_while_active(self):
+        """Test that statements outside the context are ignored."""
+        engine = create_engine("sqlite://")
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with QueryCounter() as counter:
+                conn.execute(text("SELECT 2"))
+                conn.execute(text("SELECT 3"))
+            conn.execute(text("SELECT 4"))
+
+        assert counter.count == 2
+        assert counter.repeated(2) == {"SELECT ?": 2}
+
+
+class TestQueryCountMiddleware:
+    """Test the development query-count headers."""
+
+    @pytest.mark.asyncio
+    async def test_headers_report_count_and_repeats(self, make_app, asgi_client):
+        """Test that an N+1 pattern is surfaced in the response headers."""
+        engine = create_engine("sqlite://")
+        query_stats.install_query_listeners(engine)
+        statements = ["SELECT 1"] + [f"SELECT {i} AS material_id" for i in range(6)]
+        app = QueryCountMiddleware(make_app(engine, statements), repeat_threshold=5, enabled=True)
+
+        async with asgi_client(app) as client:
+            response = await client.get("/api/products/")
+
+        assert response.headers["x-query-count"] == "7"
+        assert response.headers["x-query-repeated"] == "6"
+        assert float(response.headers["x-query-time-ms"]) >= 0
+        assert query_stats.current() is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_outside_development(self, make_app, asgi_client):
+        """Test that production responses carry no query headers."""
+        engine = create_engine("sqlite://")
+        app = QueryCountMiddleware(make_app(engine, ["SELECT 1"]), enabled=False)
+
+        async with asgi_client(app) as client:
+            response = await client.get("/api/products/")
+
+        assert "x-query-count" not in response.headers
+
+    def test_enabled_only_in_named_development_environments(self, monkeypatch):
+        """Test that an unset ENVIRONMENT is treated as production."""
+        monkeypatch.delenv("ENVIRONMENT", raising=False)
+        assert not QueryCountMiddleware(None).enabled
+        monkeypatch.setenv("ENVIRONMENT", "staging")
+        assert QueryCountMiddleware(None).enabled
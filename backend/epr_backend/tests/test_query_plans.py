@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import Column, DateTime, Float, Index, MetaData, String, Table, create_engine, desc, select
+
+import app.indexes  # noqa: F401
+from app.database import Base
+from benchmarks.query_plans import CriticalQuery, check, critical_queries, suggest_indexes
+
+
+@pytest.fixture
+def connection():
+    """Create an in-memory database with the application schema."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        yield conn
+
+
+@pytest.fixture
+def unindexed_reports():
+    """Create a reports table without any secondary indexes."""
+    metadata = MetaData()
+    reports = Table(
+        "reports",
+        metadata,
+        Column("id", String, primary_key=True),
+        Column("organization_id", String),
+        Column("status", String),
+        Column("start_date", DateTime),
+        Column("created_at", DateTime),
+        Column("total_fee", Float),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        yield conn, reports
+
+
+class TestCriticalQueryPlans:
+    """Test that hot queries are served by indexes."""
+
+    def test_no_full_scans_on_large_tables(self, connection):
+        """Test that no critical query degrades to a full table scan."""
+        reports = check(connection)
+
+        failing = {report.name: report.plan for report in reports if not report.ok}
+        assert failing == {}
+
+    def test_listings_use_index_order(self, connection):
+        """Test that newest-first listings need no separate sort step."""
+        listings = [q for q in critical_queries() if q.name.endswith("_list_by_org")]
+
+        for report in check(connection, listings):
+            assert report.sorts == [], report.plan
+
+    def test_missing_audit_table_is_reported(self, connection):
+        """Test that the audit range scan is reported as skipped while the schema lacks the table."""
+        [report] = [r for r in check(connection) if r.name == "audit_range_scan"]
+
+        assert report.skipped
+        assert report.plan == []
+
+
+class TestIndexAdvisor:
+    """Test index suggestions for unindexed predicates."""
+
+    def test_full_scan_is_flagged_with_partial_index_suggestion(self, unindexed_reports):
+        """Test that equality, range and constant predicates shape the suggestion."""
+        conn, reports = unindexed_reports
+        query = CriticalQuery("completed_in_period", lambda: select(reports.c.total_fee).where(
+            reports.c.organization_id == "org-1",
+            reports.c.status == "completed",
+            reports.c.start_date >= "2024-01-01",
+        ))
+
+        [report] = check(conn, [query])
+
+        assert report.full_scans == ["reports"]
+        assert report.suggestions == [
+            "CREATE INDEX ix_reports_organization_id_start_date ON reports "
+            "(organization_id, start_date) WHERE status = 'completed'"
+        ]
+
+    def test_order_by_column_completes_the_index(self, unindexed_reports):
+        """Test that a listing's sort column is appended after equality columns."""
+        conn, reports = unindexed_reports
+        query = CriticalQuery("list", lambda: (
+            select(reports).where(reports.c.organization_id == "org-1")
+            .order_by(desc(reports.c.created_at)).limit(50)
+        ))
+
+        [report] = check(conn, [query])
+
+        assert report.suggestions == [
+            "CREATE INDEX ix_reports_organization_id_created_at ON reports "
+            "(organization_id, created_at)"
+        ]
+
+    def test_partial_index_must_match_the_query_predicate(self, unindexed_reports):
+        """Test that a partial index with another WHERE does not count as covering the query."""
+        conn, reports = unindexed_reports
+        statement = select(reports.c.total_fee).where(
+            reports.c.organization_id == "org-1",
+            reports.c.status == "completed",
+            reports.c.start_date >= "2024-01-01",
+        )
+        drafts = Index("ix_drafts", reports.c.organization_id, reports.c.start_date,
+                       sqlite_where=reports.c.status == "draft")
+        drafts.create(conn)
+
+        assert len(suggest_indexes(conn, statement)) == 1
+
+        drafts.drop(conn)
+        Index("ix_completed", reports.c.organization_id, reports.c.start_date,
+              sqlite_where=reports.c.status == "completed").create(conn)
+
+        assert suggest_indexes(conn, statement) == []
@@ -0,0 +1,144 @@
+import json
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, Organization, User
+from app.services.outbound import OutboundClients, ProviderSettings, outbound_lifespan
+from app.services.reminder_planner import (
+    NotificationReminderSink,
+    Recipient,
+    ReminderBatch,
+    compliance_deadlines,
+    deliver,
+    plan_reminders,
+)
+from app.services.resilience import reset_guards
+
+TODAY = date(2024, 3, 1)
+
+
+@pytest.fixture
+def reminder_session():
+    """Create a database with two organizations and their deadlines."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    created = datetime(2024, 1, 1)
+    with Session(engine) as session:
+        for org_id in ("org-a", "org-b"):
+            session.add(Organization(id=org_id, name=org_id, created_at=created))
+            for i in range(2):
+                session.add(User(
+                    id=f"{org_id}-user-{i}",
+                    email=f"{org_id}-{i}@example.com",
+                    password_hash="hashed_password",
+                    organization_id=org_id,
+                    created_at=created,
+                ))
+        session.commit()
+        deadlines = [
+            ("d1", "org-a", "quarterly_report", 7, None),
+            ("d2", "org-b", "quarterly_report", 7, None),
+            ("d3", "org-b", "fee_payment", 1, None),
+            ("d4", "org-a", "fee_payment", 5, None),
+            ("d5", "org-a", "annual_report", 3, created),
+        ]
+        session.execute(compliance_deadlines.insert(), [
+            {
+                "id": deadline_id,
+                "organization_id": org_id,
+                "deadline_type": deadline_type,
+                "due_date": TODAY + timedelta(days=days),
+                "completed_at": completed_at,
+            }
+            for deadline_id, org_id, deadline_type, days, completed_at in deadlines
+        ])
+        session.commit()
+        yield session
+
+
+class TestReminderPlanner:
+    """Test set-based deadline reminder planning."""
+
+    def test_single_query_per_tick(self, reminder_session):
+        """Test that planning issues one query regardless of organization count."""
+        statements = []
+        event.listen(
+            reminder_session.get_bind(), "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+        plan_reminders(reminder_session, TODAY)
+
+        assert len(statements) == 1
+
+    def test_groups_by_template(self, reminder_session):
+        """Test that recipients sharing a template are batched together."""
+        batches = {
+            (b.deadline_type, b.days_remaining): b
+            for b in plan_reminders(reminder_session, TODAY)
+        }
+
+        assert set(batches) == {("quarterly_report", 7), ("fee_payment", 1)}
+        quarterly = batches[("quarterly_report", 7)]
+        assert len(quarterly.recipients) == 4
+        assert "7 days" in quarterly.subject
+        assert batches[("fee_payment", 1)].subject.endswith("in 1 day")
+
+    def test_completed_deadlines_are_skipped(self, reminder_session):
+        """Test that completed deadlines do not trigger reminders."""
+        batches = plan_reminders(reminder_session, TODAY)
+
+        assert all(b.deadline_type != "annual_report" for b in batches)
+
+    @pytest.mark.asyncio
+    async def test_deliver_hands_whole_batches_to_sink(self, reminder_session):
+        """Test that the notification layer receives one call per batch."""
+        received = []
+
+        class RecordingSink:
+            async def send_batch(self, batch: ReminderBatch) -> int:
+                received.append(batch)
+                return len(batch.recipients)
+
+        batches = plan_reminders(reminder_session, TODAY)
+        sent = await deliver(batches, RecordingSink())
+
+        assert len(received) == len(batches)
+        assert sent == 6
+
+    @pytest.mark.asyncio
+    async def test_sink_uses_pooled_provider_clients(self):
+        """One SendGrid request carries every email; each phone gets one Twilio message."""
+        reset_guards()
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(202 if request.url.host == "sendgrid" else 201)
+
+        providers = {
+            name: ProviderSettings(name, f"http://{name}", max_retries=0) for name in ("sendgrid", "twilio")
+        }
+        clients = OutboundClients(providers, transport=httpx.MockTransport(handler))
+        batch = ReminderBatch(
+            "fee_payment", 3, TODAY, "en", "Fee due", "<p>Due</p>", "Fee due in 3 days",
+            [Recipient("org-a", f"user{i}@example.com", f"+1555000{i}") for i in range(3)]
+            + [Recipient("org-a", "user0@example.com", None)],
+        )
+
+        async with outbound_lifespan(clients=clients):
+            sent = await NotificationReminderSink(clients).send_batch(batch)
+
+        assert sent == 6
+        mail = [r for r in requests if r.url.host == "sendgrid"]
+        assert len(mail) == 1
+        personalizations = json.loads(mail[0].content)["personalizations"]
+        assert [p["to"][0]["email"] for p in personalizations] == [f"user{i}@example.com" for i in range(3)]
+        sms = sorted(parse_qs(r.content.decode())["To"][0] for r in requests if r.url.host == "twilio")
+        assert sms == [f"+1555000{i}" for i in range(3)]
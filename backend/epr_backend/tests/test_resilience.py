@@ -0,0 +1,226 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services import notification_delivery
+from app.services.health import HealthMonitor
+from app.services.job_status import run_or_accept
+from app.services.metrics import registry
+from app.services.outbound import outbound_lifespan
+from app.services.resilience import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    Bulkhead,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+    DependencyGuard,
+    register_circuit_probes,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def make_clients(outbound_clients):
+    """Build SendGrid clients whose requests are answered by ``handler``."""
+    def make(handler, **overrides):
+        return outbound_clients(
+            "sendgrid", "http://provider", transport=httpx.MockTransport(handler), max_retries=0, **overrides
+        )
+
+    return make
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    def test_opens_after_consecutive_failures(self):
+        """The circuit opens at the threshold and a success resets the count."""
+        breaker = CircuitBreaker("stripe", failure_threshold=3, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == STATE_CLOSED
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError) as excinfo:
+            breaker.before_call()
+        assert excinfo.value.retry_after == pytest.approx(30.0)
+
+    def test_half_open_allows_a_single_probe(self):
+        """After the recovery timeout one call probes; its outcome closes or reopens the circuit."""
+        clock = FakeClock()
+        breaker = CircuitBreaker("s3", failure_threshold=1, recovery_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.state == STATE_HALF_OPEN
+
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+
+        clock.now += 10
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == STATE_CLOSED
+        breaker.before_call()
+
+
+class TestDependencyGuard:
+    """Test the bulkhead and breaker together."""
+
+    @pytest.mark.asyncio
+    async def test_bulkhead_fails_fast_and_releases(self):
+        """Calls beyond the concurrency limit are refused, and slots free up afterwards."""
+        guard = DependencyGuard(CircuitBreaker("twilio"), Bulkhead("twilio", 1))
+        async with guard.slot():
+            with pytest.raises(BulkheadFullError):
+                async with guard.slot():
+                    pass
+        async with guard.slot():
+            assert guard.bulkhead.in_use == 1
+        assert guard.bulkhead.in_use == 0
+
+    @pytest.mark.asyncio
+    async def test_caller_errors_do_not_trip_the_breaker(self):
+        """Exceptions ``is_failure`` rejects count as successful calls."""
+        guard = DependencyGuard(CircuitBreaker("s3", failure_threshold=1), Bulkhead("s3", 5))
+        with pytest.raises(KeyError):
+            async with guard.slot(is_failure=lambda exc: not isinstance(exc, KeyError)):
+                raise KeyError("NoSuchKey")
+        assert guard.breaker.state == STATE_CLOSED
+
+
+class TestGuardedOutboundClients:
+    """Test that a slow or failing provider cannot hold API capacity."""
+
+    @pytest.mark.asyncio
+    async def test_slow_provider_is_capped_by_bulkhead(self, make_clients):
+        """With the bulkhead full, further calls fail immediately instead of queueing."""
+        release = asyncio.Event()
+
+        async def slow(request):
+            await release.wait()
+            return httpx.Response(202)
+
+        clients = make_clients(slow, max_concurrency=2)
+        async with outbound_lifespan(clients=clients):
+            pending = [asyncio.ensure_future(clients.request("sendgrid", "POST", "/v3/mail/send")) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            started = time.perf_counter()
+            with pytest.raises(BulkheadFullError):
+                await clients.request("sendgrid", "POST", "/v3/mail/send")
+            assert time.perf_counter() - started < 0.05
+            release.set()
+            assert [r.status_code for r in await asyncio.gather(*pending)] == [202, 202]
+
+    @pytest.mark.asyncio
+    async def test_failing_provider_opens_circuit(self, make_clients):
+        """Once open, the circuit rejects calls without contacting the provider."""
+        hits = []
+
+        def failing(request):
+            hits.append(request.url.path)
+            return httpx.Response(503)
+
+        clients = make_clients(failing, failure_threshold=2)
+        async with outbound_lifespan(clients=clients):
+            for _ in range(2):
+                assert (await clients.request("sendgrid", "POST", "/v3/mail/send")).status_code == 503
+            with pytest.raises(CircuitOpenError):
+                await clients.request("sendgrid", "POST", "/v3/mail/send")
+        assert len(hits) == 2
+        assert 'circuit_breaker_state{dependency="sendgrid"} 2' in registry.render()
+
+
+class TestFallbacks:
+    """Test fast-fail fallbacks for notifications and reports."""
+
+    @pytest.mark.asyncio
+    async def test_notification_is_queued_while_circuit_open(self, make_clients, monkeypatch):
+        """An unavailable provider queues the message for the worker instead of failing."""
+        queued = []
+        monkeypatch.setattr(
+            notification_delivery.deliver_notification,
+            "apply_async",
+            lambda args, countdown: queued.append((args, countdown)),
+        )
+        clients = make_clients(lambda request: httpx.Response(202), failure_threshold=1)
+        clients.guards["sendgrid"].breaker.record_failure()
+        payload = {"to": "ops@example.com", "subject": "Deadline", "html": "<p>Due</p>"}
+
+        async with outbound_lifespan(clients=clients):
+            outcome = await notification_delivery.deliver_or_queue("email", payload, clients)
+
+        assert outcome == notification_delivery.QUEUED
+        assert queued == [(("email", payload), 30)]
+
+    @pytest.mark.asyncio
+    async def test_notification_is_queued_while_provider_degraded(self, make_clients, monkeypatch):
+        """A 503 that outlives the client's retries queues the message, honouring Retry-After."""
+        queued = []
+        monkeypatch.setattr(
+            notification_delivery.deliver_notification,
+            "apply_async",
+            lambda args, countdown: queued.append((args, countdown)),
+        )
+        statuses = [503, 400]
+        clients = make_clients(lambda request: httpx.Response(statuses.pop(0), headers={"Retry-After": "120"}))
+        payload = {"to": "ops@example.com", "subject": "Deadline", "html": "<p>Due</p>"}
+
+        async with outbound_lifespan(clients=clients):
+            outcome = await notification_delivery.deliver_or_queue("email", payload, clients)
+            # Client errors are the caller's problem and are not queued.
+            with pytest.raises(notification_delivery.DeliveryError):
+                await notification_delivery.deliver_or_queue("email", payload, clients)
+
+        assert outcome == notification_delivery.QUEUED
+        assert queued == [(("email", payload), 120)]
+
+    @pytest.mark.asyncio
+    async def test_report_is_accepted_when_dependency_unavailable(self):
+        """The report request answers 202 with a status URL and the job is enqueued."""
+        created, enqueued = [], []
+
+        class Store:
+            def create(self, job_id, organization_id, kind):
+                created.append((job_id, organization_id, kind))
+
+        async def generate():
+            raise CircuitOpenError("s3", "circuit open", 12.5)
+
+        response = await run_or_accept("r1", "org-1", generate, enqueued.append, store=Store())
+
+        assert response.status_code == 202
+        assert response.headers["location"] == "/api/jobs/status?ids=r1"
+        assert response.headers["retry-after"] == "13"
+        assert created == [("r1", "org-1", "report")]
+        assert enqueued == ["r1"]
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_degrades_readiness(self, make_clients):
+        """Breaker state shows up in readiness without failing it."""
+        clients = make_clients(lambda request: httpx.Response(200), failure_threshold=1)
+        monitor = HealthMonitor()
+        register_circuit_probes(monitor, ["sendgrid"])
+        clients.guards["sendgrid"].breaker.record_failure()
+        await monitor.probe_all()
+
+        report = monitor.readiness()
+        assert report["status"] == "ready"
+        assert report["degraded"] == ["circuit:sendgrid"]
+        assert "circuit open" in report["dependencies"]["circuit:sendgrid"]["error"]
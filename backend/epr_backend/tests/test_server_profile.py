@@ -0,0 +1,120 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.middleware.rate_limiter import (
+    MemoryRateLimitBackend,
+    RateLimitMiddleware,
+    RedisRateLimitBackend,
+)
+
+
+@pytest.fixture
+def redis_client():
+    """Create an in-process Redis that runs the real Lua script."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeStrictRedis()
+
+
+class BrokenRedis:
+    def __init__(self):
+        self.attempts = 0
+
+    def register_script(self, source):
+        self.attempts += 1
+        raise ConnectionError("redis down")
+
+
+def make_worker(backend, calls=3):
+    app = FastAPI()
+
+    @app.get("/api/products/")
+    def products():
+        return []
+
+    app.add_middleware(RateLimitMiddleware, calls=calls, period=60, backend=backend)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+class TestRateLimitBackends:
+    """Test that rate limits hold across workers."""
+
+    @pytest.mark.asyncio
+    async def test_redis_backend_is_shared_across_workers(self, redis_client):
+        """Two workers sharing Redis enforce one limit between them."""
+        statuses = []
+        async with make_worker(RedisRateLimitBackend(redis_client)) as first, make_worker(
+            RedisRateLimitBackend(redis_client)
+        ) as second:
+            for client in (first, second, first, second):
+                statuses.append((await client.get("/api/products/")).status_code)
+        assert statuses == [200, 200, 200, 429]
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_script(self, redis_client):
+        """The Lua script admits up to the limit and expires the window with the period."""
+        backend = RedisRateLimitBackend(redis_client)
+        allowed = [await backend.hit("10.0.0.1", 3, 60) for _ in range(5)]
+
+        assert allowed == [True, True, True, False, False]
+        assert 59_000 < redis_client.pttl("ratelimit:10.0.0.1") <= 60_000
+
+    @pytest.mark.asyncio
+    async def test_memory_backend_counts_per_process(self):
+        """The in-memory backend keeps the original per-process sliding window."""
+        async with make_worker(MemoryRateLimitBackend(), calls=2) as client:
+            statuses = [(await client.get("/api/products/")).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+
+    @pytest.mark.asyncio
+    async def test_redis_outage_falls_back_to_local_counting(self):
+        """Without Redis the worker still limits on its own counts and stops retrying Redis for a while."""
+        redis = BrokenRedis()
+        async with make_worker(RedisRateLimitBackend(redis), calls=1) as client:
+            statuses = [(await client.get("/api/products/")).status_code for _ in range(2)]
+        assert statuses == [200, 429]
+        assert redis.attempts == 1
+
+
+class TestServerProfile:
+    """Test production worker sizing and safety checks."""
+
+    @pytest.fixture(autouse=True)
+    def server(self):
+        pytest.importorskip("gunicorn")
+        from app import server
+
+        return server
+
+    def test_workers_follow_cgroup_v2_quota(self, server, tmp_path, monkeypatch):
+        """A 1.5 CPU quota gives two workers, however many host cores there are."""
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: set(range(64)))
+        (tmp_path / "cpu.max").write_text("150000 100000\n")
+        assert server.cpu_quota(str(tmp_path)) == 1.5
+        assert server.worker_count(str(tmp_path)) == 2
+
+        (tmp_path / "cpu.max").write_text("400000 100000\n")
+        assert server.worker_count(str(tmp_path)) == 4
+
+    def test_unlimited_quota_uses_cpu_affinity(self, server, tmp_path, monkeypatch):
+        """Without a quota the worker count follows the CPUs the process may run on."""
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: {0, 1, 2})
+        (tmp_path / "cpu.max").write_text("max 100000\n")
+        assert server.cpu_quota(str(tmp_path)) is None
+        assert server.worker_count(str(tmp_path)) == 3
+
+        monkeypatch.setenv("WEB_CONCURRENCY", "6")
+        assert server.worker_count(str(tmp_path)) == 6
+
+    def test_embedded_scheduler_is_refused_with_many_workers(self, server, monkeypatch):
+        """Several workers must not each run the deadline scheduler."""
+        pytest.importorskip("redis")
+        monkeypatch.setenv("RUN_SCHEDULER", "true")
+        with pytest.raises(RuntimeError):
+            server.check_scheduler(4)
+        server.check_scheduler(1)
+        monkeypatch.setenv("RUN_SCHEDULER", "false")
+        server.check_scheduler(4)
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.single_flight import (
+    SingleFlight,
+    calculate_fees_once,
+    fee_calculation_key,
+    fee_data_version,
+    fee_flight,
+    normalize_period,
+)
+
+
+class FakeRedis:
+    """Thread-safe in-memory subset of the Redis commands SingleFlight uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value, expires = self.data.get(key, (None, None))
+            if expires is not None and expires < time.monotonic():
+                del self.data[key]
+                return None
+            return value
+
+    def set(self, key, value, nx=False, px=None):
+        with self.lock:
+            current = self.data.get(key)
+            if nx and current is not None and (current[1] is None or current[1] > time.monotonic()):
+                return None
+            self.data[key] = (value, time.monotonic() + px / 1000 if px else None)
+            return True
+
+    def eval(self, script, numkeys, key, token):
+        with self.lock:
+            if self.data.get(key, (None,))[0] == token:
+                del self.data[key]
+                return 1
+            return 0
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("redis down")
+
+
+class TestFeeKeys:
+    """Test normalization of the coalescing key."""
+
+    def test_period_formats_are_equivalent(self):
+        """Both period spellings map to one canonical form."""
+        assert normalize_period("Q1-2024") == "2024-Q1"
+        assert normalize_period(" 2024-q1 ") == "2024-Q1"
+
+    def test_key_ignores_product_order_and_duplicates(self):
+        """The product set, not the query string order, identifies the calculation."""
+        key = fee_calculation_key("org-a", ["p2", "p1"], "Q1-2024", "3.7")
+        assert key == fee_calculation_key("org-a", ["p1", "p2", "p1"], "2024-Q1", "3.7")
+        assert key != fee_calculation_key("org-b", ["p1", "p2"], "Q1-2024", "3.7")
+        assert key != fee_calculation_key("org-a", ["p1", "p2"], "Q1-2024", "3.8")
+
+
+class TestSingleFlight:
+    """Test coalescing within and across workers."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_computation(self):
+        """Callers in one worker await the same in-flight task."""
+        flight = SingleFlight("test", client_factory=lambda: None)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return {"total_fee": 12.5}
+
+        results = await asyncio.gather(*(flight.do("k", compute) for _ in range(20)))
+
+        assert calls == [1]
+        assert results == [{"total_fee": 12.5}] * 20
+        assert flight._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_workers_share_result_through_redis(self):
+        """A second worker waits for the lock holder's published result."""
+        redis = FakeRedis()
+        workers = [SingleFlight("test", poll_interval=0.005, client_factory=lambda: redis) for _ in range(3)]
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"total_fee": 3.0}
+
+        results = await asyncio.gather(*(worker.do("k", compute) for worker in workers))
+
+        assert calls == [1]
+        assert results == [{"total_fee": 3.0}] * 3
+        assert redis.get("sf:test:lock:k") is None
+        assert redis.get("sf:test:result:k") is not None
+
+    @pytest.mark.asyncio
+    async def test_expired_lock_is_taken_over(self):
+        """A waiter computes itself when the lock holder vanished without publishing."""
+        redis = FakeRedis()
+        redis.set("sf:test:lock:k", "dead-worker", px=30)
+        flight = SingleFlight("test", poll_interval=0.005, client_factory=lambda: redis)
+
+        async def compute():
+            return 1
+
+        assert await flight.do("k", compute) == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter_and_are_not_cached(self):
+        """A failed computation fails its waiters and the next call retries."""
+        redis = FakeRedis()
+        flight = SingleFlight("test", client_factory=lambda: redis)
+        attempts = []
+
+        async def failing():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("fee engine error")
+
+        results = await asyncio.gather(flight.do("k", failing), flight.do("k", failing), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert redis.get("sf:test:result:k") is None
+
+        async def working():
+            return 2
+
+        assert await flight.do("k", working) == 2
+        assert attempts == [1]
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_falls_back_to_local_computation(self):
+        """Coordination errors never fail the request."""
+        flight = SingleFlight("test", client_factory=BrokenRedis)
+
+        async def compute():
+            return "ok"
+
+        assert await flight.do("k", compute) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_calculate_fees_once_runs_sync_engine_once(self, monkeypatch):
+        """The fee helper coalesces identical synchronous calculations."""
+        monkeypatch.setattr(fee_flight, "client_factory", lambda: None)
+        calls = []
+
+        def engine():
+            calls.append(1)
+            time.sleep(0.02)
+            return {"total_fee": 1.0, "breakdown": []}
+
+        results = await asyncio.gather(*(
+            calculate_fees_once("org-a", products, "Q1-2024", engine, data_version="1.1")
+            for products in (["p1", "p2"], ["p2", "p1"], ["p1", "p2", "p2"])
+        ))
+
+        assert calls == [1]
+        assert results[0] == results[1] == results[2]
+
+    def test_fee_data_version_follows_schedule_reloads(self, monkeypatch):
+        """A reloaded fee schedule changes the shared result key."""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+
+        from app.database import Base
+        from app.services.fee_schedule import DEFAULT_SCHEDULE, compile_schedule, fee_schedules
+        from app.services.resource_versions import resource_versions  # noqa: F401  (registers the table)
+
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        monkeypatch.setattr("app.database.SessionLocal", sessionmaker(bind=engine))
+        monkeypatch.setattr(fee_schedules, "compiled", compile_schedule(DEFAULT_SCHEDULE))
+        before = fee_data_version("org-a")
+
+        revised = {**DEFAULT_SCHEDULE, "materials": {**DEFAULT_SCHEDULE["materials"], "cork": "Paper"}}
+        monkeypatch.setattr(fee_schedules, "compiled", compile_schedule(revised))
+
+        assert fee_data_version("org-a") != before
@@ -0,0 +1,122 @@
+import sys
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from app.services import tasks
+from app.services.task_queues import (
+    ENQUEUED_AT_HEADER,
+    PRIORITY_HIGH,
+    QUEUE_BULK,
+    QUEUE_INTERACTIVE,
+    QUEUE_NOTIFICATIONS,
+    QueueLatencyRecorder,
+    apply_worker_profile,
+    record_queue_latency,
+    route_task,
+    stamp_enqueue_time,
+)
+
+
+class TestTaskRouting:
+    """Test routing of tasks to named queues."""
+
+    @pytest.mark.parametrize("task_name,queue", [
+        ("app.services.background_jobs.send_password_reset_email", QUEUE_NOTIFICATIONS),
+        ("app.services.background_jobs.send_sms_alert", QUEUE_NOTIFICATIONS),
+        ("reminders.plan_deadline_reminders", QUEUE_NOTIFICATIONS),
+        ("app.services.background_jobs.generate_compliance_report", QUEUE_BULK),
+        ("app.services.background_jobs.import_products_csv", QUEUE_BULK),
+        ("app.services.background_jobs.recalculate_fee", QUEUE_INTERACTIVE),
+    ])
+    def test_route_by_task_name(self, task_name, queue):
+        """Test that tasks land on the queue for their workload."""
+        assert route_task(task_name)["queue"] == queue
+
+    def test_password_reset_has_highest_priority(self):
+        """Test that password resets jump ahead of other notifications."""
+        assert route_task("send_password_reset_email")["priority"] == PRIORITY_HIGH
+
+
+class TestWorkerProfiles:
+    """Test per-queue worker tuning."""
+
+    def test_bulk_worker_prefetches_one_and_acks_late(self):
+        """Test that bulk workers never hoard long-running tasks."""
+        conf = SimpleNamespace()
+        apply_worker_profile(sender="bulk@host", conf=conf, options={"queues": ["bulk"]})
+
+        assert conf.worker_prefetch_multiplier == 1
+        assert conf.task_acks_late is True
+
+    def test_multi_queue_worker_is_left_untouched(self):
+        """Test that workers consuming several queues keep default settings."""
+        conf = SimpleNamespace()
+        apply_worker_profile(conf=conf, options={"queues": ["bulk", "interactive"]})
+
+        assert not hasattr(conf, "worker_prefetch_multiplier")
+
+
+class TestQueueLatency:
+    """Test enqueue-to-start latency recording."""
+
+    def test_latency_recorded_from_publish_header(self, monkeypatch):
+        """Test that the publish timestamp flows to the prerun hook."""
+        recorder = QueueLatencyRecorder()
+        monkeypatch.setattr("app.services.task_queues.queue_latency", recorder)
+        headers = {}
+        stamp_enqueue_time(headers=headers)
+        headers[ENQUEUED_AT_HEADER] -= 2.0
+
+        task = Mock()
+        task.name = "bench.task"
+        task.request = SimpleNamespace(headers=None, **headers)
+        record_queue_latency(task=task)
+
+        stats = recorder.snapshot()["bench.task"]
+        assert stats["count"] == 1
+        assert 2.0 <= stats["max"] < 3.0
+
+
+CELERY_APP_SOURCE = """
+from celery import Celery
+
+from app.services.task_queues import configure_celery
+
+app = Celery("epr_test", broker="memory://", set_as_current=False)
+configure_celery(app)
+"""
+
+
+@pytest.fixture
+def configured_app(tmp_path, monkeypatch):
+    """Point deferred tasks at a configured app on the in-memory broker."""
+    pytest.importorskip("celery")
+    (tmp_path / "epr_test_celery.py").write_text(CELERY_APP_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(tasks, "CELERY_APP_MODULE", "epr_test_celery")
+    tasks.get_celery_app.cache_clear()
+    yield tasks.get_celery_app()
+    tasks.get_celery_app.cache_clear()
+    sys.modules.pop("epr_test_celery", None)
+
+
+class TestPublishing:
+    """Test enqueueing from processes that never configured Celery themselves."""
+
+    def test_deferred_task_uses_configured_broker_and_routes(self, configured_app):
+        """A task enqueued from the API reaches the configured broker on its routed queue."""
+        from celery import current_app
+
+        from app.services.notification_delivery import deliver_notification
+
+        deliver_notification.apply_async(args=("email", {"to": "ops@example.com"}), countdown=5)
+
+        assert configured_app is not current_app
+        with configured_app.connection_for_read() as connection:
+            assert connection.transport_cls == "memory"
+            message = connection.default_channel.basic_get(QUEUE_NOTIFICATIONS)
+        assert message is not None
+        assert message.headers["task"] == "notifications.deliver"
+        assert ENQUEUED_AT_HEADER in message.headers
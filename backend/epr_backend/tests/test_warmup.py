@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, Material
+from app.services.health import HealthMonitor
+from app.services.material_catalogue import CATALOGUE, MaterialRates, seed_catalogue
+from app.services.resource_versions import get_version
+from app.services.warmup import GATE, Warmup, warmup_lifespan
+
+
+@pytest.fixture
+def catalogue_engine():
+    """Create an empty database with the materials and seed bookkeeping tables."""
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestSeedCatalogue:
+    """Test checksum-guarded catalogue seeding."""
+
+    def test_seeds_once_then_skips(self, catalogue_engine):
+        """A second boot with the same catalogue does a single lookup and writes nothing."""
+        with catalogue_engine.begin() as conn:
+            assert seed_catalogue(conn) is True
+        statements = count_statements(catalogue_engine)
+        with catalogue_engine.begin() as conn:
+            assert seed_catalogue(conn) is False
+
+        assert len(statements) == 1
+        with catalogue_engine.connect() as conn:
+            names = set(conn.execute(select(Material.__table__.c.name)).scalars())
+            assert {"Paper (Label)", "Cardboard", "Plastic (PET)", "Glass", "Metal (Steel)"} <= names
+            assert get_version(conn, "materials")[0] == 1
+
+    def test_changed_catalogue_is_upserted(self, catalogue_engine):
+        """A changed rate updates the existing row in place and bumps the materials version."""
+        with catalogue_engine.begin() as conn:
+            seed_catalogue(conn)
+        changed = [dict(row, epr_rate=0.5) if row["name"] == "Glass" else row for row in CATALOGUE]
+        with catalogue_engine.begin() as conn:
+            assert seed_catalogue(conn, changed) is True
+
+        with Session(catalogue_engine) as session:
+            glass = session.scalars(select(Material).where(Material.name == "Glass")).all()
+            assert [m.epr_rate for m in glass] == [0.5]
+            assert session.query(Material).count() == len(CATALOGUE)
+        with catalogue_engine.connect() as conn:
+            assert get_version(conn, "materials")[0] == 2
+
+
+class TestMaterialRates:
+    """Test the versioned in-process catalogue."""
+
+    def test_reloads_only_when_version_moves(self, catalogue_engine):
+        """Rates are served from memory until a catalogue write bumps the version."""
+        rates = MaterialRates()
+        with catalogue_engine.begin() as conn:
+            seed_catalogue(conn)
+        with catalogue_engine.connect() as conn:
+            assert rates.rate(conn, "Glass") == 0.05
+            statements = count_statements(catalogue_engine)
+            assert rates.rate(conn, "Cardboard") == 0.08
+            assert len(statements) == 1  # the version check only
+
+        with Session(catalogue_engine) as session:
+            session.scalars(select(Material).where(Material.name == "Glass")).one().epr_rate = 0.07
+            session.commit()
+        with catalogue_engine.connect() as conn:
+            assert rates.rate(conn, "Glass") == 0.07
+
+    def test_concurrent_misses_reload_once(self, catalogue_engine):
+        """A miss that waited for the lock reuses the catalogue the holder just loaded."""
+        rates = MaterialRates()
+        with catalogue_engine.begin() as conn:
+            seed_catalogue(conn)
+        with catalogue_engine.connect() as conn:
+            with rates._lock:
+                waiter = threading.Thread(target=rates.load, args=(conn,))
+                waiter.start()
+                time.sleep(0.05)  # the waiter has checked the version and is blocked on the lock
+                statements = count_statements(catalogue_engine)
+                rates.version, rates.by_name = get_version(conn, "materials")[0], {"Glass": object()}
+            waiter.join()
+
+        assert len(statements) == 1  # the holder's version read; the waiter did not reload
+
+
+class TestWarmup:
+    """Test the readiness gate around start-up warm-up."""
+
+    @pytest.mark.asyncio
+    async def test_gate_opens_after_steps(self, catalogue_engine):
+        """Readiness stays closed until every step has run."""
+        monitor = HealthMonitor()
+        loop = asyncio.get_running_loop()
+        release = asyncio.Event()
+        ran = []
+        steps = Warmup()
+        steps.register("seed", lambda conn: ran.append("seed"))
+        steps.register("wait", lambda conn: asyncio.run_coroutine_threadsafe(release.wait(), loop).result())
+
+        async with warmup_lifespan(engine=catalogue_engine, monitor=monitor, steps=steps):
+            await asyncio.sleep(0.05)
+            assert monitor.readiness()["gates"] == {GATE: False}
+            assert monitor.readiness()["status"] == "not_ready"
+            release.set()
+            for _ in range(100):
+                if monitor.ready_gates[GATE]:
+                    break
+                await asyncio.sleep(0.01)
+            assert monitor.readiness()["status"] == "ready"
+        assert ran == ["seed"]
+
+    @pytest.mark.asyncio
+    async def test_failed_step_is_retried(self, catalogue_engine):
+        """A failing step keeps the gate closed and is retried until it passes."""
+        monitor = HealthMonitor()
+        attempts = []
+
+        def flaky(conn):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("database starting")
+
+        steps = Warmup(retry_delay=0.01)
+        steps.register("flaky", flaky)
+        await steps.run(catalogue_engine, monitor)
+
+        assert len(attempts) == 3
+        assert monitor.ready_gates[GATE] is True